@@ -0,0 +1,73 @@
+import uuid
+from typing import Callable, Dict, Tuple
+from benchmarks.stubs import ESTIMATED_LATENCIES_MS, StubOpenAI, StubTTDClient, StubUpstream
+from components.chat import parse_group_definition
+from services.classification_cache import ClassificationCache
+from services.data_group_cache import DataGroupCache
+from services.openai_service import OpenAIService
+from services.push_journal import PushJournalStore
+from services.request_scheduler import RequestScheduler
+from services.ttd_interface import TTDInterfaceService
+
+AUDIENCE_DESCRIPTION = "Women aged 25-34 who love outdoor sports and travel, excluding luxury shoppers"
+
+# Upstream latencies are replayed at this fraction so a macro run takes seconds, not minutes
+DEFAULT_LATENCY_SCALE = 0.02
+
+
+def _openai_service(upstream: StubUpstream) -> OpenAIService:
+    service = OpenAIService(client=StubOpenAI(upstream))
+    # No throttling or cross-run cache hits: every run measures the same work
+    service.scheduler = RequestScheduler(requests_per_minute=1e9, tokens_per_minute=1e12)
+    service.classification_cache = ClassificationCache(db_path=None)
+    service.stream_replies = False
+    # Poll on the same compressed clock as the replayed latencies
+    service.run_poll_initial_delay *= upstream.scale
+    service.run_poll_max_delay *= upstream.scale
+    return service
+
+
+def bench_structure_audience(scale: float) -> Tuple[Callable[[], None], StubUpstream]:
+    upstream = StubUpstream(ESTIMATED_LATENCIES_MS, scale)
+
+    def run():
+        # Fresh service per run so the classification and message caches start cold
+        _openai_service(upstream).plan_audience(AUDIENCE_DESCRIPTION, kpi_metric="CPA")
+    return run, upstream
+
+
+def bench_push_audience(scale: float) -> Tuple[Callable[[], None], StubUpstream]:
+    upstream = StubUpstream(ESTIMATED_LATENCIES_MS, scale)
+    ttd_service = TTDInterfaceService(
+        client=StubTTDClient(upstream),
+        data_group_cache=DataGroupCache(db_path=None),
+        push_journals=PushJournalStore(directory=None)
+    )
+
+    # Build a realistic audience once, outside the measured section
+    setup = StubUpstream(ESTIMATED_LATENCIES_MS, 0.0)
+    openai_service = _openai_service(setup)
+    structure, results = openai_service.plan_audience(AUDIENCE_DESCRIPTION, kpi_metric="CPA")
+    data_groups = {}
+    for result in results:
+        entry = dict(result["entry"])
+        if not entry["segments"]:
+            reply = openai_service.get_latest_assistant_message(entry["thread_id"])
+            entry["segments"] = parse_group_definition(reply)["segments"]
+        data_groups[str(uuid.uuid4())] = entry
+    audience = {"audience_name": structure.audience_name, "data_groups": data_groups}
+
+    def run():
+        # Measure creating the groups, not reusing the ones from the previous run
+        ttd_service.data_group_cache = DataGroupCache(db_path=None)
+        ttd_service.push_journals = PushJournalStore(directory=None)
+        result = ttd_service.push_audience(audience)
+        if not result.success:
+            raise RuntimeError(f"push_audience failed against the stub client: {result.error}")
+    return run, upstream
+
+
+MACRO_BENCHMARKS: Dict[str, Callable[[float], Tuple[Callable[[], None], StubUpstream]]] = {
+    "macro.structure_audience": bench_structure_audience,
+    "macro.push_audience": bench_push_audience,
+}
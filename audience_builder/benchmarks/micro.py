@@ -0,0 +1,67 @@
+import json
+from typing import Callable, Dict
+from components.chat import parse_group_definition
+from loadtest.fake_server import SAMPLE_SEGMENTS
+from models.classification import AudienceType, Gender, GroupClassification
+from services.segment_service import SegmentService
+
+MIN_AGE = 18
+MAX_AGE = 99
+
+
+def age_pairs():
+    """Every (start, end) the classifier can produce, open-ended ranges included"""
+    for start in range(MIN_AGE, MAX_AGE + 1):
+        yield start, None
+        for end in range(start, MAX_AGE + 1):
+            yield start, end
+
+
+def bench_age_coverage_all_pairs() -> Callable[[], None]:
+    segment_service = SegmentService()
+    pairs = list(age_pairs())
+
+    def run():
+        for start, end in pairs:
+            segment_service.get_optimal_age_coverage(start, end)
+    return run
+
+
+def bench_segments_for_classification() -> Callable[[], None]:
+    segment_service = SegmentService()
+    classifications = [
+        GroupClassification(audience_type=AudienceType.AGE_RANGE, split_recommended=False,
+                            age_start=start, age_end=end, gender=None)
+        for start, end in [(18, 24), (25, 34), (21, None), (35, 54), (27, 42), (55, None), (30, 31)]
+    ] + [
+        GroupClassification(audience_type=AudienceType.GENDER, split_recommended=False,
+                            age_start=None, age_end=None, gender=gender)
+        for gender in Gender
+    ] + [
+        GroupClassification(audience_type=AudienceType.OTHER, split_recommended=False,
+                            age_start=None, age_end=None, gender=None)
+    ]
+
+    def run():
+        for _ in range(100):
+            for classification in classifications:
+                segment_service.get_segments_for_classification(classification)
+    return run
+
+
+def bench_group_definition_parsing() -> Callable[[], None]:
+    # The JSON half of display_group_definition; the rest is Streamlit rendering
+    segments = (SAMPLE_SEGMENTS * 4)[:12]
+    reply = f"```json\n{json.dumps({'group_name': 'Outdoor Travelers', 'segments': segments}, indent=2)}\n```"
+
+    def run():
+        for _ in range(1000):
+            parse_group_definition(reply)
+    return run
+
+
+MICRO_BENCHMARKS: Dict[str, Callable[[], Callable[[], None]]] = {
+    "micro.age_coverage_all_pairs": bench_age_coverage_all_pairs,
+    "micro.segments_for_classification_x100": bench_segments_for_classification,
+    "micro.group_definition_parsing_x1000": bench_group_definition_parsing,
+}
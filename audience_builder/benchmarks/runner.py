@@ -0,0 +1,144 @@
+"""Benchmarks for the service layer, with saved baselines and a regression check.
+
+Run from the audience_builder directory:
+
+    python -m benchmarks.runner run --save              # record a baseline
+    python -m benchmarks.runner compare --threshold 0.2 # exit 1 on regression
+
+Micro benchmarks time pure-Python hot spots. Macro benchmarks drive
+plan_audience and push_audience against in-process stub clients that sleep for
+estimated upstream latencies (scaled down), and also count upstream requests.
+"""
+import argparse
+import json
+import platform
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+from benchmarks.macro import DEFAULT_LATENCY_SCALE, MACRO_BENCHMARKS
+from benchmarks.micro import MICRO_BENCHMARKS
+from loadtest.stats import latency_summary
+from services.classification_cache import CACHE_DIR
+from services.logging_pipeline import configure_logging
+
+DEFAULT_BASELINE = CACHE_DIR / "benchmarks" / "baseline.json"
+
+
+def _time(run, repeats: int) -> List[float]:
+    run()  # warm-up: imports, lazily built tables, pools
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def run_benchmarks(selected: Optional[List[str]] = None, micro_repeats: int = 15,
+                   macro_repeats: int = 5, scale: float = DEFAULT_LATENCY_SCALE) -> Dict[str, Dict]:
+    results = {}
+    for name, factory in MICRO_BENCHMARKS.items():
+        if selected and not any(name.startswith(prefix) for prefix in selected):
+            continue
+        results[name] = latency_summary(_time(factory(), micro_repeats))
+        print(f"{name:<44}{results[name]['p50_ms']:>10.2f} ms", file=sys.stderr)
+
+    for name, factory in MACRO_BENCHMARKS.items():
+        if selected and not any(name.startswith(prefix) for prefix in selected):
+            continue
+        run, upstream = factory(scale)
+        run()
+        upstream.reset()
+        timings = _time(run, macro_repeats)
+        summary = latency_summary(timings)
+        # Warm-up plus measured runs all counted; report per run. Run polls depend on
+        # jittered timing, so they are reported but not part of the regression check.
+        runs = macro_repeats + 1
+        summary["requests"] = round(upstream.total_calls(exclude=("runs.retrieve",)) / runs, 2)
+        summary["polls"] = round(upstream.calls["runs.retrieve"] / runs, 2)
+        results[name] = summary
+        print(f"{name:<44}{summary['p50_ms']:>10.2f} ms {summary['requests']:>8} req", file=sys.stderr)
+    return results
+
+
+def save_baseline(results: Dict[str, Dict], path: Path, scale: float) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    baseline = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "latency_scale": scale,
+        "results": results,
+    }
+    path.write_text(json.dumps(baseline, indent=2))
+    print(f"Saved baseline to {path}", file=sys.stderr)
+
+
+def compare(baseline: Dict, results: Dict[str, Dict], threshold: float, request_threshold: float) -> List[str]:
+    """Print a comparison table and return a description of every regression"""
+    regressions = []
+    print(f"\n{'benchmark':<44}{'baseline ms':>12}{'current ms':>12}{'change':>9}{'req':>14}")
+    for name, current in results.items():
+        previous = baseline["results"].get(name)
+        if previous is None:
+            print(f"{name:<44}{'-':>12}{current['p50_ms']:>12.2f}{'new':>9}")
+            continue
+
+        change = current["p50_ms"] / previous["p50_ms"] - 1 if previous["p50_ms"] else 0.0
+        requests = ""
+        if "requests" in current:
+            requests = f"{previous.get('requests', '-')} -> {current['requests']}"
+            allowed = previous.get("requests", current["requests"]) * (1 + request_threshold)
+            if current["requests"] > allowed:
+                regressions.append(f"{name}: {requests} requests per run")
+        if change > threshold:
+            regressions.append(f"{name}: median {previous['p50_ms']:.2f} -> {current['p50_ms']:.2f} ms ({change:+.0%})")
+        print(f"{name:<44}{previous['p50_ms']:>12.2f}{current['p50_ms']:>12.2f}{change:>+9.0%}{requests:>14}")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Service-layer benchmarks")
+    parser.add_argument("command", choices=["run", "compare"])
+    parser.add_argument("--only", nargs="*", help="Benchmark name prefixes, e.g. micro. or macro.push")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--save", action="store_true", help="With run: write the results as the baseline")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed median slowdown, 0.2 = 20%%")
+    parser.add_argument("--request-threshold", type=float, default=0.0, help="Allowed growth in requests per run")
+    parser.add_argument("--micro-repeats", type=int, default=15)
+    parser.add_argument("--macro-repeats", type=int, default=5)
+    parser.add_argument("--latency-scale", type=float, help="Fraction of the estimated upstream latencies to sleep for")
+    args = parser.parse_args()
+
+    configure_logging({"": "WARNING", "services": "WARNING", "components": "WARNING"})
+
+    baseline = None
+    scale = args.latency_scale or DEFAULT_LATENCY_SCALE
+    if args.command == "compare":
+        if not args.baseline.exists():
+            parser.error(f"No baseline at {args.baseline}; record one with `run --save`")
+        baseline = json.loads(args.baseline.read_text())
+        # Replay at the baseline's scale unless told otherwise, or the numbers aren't comparable
+        scale = args.latency_scale or baseline.get("latency_scale", DEFAULT_LATENCY_SCALE)
+
+    results = run_benchmarks(args.only, args.micro_repeats, args.macro_repeats, scale)
+
+    if args.command == "run":
+        if args.save:
+            save_baseline(results, args.baseline, scale)
+        else:
+            print(json.dumps(results, indent=2))
+        return
+
+    regressions = compare(baseline, results, args.threshold, args.request_threshold)
+    if regressions:
+        print("\nRegressions:", file=sys.stderr)
+        for regression in regressions:
+            print(f"  {regression}", file=sys.stderr)
+        sys.exit(1)
+    print("\nNo regressions", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
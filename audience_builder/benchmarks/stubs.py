@@ -0,0 +1,174 @@
+import itertools
+import threading
+import time
+from collections import Counter
+from types import SimpleNamespace
+from typing import Dict, Optional
+from loadtest.fake_server import assistant_reply, structured_content
+
+# Hand-picked estimates of typical latency per upstream call, not measurements.
+# Benchmarks sleep for these, scaled down; only their relative sizes matter for
+# comparing runs against a saved baseline.
+ESTIMATED_LATENCIES_MS = {
+    "chat.completions": 1800,
+    "threads.create": 180,
+    "messages.create": 140,
+    "messages.list": 120,
+    "runs.create": 220,
+    "runs.retrieve": 90,
+    "runs.cancel": 110,
+    "run_duration": 7000,
+    "ttd.datagroup": 450,
+    "ttd.audience": 600,
+}
+
+
+class StubUpstream:
+    """Shared clock and call counter for the stub clients"""
+
+    def __init__(self, latencies_ms: Dict[str, float], scale: float):
+        self.latencies_ms = latencies_ms
+        self.scale = scale
+        self.calls: Counter = Counter()
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+
+    def call(self, endpoint: str) -> None:
+        with self._lock:
+            self.calls[endpoint] += 1
+        time.sleep(self.latencies_ms[endpoint] / 1000 * self.scale)
+
+    def seconds(self, endpoint: str) -> float:
+        return self.latencies_ms[endpoint] / 1000 * self.scale
+
+    def new_id(self, prefix: str) -> str:
+        with self._lock:
+            return f"{prefix}_{next(self._ids)}"
+
+    def total_calls(self, exclude=()) -> int:
+        with self._lock:
+            return sum(count for endpoint, count in self.calls.items() if endpoint not in exclude)
+
+    def reset(self) -> None:
+        with self._lock:
+            self.calls.clear()
+
+
+class _Page(list):
+    @property
+    def data(self):
+        return list(self)
+
+
+def _message(message_id: str, role: str, text: str, run_id: Optional[str] = None) -> SimpleNamespace:
+    return SimpleNamespace(
+        id=message_id,
+        role=role,
+        run_id=run_id,
+        content=[SimpleNamespace(text=SimpleNamespace(value=text))],
+    )
+
+
+class StubOpenAI:
+    """In-process stand-in for the parts of the OpenAI client the services call"""
+
+    def __init__(self, upstream: StubUpstream):
+        self.upstream = upstream
+        self._threads: Dict[str, list] = {}
+        self._runs: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+        self.beta = SimpleNamespace(
+            chat=SimpleNamespace(completions=SimpleNamespace(parse=self._parse)),
+            threads=SimpleNamespace(
+                create=self._create_thread,
+                messages=SimpleNamespace(create=self._create_message, list=self._list_messages),
+                runs=SimpleNamespace(create=self._create_run, retrieve=self._retrieve_run, cancel=self._cancel_run),
+            ),
+        )
+
+    def _parse(self, model, messages, response_format, **kwargs):
+        self.upstream.call("chat.completions")
+        parsed = response_format.model_validate(structured_content(response_format.__name__, messages))
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(parsed=parsed))], usage=None)
+
+    def _create_thread(self, messages=None, **kwargs):
+        self.upstream.call("threads.create")
+        thread_id = self.upstream.new_id("thread")
+        with self._lock:
+            self._threads[thread_id] = [
+                _message(self.upstream.new_id("msg"), m["role"], m["content"]) for m in messages or []
+            ]
+        return SimpleNamespace(id=thread_id)
+
+    def _create_message(self, thread_id, role, content, **kwargs):
+        self.upstream.call("messages.create")
+        message = _message(self.upstream.new_id("msg"), role, content)
+        with self._lock:
+            self._threads.setdefault(thread_id, []).append(message)
+        return message
+
+    def _list_messages(self, thread_id, order="desc", limit=20, after=None, run_id=None, **kwargs):
+        self.upstream.call("messages.list")
+        with self._lock:
+            messages = list(self._threads.get(thread_id, []))
+        if run_id:
+            messages = [m for m in messages if m.run_id == run_id]
+        if order == "desc":
+            messages.reverse()
+        if after:
+            ids = [m.id for m in messages]
+            messages = messages[ids.index(after) + 1:] if after in ids else []
+        return _Page(messages[:limit])
+
+    def _create_run(self, thread_id, assistant_id, **kwargs):
+        self.upstream.call("runs.create")
+        run_id = self.upstream.new_id("run")
+        with self._lock:
+            prompt = self._threads[thread_id][-1].content[0].text.value
+            self._runs[run_id] = {
+                "thread_id": thread_id,
+                "done_at": time.monotonic() + self.upstream.seconds("run_duration"),
+                "reply": assistant_reply(prompt),
+                "status": "queued",
+            }
+        return self._run(run_id)
+
+    def _retrieve_run(self, thread_id, run_id, **kwargs):
+        self.upstream.call("runs.retrieve")
+        with self._lock:
+            run = self._runs[run_id]
+            if run["status"] in ("queued", "in_progress") and time.monotonic() >= run["done_at"]:
+                run["status"] = "completed"
+                self._threads[thread_id].append(
+                    _message(self.upstream.new_id("msg"), "assistant", run["reply"], run_id=run_id)
+                )
+            elif run["status"] == "queued":
+                run["status"] = "in_progress"
+        return self._run(run_id)
+
+    def _cancel_run(self, thread_id, run_id, **kwargs):
+        self.upstream.call("runs.cancel")
+        with self._lock:
+            self._runs[run_id]["status"] = "cancelled"
+        return self._run(run_id)
+
+    def _run(self, run_id: str) -> SimpleNamespace:
+        run = self._runs[run_id]
+        return SimpleNamespace(id=run_id, status=run["status"], last_error=None, usage=None)
+
+
+class _StubResource:
+    def __init__(self, upstream: StubUpstream, endpoint: str, id_field: str):
+        self.upstream = upstream
+        self.endpoint = endpoint
+        self.id_field = id_field
+
+    def create(self, api_object):
+        self.upstream.call(self.endpoint)
+        return SimpleNamespace(**{self.id_field: self.upstream.new_id(self.id_field)})
+
+
+class StubTTDClient:
+    def __init__(self, upstream: StubUpstream):
+        self.data_groups = _StubResource(upstream, "ttd.datagroup", "DataGroupId")
+        self.audiences = _StubResource(upstream, "ttd.audience", "AudienceId")
@@ -1,11 +1,18 @@
 import streamlit as st
 from services.openai_service import OpenAIService
 from services.state_service import StateService
+from services.segment_service import SegmentService
+from services.segment_stream import SegmentStreamParser
+from services.logging_pipeline import summarize
 import json
 import logging
+from typing import Optional
 
 logger = logging.getLogger(__name__)
 
+# Shares the process-wide catalog; used to check segment IDs in assistant replies
+segment_service = SegmentService()
+
 def render_group_chat(openai_service: OpenAIService):
     if not st.session_state.active_group_id:
         st.info("Select a data group from the sidebar or create a new one")
@@ -49,30 +56,78 @@ def render_group_chat(openai_service: OpenAIService):
                         )
                         print(st.session_state.selected_kpi)
                         StateService.set_group_assistant(group_id, assistant_id)
-                        
-                        response = openai_service.send_assistant_message(
-                            thread_id=thread_id,
-                            content=prompt,
-                            assistant_id=assistant_id
+                        send_and_display(
+                            openai_service, thread_id, prompt, assistant_id, group,
+                            additional_instructions=openai_service.candidate_instructions(prompt, classification, assistant_id)
                         )
-                        if response:
-                            display_group_definition(response, group)
-                            st.rerun()
                 else:
                     # Follow-up message - always use assistant
-                    response = openai_service.send_assistant_message(
-                        thread_id=thread_id,
-                        content=prompt,
-                        assistant_id=group["assistant_id"]
-                    )
-                    if response:
-                        display_group_definition(response, group)
-                        st.rerun()
+                    send_and_display(openai_service, thread_id, prompt, group["assistant_id"], group)
+
+def send_and_display(
+    openai_service: OpenAIService,
+    thread_id: str,
+    prompt: str,
+    assistant_id: str,
+    group: dict,
+    additional_instructions: Optional[str] = None
+) -> None:
+    try:
+        if openai_service.stream_replies:
+            deltas = openai_service.stream_assistant_message(
+                thread_id=thread_id,
+                content=prompt,
+                assistant_id=assistant_id,
+                additional_instructions=additional_instructions
+            )
+            response = stream_group_definition(deltas)
+        else:
+            response = openai_service.send_assistant_message(
+                thread_id=thread_id,
+                content=prompt,
+                assistant_id=assistant_id,
+                additional_instructions=additional_instructions
+            )
+    except Exception as e:
+        # Already logged by the service; a partially streamed reply stays on screen above this
+        st.error(f"The assistant could not reply: {str(e)}")
+        return
+    
+    if not response:
+        st.error("The assistant did not reply. Please try again.")
+        return
+    # Streamed segments were already rendered, so only update state
+    display_group_definition(response, group, render=not openai_service.stream_replies)
+    st.rerun()
+
+def stream_group_definition(deltas) -> str:
+    """Render segment cards as soon as each one is complete, returning the full reply text"""
+    parser = SegmentStreamParser()
+    header = st.empty()
+    preview = st.empty()
+    
+    for delta in deltas:
+        completed = parser.feed(delta)
+        if parser.group_name:
+            header.markdown(f"### {parser.group_name}")
+            preview.empty()
+        else:
+            # Show raw text until the reply turns out to be a group definition
+            preview.markdown(parser.text)
+        for segment in completed:
+            # Check each card before showing it, as display_group_definition does for whole replies
+            segments, issues = segment_service.validate_segments([segment])
+            for issue in issues:
+                st.warning(issue.message)
+            for checked in segments:
+                render_segment(checked)
+    
+    return parser.text
 
 def classify_and_select_assistant(prompt: str, openai_service: OpenAIService) -> str:
     try:
         classification, segments = openai_service.classify_data_group(prompt)
-        logger.info(f"Classification: {classification.model_dump()}")
+        logger.info("Classification: %s", summarize(classification))
         
         if segments:
             # Create new thread with context
@@ -86,32 +141,56 @@ def classify_and_select_assistant(prompt: str, openai_service: OpenAIService) ->
             
         return openai_service.get_assistant_for_classification(classification)
     except Exception as e:
-        logger.error(f"Error in classification: {str(e)}")
+        logger.error("Error in classification: %s", e)
         return openai_service.general_assistant_id
 
-def display_group_definition(response_text: str, group: dict) -> None:
+def parse_group_definition(response_text: str) -> dict:
+    if response_text.startswith('```json'):
+        response_text = response_text.split('```json\n')[1].split('```')[0]
+    return json.loads(response_text)
+
+def render_segment(segment: dict) -> None:
+    st.markdown(
+        f"**{segment.get('full_path', 'Unnamed segment')}**\n\n"
+        f"{segment.get('description', '')}\n\n"
+        f"ID: `{segment.get('id', 'Not specified')}`"
+    )
+
+def merge_manual_segments(segments: list, manual_segments: list) -> list:
+    """The assistant's segments plus any added from the segment browser that it didn't include"""
+    ids = {segment.get('id') for segment in segments}
+    return segments + [segment for segment in manual_segments if segment.get('id') not in ids]
+
+def display_group_definition(response_text: str, group: dict, render: bool = True) -> None:
     try:
-        if response_text.startswith('```json'):
-            response_text = response_text.split('```json\n')[1].split('```')[0]
-        
-        group_data = json.loads(response_text)
+        group_data = parse_group_definition(response_text)
         
         # Log the segment structure
-        logger.debug(f"Parsed segment data: {json.dumps(group_data.get('segments', []), indent=2)}")
+        logger.debug("Parsed segment data: %s", summarize(group_data.get('segments', [])))
+        
+        # Catch hallucinated IDs now rather than in a failed push; a group re-rendered
+        # from state has already been checked and keeps its original findings
+        segments, issues = segment_service.validate_segments(group_data.get('segments', []))
+        group_data['segments'] = merge_manual_segments(segments, group.get('manual_segments', []))
+        if 'segment_issues' not in group_data:
+            group_data['segment_issues'] = [issue.message for issue in issues]
+            for issue in issues:
+                logger.warning("Segment issue in reply: %s", issue.message)
         
         group.update(group_data)
         st.session_state.audience["data_groups"][st.session_state.active_group_id].update(group_data)
         
+        if not render:
+            return
+        
         # Compact display
         st.markdown(f"### {group_data['group_name']}")
+        for message in group_data['segment_issues']:
+            st.warning(message)
         for segment in group_data['segments']:
-            st.markdown(
-                f"**{segment['full_path']}**\n\n"
-                f"{segment['description']}\n\n"
-                f"ID: `{segment.get('id', 'Not specified')}`"
-            )
+            render_segment(segment)
             
     except Exception as e:
-        logger.error(f"Error parsing response: {str(e)}")
+        logger.error("Error parsing response: %s", e)
         st.error(f"Error parsing response: {str(e)}")
         st.code(response_text)
\ No newline at end of file
@@ -0,0 +1,77 @@
+import streamlit as st
+import logging
+from typing import Tuple
+from services.segment_service import SegmentService
+from services.segment_taxonomy import TaxonomyEntry
+from services.state_service import StateService
+
+logger = logging.getLogger(__name__)
+
+# Keeps a category with thousands of segments quick to render
+MAX_LISTED = 50
+
+def render_segment_browser(segment_service: SegmentService, group_id: str):
+    """Browse the segment taxonomy, or autocomplete a path, and add segments to the group directly"""
+    path_key = f"segment_browser_path_{group_id}"
+    search_key = f"segment_browser_search_{group_id}"
+    if path_key not in st.session_state:
+        st.session_state[path_key] = ()
+
+    with st.expander("Browse segments"):
+        query = st.text_input(
+            "Find a segment",
+            key=search_key,
+            placeholder="Age Range > 2",
+            help="Type the start of any category or segment name, or a path separated by '>'"
+        )
+
+        if query:
+            entries = segment_service.complete_segment_path(query, limit=MAX_LISTED)
+            if not entries:
+                st.caption("No matching segments")
+        else:
+            path = st.session_state[path_key]
+            if path:
+                st.caption(" > ".join(path))
+                st.button("⬆️ Up", key=f"segment_browser_up_{group_id}", on_click=open_path,
+                          args=(path_key, search_key, path[:-1]))
+            entries = segment_service.browse_segments(path)[:MAX_LISTED]
+
+        for entry in entries:
+            render_entry(segment_service, group_id, entry, path_key, search_key)
+
+def render_entry(segment_service: SegmentService, group_id: str, entry: TaxonomyEntry, path_key: str, search_key: str):
+    key = f"segment_browser_{group_id}_{entry.full_path}"
+    if entry.segment_id:
+        st.button(
+            f"➕ {entry.name}",
+            key=f"{key}_add",
+            help=entry.full_path,
+            use_container_width=True,
+            on_click=add_segment,
+            args=(segment_service, group_id, entry.segment_id)
+        )
+    # A segment can also be a category with segments of its own below it
+    if entry.size > (1 if entry.segment_id else 0):
+        st.button(
+            f"📂 {entry.name} ({entry.size})",
+            key=f"{key}_open",
+            help=entry.full_path,
+            use_container_width=True,
+            on_click=open_path,
+            args=(path_key, search_key, entry.path)
+        )
+
+def open_path(path_key: str, search_key: str, path: Tuple[str, ...]):
+    st.session_state[path_key] = tuple(path)
+    st.session_state[search_key] = ""
+
+def add_segment(segment_service: SegmentService, group_id: str, segment_id: str):
+    segment = segment_service.get_segment(segment_id)
+    if segment is None:
+        logger.warning("Segment %s disappeared from the catalog", segment_id)
+        return
+    if StateService.add_group_segment(group_id, segment):
+        st.toast(f"Added {segment['full_path'].split(' > ')[-1]}")
+    else:
+        st.toast("Segment is already in this group")
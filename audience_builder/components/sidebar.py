@@ -2,13 +2,23 @@ import streamlit as st
 from services.state_service import StateService
 from services.openai_service import OpenAIService
 from components.chat import display_group_definition  # Import the display function
+from components.segment_browser import render_segment_browser
 import logging
+from models.push import GroupPushResult, PushResult
 from services.ttd_interface import TTDInterfaceService
+from services.http_pool import pool_stats
+from services.push_jobs import PushJob, get_push_jobs
+from services.request_scheduler import get_scheduler
+from services.tracing import current_span, span, waterfall
+from services.logging_pipeline import dropped_records, lazy
 
 logger = logging.getLogger(__name__)
 
+# How often the sidebar refreshes a running push's progress
+PUSH_POLL_SECONDS = 1.0
+
 def render_sidebar(state_service: StateService, openai_service: OpenAIService, ttd_service: TTDInterfaceService):
-    logger.debug(f"Session state at start: {st.session_state}")
+    logger.debug("Session state keys at start: %s", lazy(lambda: sorted(st.session_state.keys())))
     
     with st.sidebar:
         st.title("Audience Settings")
@@ -28,7 +38,7 @@ def render_sidebar(state_service: StateService, openai_service: OpenAIService, t
         st.divider()
         
         # Debug log for KPI state
-        logger.debug(f"Selected KPI: {st.session_state.get('selected_kpi')}")
+        logger.debug("Selected KPI: %s", st.session_state.get('selected_kpi'))
         
         # Show KPI selector only if no KPI has been selected
         if st.session_state.selected_kpi is None:
@@ -75,15 +85,20 @@ def render_sidebar(state_service: StateService, openai_service: OpenAIService, t
                             st.session_state.audience["data_groups"] = {}
                             st.session_state.group_threads = {}
                             st.session_state.active_group_id = None
+                            st.session_state.structure_errors = []
                             
                             # Get new structure
                             structured_groups = openai_service.structure_audience(audience_description)
                             st.session_state.audience["audience_name"] = structured_groups.audience_name
                             st.rerun()
                         except Exception as e:
-                            logger.error(f"Error structuring audience: {str(e)}")
+                            logger.error("Error structuring audience: %s", e)
                             st.error("Error creating audience structure. Please try again.")
             
+            # Groups that failed during structuring are reported individually
+            for failure in st.session_state.get("structure_errors", []):
+                st.warning(f"Could not set up group '{failure['group_name']}': {failure['error']}")
+            
             st.title("Group Management")
             
             # Only show create group button if we have a KPI selected
@@ -102,20 +117,102 @@ def render_sidebar(state_service: StateService, openai_service: OpenAIService, t
             # Update the Push button section
             can_push = bool(st.session_state.audience.get('data_groups'))
             
-            if st.button("Push to TradeDesk", 
-                        use_container_width=True,
-                        disabled=not can_push):
-                with st.spinner("Pushing audience to TradeDesk..."):
-                    success, audience_id = ttd_service.push_audience(st.session_state.audience)
-                    if success and audience_id:
-                        st.success("✅ Audience successfully pushed to TTD!")
-                        ttd_url = f"https://desk.thetradedesk.com/app/advertiser/{ttd_service.FIXED_ADVERTISER_ID}/data/audience/{audience_id}/details"
-                        st.markdown(f"[View in TradeDesk]({ttd_url}) ↗️")
-                    else:
-                        st.error("❌ Failed to push audience to TTD")
+            # Pushes run in the background; the job handle survives reruns and navigation
+            job = st.session_state.get("push_job")
+            st.button("Push to TradeDesk", 
+                     use_container_width=True,
+                     disabled=not can_push or (job is not None and not job.done),
+                     on_click=submit_push,
+                     args=(ttd_service,))
+            
+            if job is not None:
+                if job.done:
+                    render_push_result(job.result, ttd_service)
+                else:
+                    st.fragment(render_push_progress, run_every=PUSH_POLL_SECONDS)(job)
             
             if not can_push:
                 st.caption("⚠️ Create at least one group to push")
+        
+        if st.secrets.get("SHOW_DIAGNOSTICS", False):
+            render_diagnostics()
+        
+        if st.secrets.get("SHOW_TIMINGS", False):
+            render_timing_panel()
+
+def submit_push(ttd_service: TTDInterfaceService):
+    # Button callbacks run before main() opens the rerun span, so the push gets a trace of its
+    # own; its spans join it as they finish and the timing panel shows it as the last action
+    with span("push.submit", audience=st.session_state.audience["audience_name"]) as submitted:
+        st.session_state.push_job = get_push_jobs().submit(ttd_service, st.session_state.audience)
+    st.session_state.last_trace = submitted.trace
+
+def render_push_progress(job: PushJob):
+    if job.done:
+        # Rerun the whole app once to show the result and stop polling
+        st.rerun()
+    
+    groups = job.groups()
+    settled = job.settled_count()
+    if settled < len(groups):
+        text = f"Pushing '{job.audience_name}': {settled} of {len(groups)} data groups"
+    else:
+        text = f"Pushing '{job.audience_name}': creating the audience"
+    st.progress(settled / max(len(groups), 1), text=text)
+    for group in groups:
+        st.caption(f"{group_progress_icon(group)} {group.group_name}")
+
+def group_progress_icon(group: GroupPushResult) -> str:
+    if group.failed:
+        return "❌"
+    if group.skipped:
+        return "⏭️"
+    if group.data_group_id:
+        return "✅"
+    return "⏳"
+
+def render_push_result(result: PushResult, ttd_service: TTDInterfaceService):
+    if result.success:
+        st.success("✅ Audience successfully pushed to TTD!")
+        ttd_url = f"https://desk.thetradedesk.com/app/advertiser/{ttd_service.FIXED_ADVERTISER_ID}/data/audience/{result.audience_id}/details"
+        st.markdown(f"[View in TradeDesk]({ttd_url}) ↗️")
+        if result.reused_groups:
+            st.caption(f"Reused {len(result.reused_groups)} existing data groups")
+        if result.resumed_groups:
+            st.caption(f"Resumed {len(result.resumed_groups)} data groups from the previous attempt")
+    else:
+        st.error(f"❌ Failed to push audience to TTD: {result.error}")
+        for group in result.failed_groups:
+            st.warning(f"Group '{group.group_name}' failed: {group.error}")
+        if any(group.data_group_id for group in result.groups):
+            st.caption("Pushing again reuses the data groups already created")
+    for group in result.groups:
+        if group.skipped:
+            st.caption(f"Skipped '{group.group_name}' - no segments defined")
+
+def render_diagnostics():
+    with st.expander("Diagnostics"):
+        st.caption("HTTP connection pools (process-wide)")
+        st.json(pool_stats())
+        st.caption("Push jobs (all sessions)")
+        st.json(get_push_jobs().stats())
+        st.caption("OpenAI request scheduler")
+        st.json(get_scheduler().metrics())
+        st.caption(f"Log records dropped under load: {dropped_records()}")
+
+def render_timing_panel():
+    # Work already finished in this rerun wins over the stored previous action, e.g. a push
+    rerun = current_span()
+    spans = rerun.trace.finished_spans() if rerun else []
+    if not spans:
+        last_trace = st.session_state.get("last_trace")
+        spans = last_trace.finished_spans() if last_trace else []
+    
+    with st.expander("Timings for last action"):
+        if not spans:
+            st.caption("No traced work yet")
+            return
+        st.code(waterfall(spans), language=None)
 
 def render_group_list(openai_service: OpenAIService):
     for group_id, group in st.session_state.audience["data_groups"].items():
@@ -127,23 +224,20 @@ def render_group_list(openai_service: OpenAIService):
             thread_id = st.session_state.group_threads[group_id]
             
             try:
-                # Fetch messages from OpenAI
-                messages = openai_service.get_assistant_messages(thread_id)
-                
-                # Find the most recent assistant message
-                assistant_messages = [m for m in messages if m["role"] == "assistant"]
-                if assistant_messages:
-                    last_message = assistant_messages[-1]["content"]
+                # Most recent assistant message, served from the local cache after the first fetch
+                last_message = openai_service.get_latest_assistant_message(thread_id)
+                if last_message:
                     # Update the group with the segments from the last message
                     display_group_definition(last_message, group)
             except Exception as e:
-                logger.error(f"Error fetching initial group state: {str(e)}")
+                logger.error("Error fetching initial group state: %s", e)
             
             st.rerun()
         
         # Only show controls in sidebar if this is the active group
         if st.session_state.active_group_id == group_id:
             render_group_controls(group_id, group)
+            render_segment_browser(openai_service.segment_service, group_id)
 
 def render_group_controls(group_id, group):
     col1, col2 = st.columns(2)
@@ -154,7 +248,7 @@ def render_group_controls(group_id, group):
         # Initialize session state only once when group is created
         if toggle_key not in st.session_state:
             st.session_state[toggle_key] = current_status == "include"
-            logger.debug(f"Initializing toggle state for {group_id}: {st.session_state[toggle_key]}")
+            logger.debug("Initializing toggle state for %s: %s", group_id, st.session_state[toggle_key])
         
         # Don't pass a default value, rely only on session state
         status = st.toggle(
@@ -182,9 +276,9 @@ def handle_status_change(group_id: str, toggle_key: str):
     new_status = "include" if st.session_state[toggle_key] else "exclude"
     current_status = st.session_state.audience["data_groups"][group_id]["status"]
     
-    logger.info(f"Status change triggered for {group_id}")
-    logger.info(f"Toggle state: {st.session_state[toggle_key]}")
-    logger.info(f"Current status: {current_status}, New status: {new_status}")
+    logger.info("Status change triggered for %s", group_id)
+    logger.info("Toggle state: %s", st.session_state[toggle_key])
+    logger.info("Current status: %s, New status: %s", current_status, new_status)
     
     if new_status != current_status:
         StateService.update_group_status(group_id, new_status)
\ No newline at end of file
@@ -0,0 +1,261 @@
+"""Load-test the service layer against the local fake server.
+
+Run from the audience_builder directory:
+
+    python -m loadtest.driver --sessions 50 --concurrency 10 --profile fast
+
+Each simulated session structures an audience, holds a few chat turns with the
+group assistants and pushes the result, using the same OpenAIService and
+TTDInterfaceService code paths as the app (pooled clients, shared request
+scheduler, classification cache) with only the base URLs swapped.
+"""
+import argparse
+import contextvars
+import json
+import logging
+import random
+import threading
+import time
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+from openai import OpenAI
+from components.chat import parse_group_definition
+from loadtest.fake_server import FakeServer
+from loadtest.fake_ttd import FakeTTDClient
+from loadtest.profiles import PROFILES
+from loadtest.stats import latency_summary
+from services.classification_cache import ClassificationCache
+from services.data_group_cache import DataGroupCache
+from services.http_pool import build_http_client
+from services.logging_pipeline import configure_logging
+from services.openai_service import OpenAIService
+from services.push_journal import PushJournalStore
+from services.request_scheduler import RequestScheduler
+from services.ttd_interface import TTDInterfaceService
+from settings.request_scheduler import REQUEST_SCHEDULER_SETTINGS
+
+logger = logging.getLogger(__name__)
+
+AUDIENCE_DESCRIPTIONS = [
+    "Women aged 25-34 who love outdoor sports and travel",
+    "Affluent home cooks interested in premium kitchen brands",
+    "Frequent travelers aged 35-54, excluding people under 21",
+    "Millennial parents who shop for luxury goods online",
+    "Men over 45 interested in camping and hiking gear",
+]
+
+KPI_METRICS = ["CPA", "CTR", "Viewability"]
+
+CHAT_PROMPTS = [
+    "Narrow this down to the most relevant segments",
+    "Add a segment for people with a strong purchase intent",
+    "Swap in broader segments to increase reach",
+]
+
+_operation: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("loadtest_operation", default=None)
+
+
+class LoadTestRecorder:
+    """Latency, errors and upstream request counts per operation, across all sessions"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.requests: Dict[str, int] = defaultdict(int)
+
+    def count_request(self, *args, **kwargs) -> None:
+        # HTTP hook; pool threads inherit the operation through the copied context
+        operation = _operation.get()
+        if operation is not None:
+            with self._lock:
+                self.requests[operation] += 1
+
+    @contextmanager
+    def measure(self, operation: str):
+        token = _operation.set(operation)
+        started = time.perf_counter()
+        failed = False
+        try:
+            yield
+        except Exception as e:
+            failed = True
+            logger.warning("%s failed: %s", operation, e)
+        finally:
+            elapsed = time.perf_counter() - started
+            _operation.reset(token)
+            with self._lock:
+                self.latencies[operation].append(elapsed)
+                if failed:
+                    self.errors[operation] += 1
+
+    def record_error(self, operation: str) -> None:
+        with self._lock:
+            self.errors[operation] += 1
+
+    def report(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            report = {}
+            for operation, seconds in self.latencies.items():
+                summary = latency_summary(seconds)
+                summary["errors"] = self.errors[operation]
+                summary["requests_per_op"] = round(self.requests[operation] / max(1, len(seconds)), 2)
+                report[operation] = summary
+            return report
+
+
+def build_services(server: FakeServer, recorder: LoadTestRecorder, scheduler_overrides: Dict[str, float]):
+    http_client = build_http_client("openai")
+    hooks = http_client.event_hooks
+    hooks["request"].append(recorder.count_request)
+    http_client.event_hooks = hooks
+    client = OpenAI(api_key="loadtest", base_url=server.openai_base_url, http_client=http_client, max_retries=0)
+
+    openai_service = OpenAIService(client=client)
+    # A private scheduler and cache, so the run neither shares limits with nor pollutes the app's
+    openai_service.scheduler = RequestScheduler(**{**REQUEST_SCHEDULER_SETTINGS, **scheduler_overrides})
+    openai_service.classification_cache = ClassificationCache(db_path=None)
+
+    ttd_client = FakeTTDClient(server.base_url)
+    ttd_service = TTDInterfaceService(
+        client=ttd_client,
+        data_group_cache=DataGroupCache(db_path=None),
+        push_journals=PushJournalStore(directory=None)
+    )
+    ttd_client.session.hooks["response"].append(recorder.count_request)
+    return openai_service, ttd_service
+
+
+def run_session(openai_service: OpenAIService, ttd_service: TTDInterfaceService,
+                recorder: LoadTestRecorder, chat_turns: int, seed: int) -> None:
+    rng = random.Random(seed)
+    description = rng.choice(AUDIENCE_DESCRIPTIONS)
+    kpi_metric = rng.choice(KPI_METRICS)
+
+    structure, results = None, []
+    with recorder.measure("structure_audience"):
+        structure, results = openai_service.plan_audience(description, kpi_metric=kpi_metric)
+    entries = [result["entry"] for result in results if result["entry"]]
+    if not entries:
+        return
+
+    for turn in range(chat_turns):
+        entry = entries[turn % len(entries)]
+        with recorder.measure("chat_turn"):
+            prompt = rng.choice(CHAT_PROMPTS)
+            if openai_service.stream_replies:
+                reply = "".join(openai_service.stream_assistant_message(entry["thread_id"], prompt, entry["assistant_id"]))
+            else:
+                reply = openai_service.send_assistant_message(entry["thread_id"], prompt, entry["assistant_id"])
+            entry["segments"] = parse_group_definition(reply)["segments"]
+
+    # Opening a group in the UI shows its latest reply from the message cache
+    for entry in entries:
+        if not entry["segments"]:
+            reply = openai_service.get_latest_assistant_message(entry["thread_id"])
+            if reply:
+                entry["segments"] = parse_group_definition(reply)["segments"]
+
+    audience = {
+        "audience_name": structure.audience_name,
+        "data_groups": {str(uuid.uuid4()): entry for entry in entries},
+    }
+    with recorder.measure("push_audience"):
+        result = ttd_service.push_audience(audience)
+        if not result.success:
+            recorder.record_error("push_audience")
+
+
+def run_load_test(sessions: int, concurrency: int, chat_turns: int, profile: str, scale: float,
+                  seed: int, stream: bool, scheduler_overrides: Dict[str, float]) -> Dict:
+    server = FakeServer(PROFILES[profile], scale=scale, seed=seed).start()
+    recorder = LoadTestRecorder()
+    try:
+        openai_service, ttd_service = build_services(server, recorder, scheduler_overrides)
+        openai_service.stream_replies = stream
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="loadtest_session") as executor:
+            futures = [
+                executor.submit(run_session, openai_service, ttd_service, recorder, chat_turns, seed + index)
+                for index in range(sessions)
+            ]
+            for future in futures:
+                future.result()
+        elapsed = time.perf_counter() - started
+
+        return {
+            "sessions": sessions,
+            "concurrency": concurrency,
+            "profile": profile,
+            "elapsed_seconds": round(elapsed, 2),
+            "sessions_per_minute": round(sessions / elapsed * 60, 2),
+            "operations": recorder.report(),
+            "server_requests": server.request_counts,
+            "scheduler": openai_service.scheduler.metrics(),
+        }
+    finally:
+        server.stop()
+
+
+def print_report(report: Dict) -> None:
+    print(
+        f"\n{report['sessions']} sessions, concurrency {report['concurrency']}, profile {report['profile']}: "
+        f"{report['elapsed_seconds']}s ({report['sessions_per_minute']} sessions/min)\n"
+    )
+    header = f"{'operation':<20}{'count':>7}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}{'req/op':>8}"
+    print(header)
+    print("-" * len(header))
+    for operation, stats in report["operations"].items():
+        print(
+            f"{operation:<20}{stats['count']:>7}{stats['errors']:>8}{stats['p50_ms']:>10.0f}"
+            f"{stats['p95_ms']:>10.0f}{stats['p99_ms']:>10.0f}{stats['max_ms']:>10.0f}{stats['requests_per_op']:>8}"
+        )
+    print("\nServer requests by endpoint:")
+    for endpoint, count in sorted(report["server_requests"].items()):
+        print(f"  {endpoint:<28}{count:>8}")
+    print("\nScheduler:", json.dumps(report["scheduler"]))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load-test the service layer against a local fake API server")
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=5)
+    parser.add_argument("--chat-turns", type=int, default=2)
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="default")
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiply every fake latency by this factor")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--no-stream", action="store_true", help="Use polled runs instead of streamed replies")
+    parser.add_argument("--rpm", type=float, help="Override the scheduler's requests per minute")
+    parser.add_argument("--tpm", type=float, help="Override the scheduler's tokens per minute")
+    parser.add_argument("--json", help="Also write the report to this file")
+    args = parser.parse_args()
+
+    configure_logging({"": "WARNING", "services": "WARNING", "components": "WARNING", "loadtest": "INFO"})
+    overrides = {}
+    if args.rpm:
+        overrides["requests_per_minute"] = args.rpm
+    if args.tpm:
+        overrides["tokens_per_minute"] = args.tpm
+
+    report = run_load_test(
+        sessions=args.sessions,
+        concurrency=args.concurrency,
+        chat_turns=args.chat_turns,
+        profile=args.profile,
+        scale=args.scale,
+        seed=args.seed,
+        stream=not args.no_stream,
+        scheduler_overrides=overrides,
+    )
+    print_report(report)
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(report, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
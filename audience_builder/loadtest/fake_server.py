@@ -0,0 +1,474 @@
+import itertools
+import json
+import logging
+import math
+import random
+import re
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_GROUPS = [
+    ("Young Adults", "People aged 25-34"),
+    ("Women", "Female identifying individuals"),
+    ("Outdoor Enthusiasts", "People who enjoy hiking, camping and outdoor sports"),
+    ("Frequent Travelers", "People who take several leisure trips a year"),
+    ("Luxury Shoppers", "High income consumers who buy premium brands"),
+    ("Home Cooks", "People interested in recipes and kitchen equipment"),
+]
+
+# Replies are validated against the segment catalog, so the Audience Acuity entries
+# must be real catalog segments or the load test only exercises the invalid-ID path
+SAMPLE_SEGMENTS = [
+    {
+        "full_path": "Custom Segment > Data Alliance > Interests > Outdoor Recreation",
+        "description": "Consumers with a demonstrated interest in outdoor recreation.",
+        "id": "52000101|dataalliance",
+    },
+    {
+        "full_path": "Custom Segment > Data Alliance > Purchase Intent > Travel",
+        "description": "Consumers researching leisure travel.",
+        "id": "52000102|dataalliance",
+    },
+    {
+        "full_path": "Custom Segment > Audience Acuity > Pathlabs > Demographics > Age Range > 25-29",
+        "description": "People who are in the age range of 25-29. Deterministic, self-reported data verified by Truthset.",
+        "id": "15493215|lds210audacu",
+    },
+    {
+        "full_path": "Custom Segment > Audience Acuity > Pathlabs > Demographics > Age Range > 30-34",
+        "description": "People who are in the age range of 30-34. Deterministic, self-reported data verified by Truthset.",
+        "id": "15493219|lds210audacu",
+    },
+    {
+        "full_path": "Custom Segment > Audience Acuity > Pathlabs > Demographics > Age Range > 35-39",
+        "description": "People who are in the age range of 35-39. Deterministic, self-reported data verified by Truthset.",
+        "id": "15493166|lds210audacu",
+    },
+    {
+        "full_path": "Custom Segment > Audience Acuity > Pathlabs > Demographics > Gender > Female",
+        "description": "Individuals who identify as female. Deterministic, self-reported data verified by Truthset.",
+        "id": "15493200|lds210audacu",
+    },
+]
+
+
+class LatencyModel:
+    """Log-normal latency from a median and 95th percentile, plus injected errors"""
+
+    def __init__(self, profile: Dict[str, Dict[str, float]], scale: float = 1.0, seed: Optional[int] = None):
+        self.profile = profile
+        self.scale = scale
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def sample_seconds(self, endpoint: str) -> float:
+        settings = self.profile[endpoint]
+        median = settings["median_ms"] / 1000 * self.scale
+        sigma = math.log(max(settings["p95_ms"], settings["median_ms"]) / settings["median_ms"]) / 1.645
+        with self._lock:
+            return median * math.exp(self._random.gauss(0, sigma))
+
+    def sample_error(self, endpoint: str) -> Optional[int]:
+        settings = self.profile[endpoint]
+        with self._lock:
+            roll = self._random.random()
+        if roll < settings.get("rate_limit_rate", 0.0):
+            return 429
+        if roll < settings.get("rate_limit_rate", 0.0) + settings.get("error_rate", 0.0):
+            return 500
+        return None
+
+
+class FakeState:
+    """Threads, messages and runs held by the fake server"""
+
+    def __init__(self, latency: LatencyModel):
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.threads: Dict[str, List[dict]] = {}
+        self.runs: Dict[str, dict] = {}
+        self._ids = itertools.count(1)
+
+    def new_id(self, prefix: str) -> str:
+        return f"{prefix}_{next(self._ids):08d}"
+
+
+def _message(message_id: str, thread_id: str, role: str, text: str, run_id: Optional[str] = None) -> dict:
+    return {
+        "id": message_id,
+        "object": "thread.message",
+        "created_at": int(time.time()),
+        "thread_id": thread_id,
+        "role": role,
+        "status": "completed",
+        "content": [{"type": "text", "text": {"value": text, "annotations": []}}],
+        "assistant_id": None,
+        "run_id": run_id,
+        "attachments": [],
+        "metadata": {},
+    }
+
+
+def _run(run_id: str, thread_id: str, assistant_id: str, status: str) -> dict:
+    return {
+        "id": run_id,
+        "object": "thread.run",
+        "created_at": int(time.time()),
+        "thread_id": thread_id,
+        "assistant_id": assistant_id,
+        "status": status,
+        "model": "gpt-4o",
+        "instructions": "",
+        "tools": [],
+        "metadata": {},
+        "parallel_tool_calls": True,
+        "usage": None,
+    }
+
+
+def assistant_reply(description: str) -> str:
+    """A group definition in the fenced-JSON shape the assistants return"""
+    rng = random.Random(description)
+    segments = rng.sample(SAMPLE_SEGMENTS, k=rng.randint(1, len(SAMPLE_SEGMENTS)))
+    body = {"group_name": description[:40].title(), "segments": segments}
+    return f"```json\n{json.dumps(body, indent=2)}\n```"
+
+
+def structured_content(schema_name: str, messages: List[dict]) -> dict:
+    """Content for a structured-output completion, chosen by the response_format schema name"""
+    user_content = next((m["content"] for m in reversed(messages) if m["role"] == "user"), "")
+    if schema_name in ("AudienceStructure", "ClassifiedAudienceStructure"):
+        rng = random.Random(user_content)
+        groups = rng.sample(SAMPLE_GROUPS, k=rng.randint(3, 5))
+        data_groups = []
+        for name, description in groups:
+            group = {"name": name, "description": description}
+            if schema_name == "ClassifiedAudienceStructure":
+                group.update({"audience_type": "other", "age_start": None, "age_end": None, "gender": None})
+            data_groups.append(group)
+        return {"audience_name": "Load Test Audience", "data_groups": data_groups}
+
+    classification = {
+        "audience_type": "other",
+        "split_recommended": False,
+        "age_start": None,
+        "age_end": None,
+        "gender": None,
+    }
+    if schema_name == "GroupClassificationBatch":
+        try:
+            count = len(json.loads(user_content))
+        except (ValueError, TypeError):
+            count = 1
+        return {"classifications": [classification] * count}
+    return classification
+
+
+class FakeRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: "FakeHTTPServer"
+
+    ROUTES = [
+        ("POST", re.compile(r"^/v1/chat/completions$"), "chat.completions", "_chat_completion"),
+        ("POST", re.compile(r"^/v1/threads$"), "threads.create", "_create_thread"),
+        ("POST", re.compile(r"^/v1/threads/([^/]+)/messages$"), "messages.create", "_create_message"),
+        ("GET", re.compile(r"^/v1/threads/([^/]+)/messages$"), "messages.list", "_list_messages"),
+        ("POST", re.compile(r"^/v1/threads/([^/]+)/runs$"), "runs.create", "_create_run"),
+        ("GET", re.compile(r"^/v1/threads/([^/]+)/runs/([^/]+)$"), "runs.retrieve", "_retrieve_run"),
+        ("POST", re.compile(r"^/v1/threads/([^/]+)/runs/([^/]+)/cancel$"), "runs.cancel", "_cancel_run"),
+        ("POST", re.compile(r"^/v3/datagroup$"), "ttd.datagroup", "_create_data_group"),
+        ("POST", re.compile(r"^/v3/audience$"), "ttd.audience", "_create_audience"),
+    ]
+
+    def log_message(self, format: str, *args) -> None:
+        logger.debug("fake server: " + format, *args)
+
+    def do_GET(self) -> None:
+        self._dispatch("GET")
+
+    def do_POST(self) -> None:
+        self._dispatch("POST")
+
+    def _dispatch(self, method: str) -> None:
+        parsed = urlparse(self.path)
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length) or b"{}") if length else {}
+        query = {key: values[0] for key, values in parse_qs(parsed.query).items()}
+
+        for route_method, pattern, endpoint, handler in self.ROUTES:
+            match = pattern.match(parsed.path)
+            if route_method == method and match:
+                self.server.count(endpoint)
+                time.sleep(self.server.latency.sample_seconds(endpoint))
+                error = self.server.latency.sample_error(endpoint)
+                if error is not None:
+                    self.server.count(f"{endpoint}.{error}")
+                    self._send_error(error)
+                    return
+                getattr(self, handler)(*match.groups(), body=body, query=query)
+                return
+        self._send_json({"error": {"message": f"No fake route for {method} {parsed.path}"}}, status=404)
+
+    def _send_json(self, payload: Any, status: int = 200, headers: Optional[Dict[str, str]] = None) -> None:
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_error(self, status: int) -> None:
+        message = "Rate limit reached" if status == 429 else "Injected server error"
+        headers = {"retry-after-ms": "500"} if status == 429 else {}
+        self._send_json({"error": {"message": message, "type": "fake_error", "code": None}}, status, headers)
+
+    # OpenAI
+
+    def _chat_completion(self, body: dict, query: dict) -> None:
+        schema = body.get("response_format", {}).get("json_schema", {})
+        content = structured_content(schema.get("name", ""), body.get("messages", []))
+        text = json.dumps(content)
+        prompt_tokens = sum(len(str(m.get("content", ""))) for m in body.get("messages", [])) // 4
+        self._send_json({
+            "id": self.server.state.new_id("chatcmpl"),
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "gpt-4o"),
+            "choices": [{
+                "index": 0,
+                "finish_reason": "stop",
+                "message": {"role": "assistant", "content": text, "refusal": None},
+                "logprobs": None,
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": len(text) // 4,
+                "total_tokens": prompt_tokens + len(text) // 4,
+            },
+        })
+
+    def _create_thread(self, body: dict, query: dict) -> None:
+        state = self.server.state
+        with state.lock:
+            thread_id = state.new_id("thread")
+            state.threads[thread_id] = [
+                _message(state.new_id("msg"), thread_id, m["role"], m["content"])
+                for m in body.get("messages", [])
+            ]
+        self._send_json({
+            "id": thread_id,
+            "object": "thread",
+            "created_at": int(time.time()),
+            "metadata": {},
+            "tool_resources": None,
+        })
+
+    def _create_message(self, thread_id: str, body: dict, query: dict) -> None:
+        state = self.server.state
+        with state.lock:
+            message = _message(state.new_id("msg"), thread_id, body.get("role", "user"), body.get("content", ""))
+            state.threads.setdefault(thread_id, []).append(message)
+        self._send_json(message)
+
+    def _list_messages(self, thread_id: str, body: dict, query: dict) -> None:
+        state = self.server.state
+        with state.lock:
+            messages = list(state.threads.get(thread_id, []))
+        if query.get("run_id"):
+            messages = [m for m in messages if m["run_id"] == query["run_id"]]
+        if query.get("order", "desc") == "desc":
+            messages.reverse()
+        if query.get("after"):
+            ids = [m["id"] for m in messages]
+            messages = messages[ids.index(query["after"]) + 1:] if query["after"] in ids else []
+        limit = int(query.get("limit", 20))
+        page = messages[:limit]
+        self._send_json({
+            "object": "list",
+            "data": page,
+            "first_id": page[0]["id"] if page else None,
+            "last_id": page[-1]["id"] if page else None,
+            "has_more": len(messages) > limit,
+        })
+
+    def _create_run(self, thread_id: str, body: dict, query: dict) -> None:
+        state = self.server.state
+        with state.lock:
+            run_id = state.new_id("run")
+            user_messages = [m for m in state.threads.get(thread_id, []) if m["role"] == "user"]
+            prompt = user_messages[-1]["content"][0]["text"]["value"] if user_messages else ""
+            state.runs[run_id] = {
+                "run": _run(run_id, thread_id, body.get("assistant_id", ""), "queued"),
+                "done_at": time.monotonic() + state.latency.sample_seconds("run_duration"),
+                "reply": assistant_reply(prompt),
+                "additional_instructions": body.get("additional_instructions"),
+            }
+        if body.get("stream"):
+            self._stream_run(run_id)
+        else:
+            self._send_json(state.runs[run_id]["run"])
+
+    def _complete_run(self, run_id: str) -> dict:
+        # Caller holds the state lock
+        state = self.server.state
+        entry = state.runs[run_id]
+        run = entry["run"]
+        if run["status"] in ("queued", "in_progress") and time.monotonic() >= entry["done_at"]:
+            run["status"] = "completed"
+            state.threads.setdefault(run["thread_id"], []).append(
+                _message(state.new_id("msg"), run["thread_id"], "assistant", entry["reply"], run_id=run_id)
+            )
+        elif run["status"] == "queued":
+            run["status"] = "in_progress"
+        return dict(run)
+
+    def _retrieve_run(self, thread_id: str, run_id: str, body: dict, query: dict) -> None:
+        state = self.server.state
+        with state.lock:
+            if run_id not in state.runs:
+                self._send_json({"error": {"message": "No such run"}}, status=404)
+                return
+            run = self._complete_run(run_id)
+        self._send_json(run)
+
+    def _cancel_run(self, thread_id: str, run_id: str, body: dict, query: dict) -> None:
+        state = self.server.state
+        with state.lock:
+            run = state.runs[run_id]["run"]
+            run["status"] = "cancelled"
+            run = dict(run)
+        self._send_json(run)
+
+    def _stream_run(self, run_id: str) -> None:
+        """Server-sent events for a streamed run: the reply arrives in chunks over the run's duration"""
+        state = self.server.state
+        entry = state.runs[run_id]
+        run = entry["run"]
+        thread_id = run["thread_id"]
+        message_id = state.new_id("msg")
+        reply = entry["reply"]
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        def send(event: str, data: Any) -> None:
+            payload = data if isinstance(data, str) else json.dumps(data)
+            self.wfile.write(f"event: {event}\ndata: {payload}\n\n".encode())
+            self.wfile.flush()
+
+        send("thread.run.created", run)
+        message = _message(message_id, thread_id, "assistant", "", run_id=run_id)
+        message["content"] = []
+        message["status"] = "in_progress"
+        send("thread.message.created", message)
+
+        chunks = [reply[i:i + 40] for i in range(0, len(reply), 40)]
+        pause = max(0.0, entry["done_at"] - time.monotonic()) / max(1, len(chunks))
+        for chunk in chunks:
+            time.sleep(pause)
+            send("thread.message.delta", {
+                "id": message_id,
+                "object": "thread.message.delta",
+                "delta": {"content": [{"index": 0, "type": "text", "text": {"value": chunk}}]},
+            })
+
+        completed = _message(message_id, thread_id, "assistant", reply, run_id=run_id)
+        with state.lock:
+            state.threads.setdefault(thread_id, []).append(completed)
+            run["status"] = "completed"
+        send("thread.message.completed", completed)
+        send("thread.run.completed", run)
+        send("done", "[DONE]")
+
+    # The Trade Desk
+
+    def _create_data_group(self, body: dict, query: dict) -> None:
+        if not body.get("ThirdPartyDataIds"):
+            self._send_json({"Message": "ThirdPartyDataIds is required"}, status=400)
+            return
+        self._send_json({**body, "DataGroupId": self.server.state.new_id("dg")})
+
+    def _create_audience(self, body: dict, query: dict) -> None:
+        self._send_json({**body, "AudienceId": self.server.state.new_id("aud")})
+
+
+class FakeHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], latency: LatencyModel):
+        super().__init__(address, FakeRequestHandler)
+        self.latency = latency
+        self.state = FakeState(latency)
+        self.requests: Counter = Counter()
+        self._counter_lock = threading.Lock()
+
+    def count(self, key: str) -> None:
+        with self._counter_lock:
+            self.requests[key] += 1
+
+
+class FakeServer:
+    """Local stand-in for the OpenAI and Trade Desk APIs the app calls.
+
+        server = FakeServer(PROFILES["fast"]).start()
+        client = OpenAI(api_key="test", base_url=server.openai_base_url)
+    """
+
+    def __init__(self, profile: Dict[str, Dict[str, float]], scale: float = 1.0,
+                 seed: Optional[int] = None, host: str = "127.0.0.1", port: int = 0):
+        self.httpd = FakeHTTPServer((host, port), LatencyModel(profile, scale, seed))
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def openai_base_url(self) -> str:
+        return f"{self.base_url}/v1"
+
+    @property
+    def request_counts(self) -> Dict[str, int]:
+        with self.httpd._counter_lock:
+            return dict(self.httpd.requests)
+
+    def start(self) -> "FakeServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="fake_server", daemon=True)
+        self._thread.start()
+        logger.info("Fake API server listening on %s", self.base_url)
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+if __name__ == "__main__":
+    import argparse
+    from loadtest.profiles import PROFILES
+
+    parser = argparse.ArgumentParser(description="Run the fake OpenAI/Trade Desk server on its own")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="default")
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiply every latency by this factor")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    server = FakeServer(PROFILES[args.profile], scale=args.scale, port=args.port).start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
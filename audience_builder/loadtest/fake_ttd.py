@@ -0,0 +1,34 @@
+from types import SimpleNamespace
+from typing import Any, Dict
+import requests
+
+
+def _payload(api_object: Any) -> Dict[str, Any]:
+    # ttd_sdk's ApiObject keeps its fields as attributes
+    if hasattr(api_object, "to_dict"):
+        return api_object.to_dict()
+    return dict(vars(api_object))
+
+
+class _Resource:
+    def __init__(self, session: requests.Session, url: str):
+        self.session = session
+        self.url = url
+
+    def create(self, api_object: Any) -> SimpleNamespace:
+        response = self.session.post(self.url, json=_payload(api_object), timeout=30)
+        response.raise_for_status()
+        return SimpleNamespace(**response.json())
+
+
+class FakeTTDClient:
+    """The slice of ttd_sdk.TTDClient that TTDInterfaceService uses, sent to the fake server.
+
+    It exposes `session` like the SDK does, so TTDInterfaceService sizes and counts
+    its connection pool exactly as it would in production.
+    """
+
+    def __init__(self, base_url: str):
+        self.session = requests.Session()
+        self.data_groups = _Resource(self.session, f"{base_url}/v3/datagroup")
+        self.audiences = _Resource(self.session, f"{base_url}/v3/audience")
@@ -0,0 +1,34 @@
+# Latency and error behaviour of the fake server, per endpoint.
+# Latencies are log-normal, given by their median and 95th percentile in ms.
+# error_rate is the share of requests answered with a 500, rate_limit_rate
+# the share answered with a 429 carrying a retry-after-ms header.
+# run_duration is how long an assistant run stays queued/in_progress.
+
+DEFAULT_PROFILE = {
+    "chat.completions": {"median_ms": 1500, "p95_ms": 4000, "error_rate": 0.005, "rate_limit_rate": 0.01},
+    "threads.create": {"median_ms": 150, "p95_ms": 400, "error_rate": 0.002, "rate_limit_rate": 0.005},
+    "messages.create": {"median_ms": 120, "p95_ms": 300, "error_rate": 0.002, "rate_limit_rate": 0.005},
+    "messages.list": {"median_ms": 100, "p95_ms": 250, "error_rate": 0.002, "rate_limit_rate": 0.005},
+    "runs.create": {"median_ms": 200, "p95_ms": 500, "error_rate": 0.002, "rate_limit_rate": 0.005},
+    "runs.retrieve": {"median_ms": 80, "p95_ms": 200, "error_rate": 0.002, "rate_limit_rate": 0.005},
+    "runs.cancel": {"median_ms": 100, "p95_ms": 250, "error_rate": 0.0, "rate_limit_rate": 0.0},
+    "run_duration": {"median_ms": 6000, "p95_ms": 15000},
+    "ttd.datagroup": {"median_ms": 400, "p95_ms": 1200, "error_rate": 0.005, "rate_limit_rate": 0.0},
+    "ttd.audience": {"median_ms": 500, "p95_ms": 1500, "error_rate": 0.005, "rate_limit_rate": 0.0},
+}
+
+# Same shape at a tenth of the latency and no errors, for quick local runs
+FAST_PROFILE = {
+    endpoint: {
+        **settings,
+        "median_ms": settings["median_ms"] / 10,
+        "p95_ms": settings["p95_ms"] / 10,
+        **({"error_rate": 0.0, "rate_limit_rate": 0.0} if "error_rate" in settings else {}),
+    }
+    for endpoint, settings in DEFAULT_PROFILE.items()
+}
+
+PROFILES = {
+    "default": DEFAULT_PROFILE,
+    "fast": FAST_PROFILE,
+}
@@ -1,27 +1,41 @@
 import streamlit as st
 from services.state_service import StateService
 from services.openai_service import OpenAIService
+from services.async_openai_service import AsyncOpenAIService
+from services.async_bridge import StreamlitAsyncBridge
 from services.ttd_interface import TTDInterfaceService
 from components.sidebar import render_sidebar
 from components.chat import render_group_chat
-import logging
+from services.tracing import span, add_exporter, JsonlSpanExporter
+from services.logging_pipeline import configure_logging
 
 def setup_logging():
-    # Set up root logger
-    logging.basicConfig(
-        level=logging.DEBUG,  # Default to INFO level
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        datefmt='%Y-%m-%d %H:%M:%S'
-    )
-    
-    # Set our app's logger to DEBUG
-    logger = logging.getLogger('audience_builder')
-    logger.setLevel(logging.DEBUG)
-    
-    # Quiet down noisy loggers
-    logging.getLogger('httpx').setLevel(logging.WARNING)
-    logging.getLogger('httpcore').setLevel(logging.WARNING)
-    logging.getLogger('openai').setLevel(logging.WARNING)
+    # Records are written by a background thread; levels per subsystem come from
+    # settings/logging_pipeline.py, overridable with a [log_levels] table in secrets
+    configure_logging(dict(st.secrets.get("log_levels", {})))
+
+def setup_tracing():
+    # Optional offline export, e.g. TRACE_EXPORT_PATH = ".cache/traces.jsonl"
+    export_path = st.secrets.get("TRACE_EXPORT_PATH")
+    if export_path:
+        add_exporter(JsonlSpanExporter(export_path))
+
+# Clients are process-wide: Streamlit reruns the script on every interaction,
+# and rebuilding them each time would throw away their connection pools
+@st.cache_resource
+def get_state_service() -> StateService:
+    return StateService()
+
+@st.cache_resource
+def get_openai_service():
+    if st.secrets.get("OPENAI_ASYNC", False):
+        # Async service, driven from the script thread through the bridge
+        return StreamlitAsyncBridge(AsyncOpenAIService())
+    return OpenAIService()
+
+@st.cache_resource
+def get_ttd_service() -> TTDInterfaceService:
+    return TTDInterfaceService(sandbox=False)  # Always use sandbox for safety
 
 def main():
     setup_logging()
@@ -31,13 +45,23 @@ def main():
         layout="wide"
     )
     
-    state_service = StateService()
-    openai_service = OpenAIService()
-    ttd_service = TTDInterfaceService(sandbox=False)  # Always use sandbox for safety
+    setup_tracing()
+    
+    state_service = get_state_service()
+    openai_service = get_openai_service()
+    ttd_service = get_ttd_service()
     
-    state_service.initialize_state()
-    render_sidebar(state_service, openai_service, ttd_service)
-    render_group_chat(openai_service)
+    # Every span started during this rerun, on any thread, nests under this one
+    rerun = None
+    try:
+        with span("streamlit.rerun") as rerun:
+            state_service.initialize_state()
+            render_sidebar(state_service, openai_service, ttd_service)
+            render_group_chat(openai_service)
+    finally:
+        # Keep the last rerun that did any traced work for the timing panel; st.rerun() lands here too
+        if rerun is not None and len(rerun.trace.finished_spans()) > 1:
+            st.session_state.last_trace = rerun.trace
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -1,6 +1,7 @@
 from pydantic import BaseModel
 from enum import Enum
 from typing import Optional
+from models.classification import AudienceType, Gender, GroupClassification
 
 class DataGroupDefinition(BaseModel):
     description: str
@@ -8,4 +9,23 @@ class DataGroupDefinition(BaseModel):
 
 class AudienceStructure(BaseModel):
     audience_name: str
-    data_groups: list[DataGroupDefinition]
\ No newline at end of file
+    data_groups: list[DataGroupDefinition]
+
+class ClassifiedDataGroupDefinition(DataGroupDefinition):
+    audience_type: AudienceType
+    age_start: Optional[int]
+    age_end: Optional[int]
+    gender: Optional[Gender]
+
+    def to_classification(self) -> GroupClassification:
+        # Groups are already split by dimension when structured, so no further split is needed
+        return GroupClassification(
+            audience_type=self.audience_type,
+            split_recommended=False,
+            age_start=self.age_start,
+            age_end=self.age_end,
+            gender=self.gender
+        )
+
+class ClassifiedAudienceStructure(AudienceStructure):
+    data_groups: list[ClassifiedDataGroupDefinition]
\ No newline at end of file
@@ -16,4 +16,7 @@ class GroupClassification(BaseModel):
     split_recommended: bool
     age_start: Optional[int]
     age_end: Optional[int]
-    gender: Optional[Gender]
\ No newline at end of file
+    gender: Optional[Gender]
+
+class GroupClassificationBatch(BaseModel):
+    classifications: list[GroupClassification]
\ No newline at end of file
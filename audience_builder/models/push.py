@@ -0,0 +1,47 @@
+from pydantic import BaseModel
+from typing import Optional
+
+class GroupPushResult(BaseModel):
+    group_id: str
+    group_name: str
+    status: str
+    data_group_id: Optional[str] = None
+    error: Optional[str] = None
+    # An identical data group, from an earlier push or another group in this one, was used instead of creating one
+    reused: bool = False
+    # Already created by an earlier, failed attempt at this push
+    resumed: bool = False
+    # Groups without segments are left out of the audience rather than failing the push
+    skipped: bool = False
+
+    @property
+    def failed(self) -> bool:
+        return self.error is not None
+
+class PushResult(BaseModel):
+    audience_id: Optional[str] = None
+    groups: list[GroupPushResult] = []
+    error: Optional[str] = None
+    # The audience itself was created by an earlier attempt
+    resumed: bool = False
+
+    @property
+    def success(self) -> bool:
+        return self.audience_id is not None
+
+    @property
+    def reused_groups(self) -> list[GroupPushResult]:
+        return [group for group in self.groups if group.reused]
+
+    @property
+    def resumed_groups(self) -> list[GroupPushResult]:
+        return [group for group in self.groups if group.resumed]
+
+    @property
+    def failed_groups(self) -> list[GroupPushResult]:
+        return [group for group in self.groups if group.failed]
+
+class OrphanCleanupResult(BaseModel):
+    deleted: list[str] = []
+    # data_group_id -> error, for groups kept to retry on the next cleanup
+    failed: dict[str, str] = {}
@@ -0,0 +1,92 @@
+import asyncio
+import concurrent.futures
+import contextvars
+import functools
+import inspect
+import logging
+import threading
+from typing import Any, Awaitable, Optional
+import streamlit as st
+from models.audience import AudienceStructure
+
+logger = logging.getLogger(__name__)
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_lock = threading.Lock()
+
+
+def _get_loop() -> asyncio.AbstractEventLoop:
+    """One long-lived event loop per process.
+    AsyncOpenAI keeps its connection pool on the loop it first ran on, so every
+    coroutine must run on the same loop rather than a fresh asyncio.run().
+    """
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=_loop.run_forever, name="async_bridge", daemon=True)
+            thread.start()
+            logger.info("Started async bridge event loop")
+        return _loop
+
+
+def run_async(coroutine: Awaitable) -> Any:
+    """Run a coroutine on the shared loop and block the calling script thread until it finishes.
+    The task runs in a copy of the caller's context, so spans nest under the current rerun.
+    """
+    loop = _get_loop()
+    context = contextvars.copy_context()
+    result = concurrent.futures.Future()
+
+    def settle(task: asyncio.Task) -> None:
+        if task.cancelled():
+            result.cancel()
+        elif task.exception() is not None:
+            result.set_exception(task.exception())
+        else:
+            result.set_result(task.result())
+
+    def start() -> None:
+        task = context.run(loop.create_task, coroutine)
+        task.add_done_callback(settle)
+
+    loop.call_soon_threadsafe(start)
+    return result.result()
+
+
+class StreamlitAsyncBridge:
+    """Gives an AsyncOpenAIService the blocking interface the components expect.
+
+    Coroutine methods are run on the shared loop; everything else is passed through.
+    structure_audience and process_data_groups are handled here because they use
+    st.session_state, which is only available on the Streamlit script thread.
+    """
+
+    def __init__(self, service):
+        self.service = service
+
+    def __getattr__(self, name: str):
+        attribute = getattr(self.service, name)
+        if not inspect.iscoroutinefunction(attribute):
+            return attribute
+
+        @functools.wraps(attribute)
+        def call(*args, **kwargs):
+            return run_async(attribute(*args, **kwargs))
+        return call
+
+    def structure_audience(self, audience_description: str, max_workers: Optional[int] = None) -> AudienceStructure:
+        structured_groups, results = run_async(
+            self.service.structure_audience(
+                audience_description,
+                kpi_metric=st.session_state.selected_kpi,
+                max_workers=max_workers
+            )
+        )
+        self.service.store_group_results(results)
+        return structured_groups
+
+    def process_data_groups(self, audience_structure: AudienceStructure) -> dict:
+        return run_async(
+            self.service.process_data_groups(audience_structure, kpi_metric=st.session_state.selected_kpi)
+        )
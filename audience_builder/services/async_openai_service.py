@@ -0,0 +1,444 @@
+from typing import List, Dict, Type, Optional, Tuple
+from pydantic import BaseModel
+import asyncio
+import logging
+import random
+import time
+from openai import AsyncOpenAI
+import streamlit as st
+import json
+from models.classification import GroupClassification, GroupClassificationBatch
+from models.audience import DataGroupDefinition, AudienceStructure
+from services.openai_service import OpenAIService
+from services.http_pool import build_async_http_client
+from services.request_scheduler import Priority, request_priority, estimate_tokens
+from services.tracing import span, traced
+from services.logging_pipeline import summarize
+
+logger = logging.getLogger(__name__)
+
+class AsyncOpenAIService(OpenAIService):
+    """OpenAIService whose network calls are coroutines on AsyncOpenAI.
+
+    Configuration, routing and the local/cached classification paths are inherited.
+    Streamlit components drive it through StreamlitAsyncBridge, which runs the
+    coroutines on a shared event loop and keeps session state on the script thread.
+    """
+
+    def __init__(self, client=None, async_client: Optional[AsyncOpenAI] = None):
+        super().__init__(client)
+        self.async_client = async_client or AsyncOpenAI(
+            api_key=st.secrets["OPENAI_API_KEY"],
+            http_client=build_async_http_client("openai"),
+            max_retries=0
+        )
+        logger.info("AsyncOpenAIService initialized")
+
+    async def _arequest(self, function, tokens: int = 0):
+        """Await one OpenAI request through the shared scheduler at the current priority"""
+        return await self.scheduler.acall(function, tokens=tokens)
+
+    @traced("openai.structured_completion")
+    async def get_structured_completion(
+        self,
+        model: str,
+        messages: List[Dict[str, str]],
+        response_format: Type[BaseModel],
+        temperature: Optional[float] = None,
+    ) -> BaseModel:
+        logger.debug("Requesting structured completion from %s", model)
+        try:
+            parsed_response = await self._arequest(
+                lambda: self.async_client.beta.chat.completions.parse(
+                    model=model,
+                    messages=messages,
+                    response_format=response_format,
+                    temperature=temperature or self.temperature,
+                    timeout=self.timeout,
+                    seed=42
+                ),
+                tokens=estimate_tokens(json.dumps(messages))
+            )
+            logger.info("Structured completion successful")
+            return parsed_response.choices[0].message.parsed
+        except Exception as e:
+            logger.error("Error in API call to %s: %s", model, e, exc_info=True)
+            raise
+
+    @traced("openai.create_thread")
+    async def create_thread(self) -> str:
+        logger.debug("Creating new thread")
+        try:
+            thread = await self._arequest(lambda: self.async_client.beta.threads.create())
+            logger.info("Created thread: %s", thread.id)
+            return thread.id
+        except Exception as e:
+            logger.error("Error creating thread: %s", e, exc_info=True)
+            raise
+
+    async def get_assistant_messages(self, thread_id: str):
+        cursor = self.message_cache.cursor(thread_id)
+        logger.debug("Fetching messages for thread %s after %s", thread_id, cursor)
+        try:
+            params = {"thread_id": thread_id, "order": "asc", "limit": 100}
+            if cursor:
+                params["after"] = cursor
+
+            async def fetch():
+                return [
+                    (m.id, self._format_message(m))
+                    async for m in self.async_client.beta.threads.messages.list(**params)
+                ]
+
+            new_messages = await self._arequest(fetch)
+            messages = self.message_cache.append(thread_id, new_messages)
+            return list(reversed(messages))
+        except Exception as e:
+            logger.error("Error fetching messages for thread %s: %s", thread_id, e, exc_info=True)
+            raise
+
+    async def get_latest_assistant_message(self, thread_id: str, run_id: Optional[str] = None) -> Optional[str]:
+        if run_id is None:
+            cached = self.message_cache.latest_assistant(thread_id)
+            if cached is not None:
+                return cached
+
+        try:
+            if run_id:
+                page = await self._arequest(lambda: self.async_client.beta.threads.messages.list(
+                    thread_id=thread_id, run_id=run_id, order="desc", limit=1
+                ))
+            else:
+                page = await self._arequest(lambda: self.async_client.beta.threads.messages.list(
+                    thread_id=thread_id, order="desc", limit=20
+                ))
+            for message in page.data:
+                if message.role == "assistant":
+                    content = self._format_message(message)["content"]
+                    self.message_cache.set_latest_assistant(thread_id, content)
+                    return content
+            return None
+        except Exception as e:
+            logger.error("Error fetching latest message for thread %s: %s", thread_id, e, exc_info=True)
+            raise
+
+    @traced("openai.send_assistant_message")
+    async def send_assistant_message(
+        self,
+        thread_id: str,
+        content: str,
+        assistant_id: str,
+        additional_instructions: Optional[str] = None
+    ) -> Optional[str]:
+        logger.info("Sending message to assistant %s in thread %s", assistant_id, thread_id)
+        try:
+            await self._arequest(lambda: self.async_client.beta.threads.messages.create(
+                thread_id=thread_id,
+                role="user",
+                content=content
+            ))
+            run = await self._arequest(
+                lambda: self.async_client.beta.threads.runs.create(
+                    thread_id=thread_id,
+                    assistant_id=assistant_id,
+                    additional_instructions=additional_instructions
+                ),
+                tokens=estimate_tokens(
+                    content, additional_instructions or "", completion_allowance=self.run_token_allowance
+                )
+            )
+            run = await self.wait_for_run(thread_id, run)
+
+            if run.status == "completed":
+                logger.info("Run completed successfully")
+                return await self.get_latest_assistant_message(thread_id, run_id=run.id)
+
+            self._log_unsuccessful_run(run)
+            if run.status == "requires_action":
+                await self.cancel_run(thread_id, run.id)
+            return None
+
+        except Exception as e:
+            logger.error("Error in assistant communication: %s", e, exc_info=True)
+            raise
+
+    @traced("openai.wait_for_run")
+    async def wait_for_run(self, thread_id: str, run):
+        """Async counterpart of OpenAIService.wait_for_run, sleeping without blocking the loop"""
+        started = time.monotonic()
+        deadline = started + self.run_deadline
+        delay = self.run_poll_initial_delay
+        polls = 0
+
+        while run.status in ["queued", "in_progress"]:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                logger.error("Run %s did not finish within %ss, cancelling", run.id, self.run_deadline)
+                await self.cancel_run(thread_id, run.id)
+                break
+
+            with span("openai.run_poll", run_id=run.id, poll=polls + 1) as poll:
+                await asyncio.sleep(min(random.uniform(delay / 2, delay), remaining))
+                previous_status = run.status
+                run = await self._arequest(lambda: self.async_client.beta.threads.runs.retrieve(
+                    thread_id=thread_id,
+                    run_id=run.id
+                ))
+                poll.set_attribute("status", run.status)
+            polls += 1
+            delay = self._next_poll_delay(delay, status_changed=run.status != previous_status)
+
+        self._record_run_stats(run, polls, started)
+        return run
+
+    async def cancel_run(self, thread_id: str, run_id: str) -> None:
+        try:
+            await self._arequest(lambda: self.async_client.beta.threads.runs.cancel(thread_id=thread_id, run_id=run_id))
+        except Exception as e:
+            logger.warning("Could not cancel run %s: %s", run_id, e)
+
+    @traced("openai.classify_data_group")
+    async def classify_data_group(self, description: str) -> GroupClassification:
+        logger.info("Starting data group classification")
+        try:
+            classification, confidence = self.local_classifier.classify(description)
+            if classification is not None and confidence >= self.local_classification_threshold:
+                logger.info("Classified locally with confidence %s", confidence)
+            else:
+                classification = await self._classify_with_model(description)
+
+            segments = self.resolve_segments(classification)
+            if segments:
+                return classification, segments
+
+            logger.info("Classification complete: %s", summarize(classification))
+            return classification, None
+
+        except Exception as e:
+            logger.error("Error in classification: %s", e, exc_info=True)
+            return self._fallback_classification(), None
+
+    async def _classify_with_model(self, description: str) -> GroupClassification:
+        fingerprint = self.classification_fingerprint()
+        classification = self.classification_cache.get(description, fingerprint)
+        if classification is not None:
+            logger.info("Using cached classification")
+            return classification
+
+        classification = await self.get_structured_completion(
+            model=self.classification_model,
+            messages=self._classification_messages(description),
+            response_format=GroupClassification,
+            temperature=0.0
+        )
+        self.classification_cache.put(description, fingerprint, classification)
+        return classification
+
+    @traced("openai.classify_data_groups")
+    async def classify_data_groups(self, descriptions: List[str]) -> List[GroupClassification]:
+        logger.info("Starting batch classification of %s groups", len(descriptions))
+        classifications, pending = self._classify_without_model(descriptions)
+        if not pending:
+            return classifications
+
+        batch = [descriptions[indexes[0]] for indexes in pending.values()]
+        logger.info("Classifying %s groups in a single request", len(batch))
+        try:
+            result = await self.get_structured_completion(
+                model=self.classification_model,
+                messages=self._batch_classification_messages(batch),
+                response_format=GroupClassificationBatch,
+                temperature=0.0
+            )
+        except Exception as e:
+            logger.error("Error in batch classification: %s", e, exc_info=True)
+            return self._merge_batch(classifications, pending, [self._fallback_classification() for _ in batch])
+
+        batch_classifications = result.classifications
+        if len(batch_classifications) != len(batch):
+            logger.warning(
+                "Batch classification returned %s results for %s descriptions, classifying individually", len(batch_classifications), len(batch)
+            )
+            single_results = await asyncio.gather(*[self.classify_data_group(d) for d in batch])
+            batch_classifications = [classification for classification, _ in single_results]
+        else:
+            self._cache_batch(batch, batch_classifications)
+
+        return self._merge_batch(classifications, pending, batch_classifications)
+
+    async def create_demographic_thread(self, user_prompt: str, segments: dict) -> str:
+        try:
+            assistant_response = {
+                "group_name": segments["group_name"],
+                "segments": segments["segments"]
+            }
+            assistant_content = f"```json\n{json.dumps(assistant_response, indent=2)}\n```"
+            thread = await self._arequest(lambda: self.async_client.beta.threads.create(
+                messages=[
+                    {"role": "user", "content": user_prompt},
+                    {"role": "assistant", "content": assistant_content}
+                ]
+            ))
+            logger.info("Created demographic thread with initial messages: %s", thread.id)
+            self.message_cache.set_latest_assistant(thread.id, assistant_content)
+            return thread.id
+        except Exception as e:
+            logger.error("Error creating demographic thread: %s", e)
+            raise
+
+    async def structure_audience(
+        self,
+        audience_description: str,
+        kpi_metric: Optional[str] = None,
+        max_workers: Optional[int] = None
+    ) -> Tuple[AudienceStructure, List[dict]]:
+        """Async counterpart of structure_audience.
+        Session state can only be written from the script thread, so the group results are
+        returned for the caller (normally StreamlitAsyncBridge) to store.
+        """
+        logger.info("Starting audience structuring")
+        # Tasks spawned by plan_audience inherit the bulk priority from this context
+        with request_priority(Priority.BULK):
+            return await self.plan_audience(audience_description, kpi_metric=kpi_metric, max_workers=max_workers)
+
+    @traced("structure.plan_audience")
+    async def plan_audience(
+        self,
+        audience_description: str,
+        kpi_metric: Optional[str] = None,
+        max_workers: Optional[int] = None
+    ) -> Tuple[AudienceStructure, List[dict]]:
+        prompt, response_format = self._structuring_request()
+        structured_groups = await self.get_structured_completion(
+            model=self.classification_model,
+            messages=[
+                {"role": "system", "content": prompt},
+                {"role": "user", "content": audience_description}
+            ],
+            response_format=response_format
+        )
+        groups = structured_groups.data_groups
+        semaphore = asyncio.Semaphore(max(1, max_workers or self.max_concurrent_groups))
+
+        async def bounded_create_thread() -> str:
+            async with semaphore:
+                return await self.create_thread()
+
+        # Threads don't depend on classification, so create them while the groups are classified
+        if self.classify_during_structuring:
+            classifications = [group.to_classification() for group in groups]
+            thread_results = await asyncio.gather(
+                *[bounded_create_thread() for _ in groups],
+                return_exceptions=True
+            )
+        else:
+            classifications, *thread_results = await asyncio.gather(
+                self.classify_data_groups([group.description for group in groups]),
+                *[bounded_create_thread() for _ in groups],
+                return_exceptions=True
+            )
+            if isinstance(classifications, BaseException):
+                raise classifications
+
+        results = await self._gather_groups(groups, classifications, thread_results, kpi_metric, semaphore)
+        return structured_groups, results
+
+    async def process_groups_concurrently(
+        self,
+        groups: List[DataGroupDefinition],
+        classifications: List[GroupClassification],
+        kpi_metric: Optional[str] = None,
+        max_workers: Optional[int] = None
+    ) -> List[dict]:
+        """Async counterpart of OpenAIService.process_groups_concurrently, bounded by a semaphore.
+        Returns one result per group in the original order, with either an entry or an error.
+        """
+        semaphore = asyncio.Semaphore(max(1, max_workers or self.max_concurrent_groups))
+
+        async def bounded_create_thread() -> str:
+            async with semaphore:
+                return await self.create_thread()
+
+        thread_results = await asyncio.gather(*[bounded_create_thread() for _ in groups], return_exceptions=True)
+        return await self._gather_groups(groups, classifications, thread_results, kpi_metric, semaphore)
+
+    async def _gather_groups(
+        self,
+        groups: List[DataGroupDefinition],
+        classifications: List[GroupClassification],
+        thread_results: List,
+        kpi_metric: Optional[str],
+        semaphore: asyncio.Semaphore
+    ) -> List[dict]:
+        async def bounded_process(group, classification, thread_id):
+            if isinstance(thread_id, BaseException):
+                raise thread_id
+            async with semaphore:
+                return await self._process_group(group, classification, kpi_metric, thread_id)
+
+        outcomes = await asyncio.gather(
+            *[
+                bounded_process(group, classification, thread_id)
+                for group, classification, thread_id in zip(groups, classifications, thread_results)
+            ],
+            return_exceptions=True
+        )
+
+        results = []
+        for group, outcome in zip(groups, outcomes):
+            if isinstance(outcome, BaseException):
+                logger.error("Error processing group '%s': %s", group.name, outcome)
+                results.append(self._group_result(group, error=str(outcome)))
+            else:
+                results.append(self._group_result(group, entry=outcome))
+        return results
+
+    async def _process_group(
+        self,
+        group: DataGroupDefinition,
+        classification: GroupClassification,
+        kpi_metric: Optional[str],
+        thread_id: str
+    ) -> dict:
+        with span("structure.group", group=group.name):
+            segments = self.resolve_segments(classification)
+            assistant_id = self.get_assistant_for_classification(
+                classification=classification,
+                kpi_metric=kpi_metric
+            )
+            await self.send_assistant_message(
+                thread_id=thread_id,
+                content=group.description,
+                assistant_id=assistant_id,
+                additional_instructions=self.candidate_instructions(group.description, classification, assistant_id)
+            )
+        logger.info("Processed group '%s' with assistant %s", group.name, assistant_id)
+        return self._group_entry(group, classification, segments, thread_id, assistant_id)
+
+    async def process_data_groups(self, audience_structure: AudienceStructure, kpi_metric: Optional[str] = None) -> dict:
+        """Async counterpart of OpenAIService.process_data_groups, with the groups processed concurrently.
+        The KPI is passed in because session state is only readable on the script thread.
+        """
+        groups = audience_structure.data_groups
+        classifications = await asyncio.gather(*[self.classify_data_group(group.description) for group in groups])
+        results = await self.process_groups_concurrently(
+            groups,
+            [classification for classification, _ in classifications],
+            kpi_metric=kpi_metric
+        )
+
+        processed = {}
+        for result in results:
+            entry = result["entry"]
+            if entry is None:
+                # The sequential version lets the first failure propagate
+                raise RuntimeError(f"Error processing group '{result['group_name']}': {result['error']}")
+            processed[result["group_id"]] = {
+                "thread_id": entry["thread_id"],
+                "assistant_id": entry["assistant_id"],
+                "classification": entry["classification"],
+                # Cached by send_assistant_message, so this makes no request
+                "response": await self.get_latest_assistant_message(entry["thread_id"]),
+                "segments": entry.get("segments") or []
+            }
+        return processed
@@ -0,0 +1,198 @@
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional, Dict
+from models.classification import GroupClassification
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = Path(__file__).resolve().parent.parent / ".cache"
+DEFAULT_DB_PATH = CACHE_DIR / "classification_cache.sqlite3"
+
+
+class ClassificationCache:
+    """Two-tier cache for classify_data_group results.
+
+    Entries are keyed on the normalized description plus a fingerprint of the
+    classification prompt and model, so editing either one misses automatically.
+    The in-memory tier is a bounded LRU; the SQLite tier survives restarts and
+    applies a TTL and a size cap.
+    """
+
+    def __init__(
+        self,
+        db_path: Optional[Path] = DEFAULT_DB_PATH,
+        max_memory_entries: int = 512,
+        max_disk_entries: int = 10000,
+        ttl_seconds: int = 30 * 24 * 60 * 60
+    ):
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self.ttl_seconds = ttl_seconds
+
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._active_fingerprint = None
+        self._conn = self._connect(db_path) if db_path else None
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _connect(self, db_path: Path) -> Optional[sqlite3.Connection]:
+        try:
+            db_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(db_path), check_same_thread=False)
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS classifications ("
+                "key TEXT PRIMARY KEY, fingerprint TEXT NOT NULL, payload TEXT NOT NULL, "
+                "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            conn.commit()
+            return conn
+        except sqlite3.Error as e:
+            logger.warning("Classification cache disk tier disabled: %s", e)
+            return None
+
+    @staticmethod
+    def normalize(description: str) -> str:
+        return " ".join(description.lower().split()).strip(" .!?")
+
+    @staticmethod
+    def fingerprint(prompt: str, model: str) -> str:
+        return hashlib.sha256(f"{model}\0{prompt}".encode("utf-8")).hexdigest()[:16]
+
+    def _key(self, description: str, fingerprint: str) -> str:
+        normalized = self.normalize(description)
+        return hashlib.sha256(f"{fingerprint}\0{normalized}".encode("utf-8")).hexdigest()
+
+    def _activate(self, fingerprint: str) -> None:
+        # Caller holds the lock. A new prompt/model fingerprint drops everything built with the old one.
+        if fingerprint == self._active_fingerprint:
+            return
+        if self._active_fingerprint is not None:
+            logger.info("Classification prompt or model changed, invalidating cached classifications")
+        self._memory.clear()
+        if self._conn:
+            try:
+                self._conn.execute("DELETE FROM classifications WHERE fingerprint != ?", (fingerprint,))
+                self._conn.commit()
+            except sqlite3.Error as e:
+                logger.warning("Could not purge stale classifications: %s", e)
+        self._active_fingerprint = fingerprint
+
+    def get(self, description: str, fingerprint: str) -> Optional[GroupClassification]:
+        key = self._key(description, fingerprint)
+        now = time.time()
+
+        with self._lock:
+            self._activate(fingerprint)
+
+            cached = self._memory.get(key)
+            if cached is not None:
+                expires_at, payload = cached
+                if expires_at > now:
+                    self._memory.move_to_end(key)
+                    self.memory_hits += 1
+                    return GroupClassification.model_validate_json(payload)
+                del self._memory[key]
+
+            payload = self._disk_get(key, now)
+            if payload is None:
+                self.misses += 1
+                return None
+
+            self.disk_hits += 1
+            self._memory_put(key, payload, now)
+
+        return GroupClassification.model_validate_json(payload)
+
+    def put(self, description: str, fingerprint: str, classification: GroupClassification) -> None:
+        key = self._key(description, fingerprint)
+        payload = classification.model_dump_json()
+        now = time.time()
+
+        with self._lock:
+            self._activate(fingerprint)
+            self._memory_put(key, payload, now)
+            self._disk_put(key, fingerprint, payload, now)
+
+    def _memory_put(self, key: str, payload: str, now: float) -> None:
+        self._memory[key] = (now + self.ttl_seconds, payload)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def _disk_get(self, key: str, now: float) -> Optional[str]:
+        if not self._conn:
+            return None
+        try:
+            row = self._conn.execute(
+                "SELECT payload, created_at FROM classifications WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            payload, created_at = row
+            if created_at + self.ttl_seconds <= now:
+                self._conn.execute("DELETE FROM classifications WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            self._conn.execute("UPDATE classifications SET accessed_at = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            return payload
+        except sqlite3.Error as e:
+            logger.warning("Classification cache read failed: %s", e)
+            return None
+
+    def _disk_put(self, key: str, fingerprint: str, payload: str, now: float) -> None:
+        if not self._conn:
+            return
+        try:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO classifications (key, fingerprint, payload, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, fingerprint, payload, now, now)
+            )
+            # Evict expired rows first, then the least recently used beyond the size cap
+            self._conn.execute("DELETE FROM classifications WHERE created_at <= ?", (now - self.ttl_seconds,))
+            self._conn.execute(
+                "DELETE FROM classifications WHERE key IN ("
+                "SELECT key FROM classifications ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_disk_entries,)
+            )
+            self._conn.commit()
+        except sqlite3.Error as e:
+            logger.warning("Classification cache write failed: %s", e)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            if self._conn:
+                self._conn.execute("DELETE FROM classifications")
+                self._conn.commit()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "memory_entries": len(self._memory)
+            }
+
+
+_shared_cache: Optional[ClassificationCache] = None
+_shared_cache_lock = threading.Lock()
+
+
+def get_classification_cache() -> ClassificationCache:
+    """Process-wide cache shared by every OpenAIService instance"""
+    global _shared_cache
+    with _shared_cache_lock:
+        if _shared_cache is None:
+            _shared_cache = ClassificationCache()
+        return _shared_cache
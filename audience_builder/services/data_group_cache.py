@@ -0,0 +1,158 @@
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+from services.classification_cache import CACHE_DIR
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB_PATH = CACHE_DIR / "data_group_cache.sqlite3"
+
+
+class DataGroupCache:
+    """Content-addressed map from a TradeDesk data group's definition to its DataGroupId.
+
+    Keys hash the advertiser, the sorted segment IDs and the sharing flags, so
+    pushing the same segments again (under any group name, in any order) reuses
+    the data group created the first time. Entries persist in SQLite and expire
+    after a TTL, in case groups are deleted in TradeDesk; db_path=None keeps
+    them in memory only.
+    """
+
+    def __init__(self, db_path: Optional[Path] = DEFAULT_DB_PATH, ttl_seconds: int = 30 * 24 * 60 * 60):
+        self.ttl_seconds = ttl_seconds
+        self._memory: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+        self._conn = self._connect(db_path) if db_path else None
+
+        self.hits = 0
+        self.misses = 0
+
+    def _connect(self, db_path: Path) -> Optional[sqlite3.Connection]:
+        try:
+            db_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(db_path), check_same_thread=False)
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS data_groups ("
+                "key TEXT PRIMARY KEY, data_group_id TEXT NOT NULL, advertiser_id TEXT NOT NULL, "
+                "group_name TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            conn.commit()
+            return conn
+        except sqlite3.Error as e:
+            logger.warning("Data group cache disk tier disabled: %s", e)
+            return None
+
+    @staticmethod
+    def key(
+        advertiser_id: str,
+        third_party_data_ids: Iterable[str],
+        is_sharable: bool,
+        skip_unauthorized: bool
+    ) -> str:
+        canonical = json.dumps(
+            {
+                "advertiser_id": advertiser_id,
+                "third_party_data_ids": sorted(set(third_party_data_ids)),
+                "is_sharable": is_sharable,
+                "skip_unauthorized": skip_unauthorized,
+            },
+            sort_keys=True,
+            separators=(",", ":"),
+        )
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            cached = self._memory.get(key)
+            if cached is None:
+                cached = self._disk_get(key)
+                if cached is not None:
+                    self._memory[key] = cached
+            if cached is not None and cached[1] + self.ttl_seconds <= now:
+                self._forget(key)
+                cached = None
+            if cached is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return cached[0]
+
+    def put(self, key: str, data_group_id: str, advertiser_id: str, group_name: str) -> None:
+        now = time.time()
+        with self._lock:
+            self._memory[key] = (data_group_id, now)
+            if not self._conn:
+                return
+            try:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO data_groups (key, data_group_id, advertiser_id, group_name, created_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (key, data_group_id, advertiser_id, group_name, now)
+                )
+                self._conn.execute("DELETE FROM data_groups WHERE created_at <= ?", (now - self.ttl_seconds,))
+                self._conn.commit()
+            except sqlite3.Error as e:
+                logger.warning("Data group cache write failed: %s", e)
+
+    def invalidate(self, data_group_id: str) -> None:
+        """Stop reusing a data group, e.g. because TradeDesk no longer accepts it"""
+        with self._lock:
+            for key in [key for key, cached in self._memory.items() if cached[0] == data_group_id]:
+                del self._memory[key]
+            self._disk_delete("data_group_id", data_group_id)
+
+    def _forget(self, key: str) -> None:
+        # Caller holds the lock
+        self._memory.pop(key, None)
+        self._disk_delete("key", key)
+
+    def _disk_delete(self, column: str, value: str) -> None:
+        if not self._conn:
+            return
+        try:
+            self._conn.execute(f"DELETE FROM data_groups WHERE {column} = ?", (value,))
+            self._conn.commit()
+        except sqlite3.Error as e:
+            logger.warning("Data group cache delete failed: %s", e)
+
+    def _disk_get(self, key: str) -> Optional[tuple]:
+        if not self._conn:
+            return None
+        try:
+            row = self._conn.execute(
+                "SELECT data_group_id, created_at FROM data_groups WHERE key = ?", (key,)
+            ).fetchone()
+            return tuple(row) if row else None
+        except sqlite3.Error as e:
+            logger.warning("Data group cache read failed: %s", e)
+            return None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            if self._conn:
+                self._conn.execute("DELETE FROM data_groups")
+                self._conn.commit()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "memory_entries": len(self._memory)}
+
+
+_shared_cache: Optional[DataGroupCache] = None
+_shared_cache_lock = threading.Lock()
+
+
+def get_data_group_cache() -> DataGroupCache:
+    """Process-wide cache shared by every TTDInterfaceService instance"""
+    global _shared_cache
+    with _shared_cache_lock:
+        if _shared_cache is None:
+            _shared_cache = DataGroupCache()
+        return _shared_cache
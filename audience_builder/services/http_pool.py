@@ -0,0 +1,206 @@
+import logging
+import threading
+from typing import Any, Dict, Optional, Tuple
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+import streamlit as st
+from settings.http_pool import HTTP_POOL_SETTINGS
+
+logger = logging.getLogger(__name__)
+
+
+class PoolStats:
+    """Thread-safe request counters for one upstream's connection pool"""
+
+    def __init__(self, upstream: str):
+        self.upstream = upstream
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.errors = 0
+        self._transports = []
+
+    def request_started(self) -> None:
+        with self._lock:
+            self.requests += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+    def request_finished(self, status_code: Optional[int]) -> None:
+        """status_code is None when the request failed without a response, e.g. a connect error or timeout"""
+        with self._lock:
+            self.in_flight = max(0, self.in_flight - 1)
+            if status_code is None or status_code >= 400:
+                self.errors += 1
+
+    def track(self, transport: Any) -> None:
+        self._transports.append(transport)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = {
+                "requests": self.requests,
+                "in_flight": self.in_flight,
+                "max_in_flight": self.max_in_flight,
+                "errors": self.errors,
+            }
+        stats.update(self._connection_counts())
+        return stats
+
+    def _connection_counts(self) -> Dict[str, int]:
+        # httpx doesn't expose its pool publicly; read httpcore's view when it is there
+        total, idle = 0, 0
+        for transport in self._transports:
+            pool = getattr(transport, "_pool", None)
+            for connection in getattr(pool, "connections", []):
+                total += 1
+                if connection.is_idle():
+                    idle += 1
+        return {"connections": total, "idle_connections": idle}
+
+
+class _CountingTransport(httpx.BaseTransport):
+    """Counts each request around the wrapped transport, so failures without a response still finish"""
+
+    def __init__(self, transport: httpx.BaseTransport, stats: PoolStats):
+        self._transport = transport
+        self._stats = stats
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        status_code = None
+        self._stats.request_started()
+        try:
+            response = self._transport.handle_request(request)
+            status_code = response.status_code
+            return response
+        finally:
+            self._stats.request_finished(status_code)
+
+    def close(self) -> None:
+        self._transport.close()
+
+
+class _AsyncCountingTransport(httpx.AsyncBaseTransport):
+    def __init__(self, transport: httpx.AsyncBaseTransport, stats: PoolStats):
+        self._transport = transport
+        self._stats = stats
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        status_code = None
+        self._stats.request_started()
+        try:
+            response = await self._transport.handle_async_request(request)
+            status_code = response.status_code
+            return response
+        finally:
+            self._stats.request_finished(status_code)
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+
+class _CountingAdapter(HTTPAdapter):
+    """HTTPAdapter that counts requests the same way, for requests sessions.
+    requests has no session-wide timeout, so timeout applies to every request sent without one.
+    """
+
+    def __init__(self, stats: PoolStats, timeout: Optional[Tuple[float, float]] = None, **kwargs):
+        self._stats = stats
+        self._timeout = timeout
+        super().__init__(**kwargs)
+
+    def send(self, request, *args, **kwargs):
+        if not args and kwargs.get("timeout") is None:
+            kwargs["timeout"] = self._timeout
+        status_code = None
+        self._stats.request_started()
+        try:
+            response = super().send(request, *args, **kwargs)
+            status_code = response.status_code
+            return response
+        finally:
+            self._stats.request_finished(status_code)
+
+
+_stats: Dict[str, PoolStats] = {}
+_stats_lock = threading.Lock()
+
+
+def _stats_for(upstream: str) -> PoolStats:
+    with _stats_lock:
+        if upstream not in _stats:
+            _stats[upstream] = PoolStats(upstream)
+        return _stats[upstream]
+
+
+def pool_settings(upstream: str) -> Dict[str, float]:
+    settings = dict(HTTP_POOL_SETTINGS[upstream])
+    try:
+        settings.update(st.secrets.get("http_pool", {}).get(upstream, {}))
+    except Exception:
+        # No secrets file, e.g. when running outside `streamlit run`
+        pass
+    return settings
+
+
+def _limits_and_timeout(upstream: str):
+    settings = pool_settings(upstream)
+    limits = httpx.Limits(
+        max_connections=int(settings["max_connections"]),
+        max_keepalive_connections=int(settings["max_keepalive_connections"]),
+        keepalive_expiry=settings["keepalive_expiry"],
+    )
+    timeout = httpx.Timeout(
+        connect=settings["connect_timeout"],
+        read=settings["read_timeout"],
+        write=settings["write_timeout"],
+        pool=settings["pool_timeout"],
+    )
+    return limits, timeout
+
+
+def build_http_client(upstream: str) -> httpx.Client:
+    """A pooled httpx client for one upstream, counted in pool_stats()"""
+    stats = _stats_for(upstream)
+    limits, timeout = _limits_and_timeout(upstream)
+    # The client ignores limits once given a transport, so the pool is sized here
+    transport = httpx.HTTPTransport(limits=limits)
+    client = httpx.Client(transport=_CountingTransport(transport, stats), timeout=timeout)
+    stats.track(transport)
+    logger.info("Built pooled HTTP client for %s: %s", upstream, limits)
+    return client
+
+
+def build_async_http_client(upstream: str) -> httpx.AsyncClient:
+    stats = _stats_for(upstream)
+    limits, timeout = _limits_and_timeout(upstream)
+    transport = httpx.AsyncHTTPTransport(limits=limits)
+    client = httpx.AsyncClient(transport=_AsyncCountingTransport(transport, stats), timeout=timeout)
+    stats.track(transport)
+    logger.info("Built pooled async HTTP client for %s: %s", upstream, limits)
+    return client
+
+
+def configure_requests_session(session: requests.Session, upstream: str) -> None:
+    """Size a requests session's connection pool and timeouts for an upstream and count its traffic"""
+    settings = pool_settings(upstream)
+    stats = _stats_for(upstream)
+    adapter = _CountingAdapter(
+        stats,
+        timeout=(settings["connect_timeout"], settings["read_timeout"]),
+        pool_connections=int(settings["max_keepalive_connections"]),
+        pool_maxsize=int(settings["max_connections"]),
+        pool_block=True,
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    logger.info("Configured pooled requests session for %s", upstream)
+
+
+def pool_stats() -> Dict[str, Dict[str, Any]]:
+    """Counters for every upstream pool in this process"""
+    with _stats_lock:
+        upstreams = list(_stats.values())
+    return {stats.upstream: stats.snapshot() for stats in upstreams}
\ No newline at end of file
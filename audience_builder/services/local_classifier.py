@@ -0,0 +1,171 @@
+import logging
+import re
+from typing import List, Optional, Tuple
+from models.classification import AudienceType, Gender, GroupClassification
+
+logger = logging.getLogger(__name__)
+
+# Generational ranges, kept in sync with CLASSIFICATION_PROMPT
+GENERATION_RANGES = [
+    (re.compile(r"\b(?:gen(?:eration)?[\s-]?z|zoomers?)\b"), (18, 26)),
+    (re.compile(r"\b(?:millennials?|gen(?:eration)?[\s-]?y)\b"), (27, 42)),
+    (re.compile(r"\bgen(?:eration)?[\s-]?x(?:ers)?\b"), (43, 58)),
+    (re.compile(r"\b(?:baby[\s-]+)?boomers?\b"), (59, 77)),
+]
+
+DECADE_WORDS = {
+    "twenties": 20, "thirties": 30, "forties": 40, "fifties": 50,
+    "sixties": 60, "seventies": 70, "eighties": 80,
+}
+
+AGE_RANGE_PATTERN = re.compile(r"\b(?:between\s+)?(\d{2})\s*(?:-|–|—|to|and)\s*(\d{2})\b")
+OPEN_AGE_PATTERN = re.compile(r"\b(\d{2})\s*(?:\+|(?:years?\s+)?(?:and|or)\s+(?:older|over|above|up)\b)")
+DECADE_PATTERN = re.compile(r"\b([1-9])0'?s\b")
+DECADE_WORD_PATTERN = re.compile(r"\b(" + "|".join(DECADE_WORDS) + r")\b")
+# Ambiguous phrasings ("over 50", "under 35") are recognized but never trusted on their own
+LOOSE_AGE_PATTERN = re.compile(r"\b(over|above|older than|under|below|younger than)\s+(\d{2})\b")
+
+FEMALE_PATTERN = re.compile(r"\b(?:females?|wom[ae]n|lad(?:y|ies)|girls)\b")
+MALE_PATTERN = re.compile(r"\b(?:males?|m[ae]n|guys|gentlemen)\b")
+
+# Words that commonly surround a demographic description without changing its meaning
+FILLER_WORDS = {
+    "a", "adult", "adults", "age", "aged", "ages", "all", "an", "and", "are", "as", "audience",
+    "audiences", "between", "consumers", "demographic", "group", "identified", "identify",
+    "identifying", "in", "individual", "individuals", "is", "of", "old", "olds", "or", "people",
+    "person", "persons", "range", "target", "targeting", "the", "their", "to", "users", "who",
+    "year", "years",
+}
+
+MIN_AGE = 13
+MAX_AGE = 120
+
+
+class LocalClassifier:
+    """Deterministic classifier for formulaic demographic descriptions.
+
+    classify() returns a classification together with a confidence between 0 and 1.
+    Confidence is 1.0 only when every word of the description is accounted for by a
+    recognized age or gender expression (or harmless filler), so anything with an
+    interest component is left to the LLM.
+    """
+
+    def classify(self, description: str) -> Tuple[Optional[GroupClassification], float]:
+        text = description.lower()
+        spans: List[Tuple[int, int]] = []
+        ages: List[Tuple[int, Optional[int]]] = []
+        confidence = 1.0
+
+        for pattern, age_range in GENERATION_RANGES:
+            for match in pattern.finditer(text):
+                spans.append(match.span())
+                ages.append(age_range)
+
+        for match in AGE_RANGE_PATTERN.finditer(text):
+            if self._overlaps(match.span(), spans):
+                continue
+            spans.append(match.span())
+            ages.append((int(match.group(1)), int(match.group(2))))
+
+        for match in OPEN_AGE_PATTERN.finditer(text):
+            if self._overlaps(match.span(), spans):
+                continue
+            spans.append(match.span())
+            ages.append((int(match.group(1)), None))
+
+        for match in DECADE_PATTERN.finditer(text):
+            if self._overlaps(match.span(), spans):
+                continue
+            decade = int(match.group(1)) * 10
+            spans.append(match.span())
+            ages.append((decade, decade + 9))
+
+        for match in DECADE_WORD_PATTERN.finditer(text):
+            decade = DECADE_WORDS[match.group(1)]
+            spans.append(match.span())
+            ages.append((decade, decade + 9))
+
+        for match in LOOSE_AGE_PATTERN.finditer(text):
+            if self._overlaps(match.span(), spans):
+                continue
+            spans.append(match.span())
+            bound = int(match.group(2))
+            if match.group(1) in ("over", "above", "older than"):
+                ages.append((bound, None))
+            else:
+                ages.append((18, bound - 1))
+            confidence = min(confidence, 0.6)
+
+        genders = set()
+        for pattern, gender in ((FEMALE_PATTERN, Gender.FEMALE), (MALE_PATTERN, Gender.MALE)):
+            for match in pattern.finditer(text):
+                spans.append(match.span())
+                genders.add(gender)
+
+        if not ages and not genders:
+            return None, 0.0
+
+        # Anything left over that isn't filler means there is more to this group than demographics
+        leftover = self._strip_spans(text, spans)
+        unknown_words = [w for w in re.findall(r"[a-z0-9']+", leftover) if w not in FILLER_WORDS]
+        if unknown_words:
+            confidence = min(confidence, 0.3)
+
+        age_start, age_end = None, None
+        if ages:
+            age_start, age_end, contiguous = self._merge_ages(ages)
+            if not contiguous:
+                confidence = min(confidence, 0.5)
+            if age_start < MIN_AGE or (age_end is not None and (age_end < age_start or age_end > MAX_AGE)):
+                return None, 0.0
+
+        gender = None
+        if len(genders) == 1:
+            gender = genders.pop()
+        elif len(genders) > 1:
+            # "men and women" says nothing about gender targeting
+            confidence = min(confidence, 0.5)
+
+        if age_start is not None:
+            audience_type = AudienceType.AGE_RANGE
+        elif gender is not None:
+            audience_type = AudienceType.GENDER
+        else:
+            return None, 0.0
+
+        classification = GroupClassification(
+            audience_type=audience_type,
+            split_recommended=age_start is not None and gender is not None,
+            age_start=age_start,
+            age_end=age_end,
+            gender=gender
+        )
+        logger.debug("Local classification %s with confidence %s", classification, confidence)
+        return classification, confidence
+
+    @staticmethod
+    def _overlaps(span: Tuple[int, int], spans: List[Tuple[int, int]]) -> bool:
+        return any(span[0] < end and start < span[1] for start, end in spans)
+
+    @staticmethod
+    def _strip_spans(text: str, spans: List[Tuple[int, int]]) -> str:
+        chars = list(text)
+        for start, end in spans:
+            for i in range(start, end):
+                chars[i] = " "
+        return "".join(chars)
+
+    @staticmethod
+    def _merge_ages(ages: List[Tuple[int, Optional[int]]]) -> Tuple[int, Optional[int], bool]:
+        """Union of the recognized ranges, and whether that union has no gaps"""
+        ordered = sorted(ages, key=lambda a: a[0])
+        start, end = ordered[0]
+        contiguous = True
+        for range_start, range_end in ordered[1:]:
+            if end is not None and range_start > end + 1:
+                contiguous = False
+            if end is None or range_end is None:
+                end = None
+            else:
+                end = max(end, range_end)
+        return start, end, contiguous
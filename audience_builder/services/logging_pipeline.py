@@ -0,0 +1,167 @@
+import atexit
+import copy
+import itertools
+import logging
+import queue
+import reprlib
+import threading
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Callable, Dict, Optional
+from settings.logging_pipeline import (
+    LOG_LEVELS,
+    LOG_FORMAT,
+    LOG_DATE_FORMAT,
+    LOG_MAX_MESSAGE_LENGTH,
+    LOG_LARGE_PAYLOAD_SAMPLE_EVERY,
+    LOG_QUEUE_SIZE,
+)
+
+# Arguments of these types can't change after the call, so formatting them is left to the writer thread
+_IMMUTABLE_ARGS = (str, int, float, bool, type(None))
+
+_repr = reprlib.Repr()
+_repr.maxstring = 200
+_repr.maxother = 200
+_repr.maxlist = 20
+_repr.maxdict = 20
+_repr.maxlevel = 3
+
+
+class _Summary:
+    __slots__ = ("value", "limit")
+
+    def __init__(self, value: Any, limit: int = 500):
+        self.value = value
+        self.limit = limit
+
+    def __str__(self) -> str:
+        value = self.value
+        if hasattr(value, "model_dump"):
+            value = value.model_dump()
+        text = value if isinstance(value, str) else _repr.repr(value)
+        if len(text) > self.limit:
+            return f"{text[:self.limit]}... ({len(text) - self.limit} more chars)"
+        return text
+
+    __repr__ = __str__
+
+
+class _Lazy:
+    __slots__ = ("function",)
+
+    def __init__(self, function: Callable[[], Any]):
+        self.function = function
+
+    def __str__(self) -> str:
+        return str(self.function())
+
+    __repr__ = __str__
+
+
+def summarize(value: Any, limit: int = 500) -> _Summary:
+    """Log argument that renders a bounded repr of a large value, and only if the record is emitted.
+
+        logger.debug("Raw response: %s", summarize(response))
+    """
+    return _Summary(value, limit)
+
+
+def lazy(function: Callable[[], Any]) -> _Lazy:
+    """Log argument that calls a function only if the record is emitted"""
+    return _Lazy(function)
+
+
+class TruncatingFormatter(logging.Formatter):
+    def __init__(self, max_length: int, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.max_length = max_length
+
+    def formatMessage(self, record: logging.LogRecord) -> str:
+        if len(record.message) > self.max_length:
+            cut = len(record.message) - self.max_length
+            record.message = f"{record.message[:self.max_length]}... [truncated {cut} chars]"
+        return super().formatMessage(record)
+
+
+class LargePayloadSampler(logging.Filter):
+    """Writes only every Nth over-long message per call site; short messages always pass"""
+
+    def __init__(self, max_length: int, sample_every: int):
+        super().__init__()
+        self.max_length = max_length
+        self.sample_every = max(1, sample_every)
+        self._counters: Dict[tuple, itertools.count] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        # Runs on the writer thread only, so the counters need no lock
+        if len(record.getMessage()) <= self.max_length:
+            return True
+        counter = self._counters.setdefault((record.name, record.lineno), itertools.count())
+        return next(counter) % self.sample_every == 0
+
+
+class DeferredQueueHandler(QueueHandler):
+    """QueueHandler that leaves message formatting to the writer thread when that is safe.
+
+    The stock handler formats every record on the calling thread. Here a record whose
+    arguments are all immutable is queued as-is; anything else (a dict, a pydantic model,
+    session state) is rendered now, since it may change or be unsafe to read from
+    another thread. Tracebacks are always rendered now so no frames are kept alive.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        args = record.args
+        values = args.values() if isinstance(args, dict) else (args or ())
+        if not isinstance(record.msg, str) or not all(isinstance(value, _IMMUTABLE_ARGS) for value in values):
+            record.msg = record.getMessage()
+            record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            # Never block a rerun on logging
+            self.dropped += 1
+
+
+_listener: Optional[QueueListener] = None
+_handler: Optional[DeferredQueueHandler] = None
+_lock = threading.Lock()
+
+
+def configure_logging(levels: Optional[Dict[str, str]] = None) -> None:
+    """Route all logging through one background writer thread and apply per-logger levels.
+    Safe to call on every rerun: the pipeline is built once per process.
+    """
+    global _listener, _handler
+    with _lock:
+        if _listener is None:
+            writer = logging.StreamHandler()
+            writer.setFormatter(TruncatingFormatter(LOG_MAX_MESSAGE_LENGTH, LOG_FORMAT, LOG_DATE_FORMAT))
+            writer.addFilter(LargePayloadSampler(LOG_MAX_MESSAGE_LENGTH, LOG_LARGE_PAYLOAD_SAMPLE_EVERY))
+
+            _handler = DeferredQueueHandler(queue.Queue(LOG_QUEUE_SIZE))
+            root = logging.getLogger()
+            for existing in list(root.handlers):
+                root.removeHandler(existing)
+            root.addHandler(_handler)
+
+            _listener = QueueListener(_handler.queue, writer, respect_handler_level=True)
+            _listener.start()
+            atexit.register(_listener.stop)
+
+    for name, level in {**LOG_LEVELS, **(levels or {})}.items():
+        logging.getLogger(name or None).setLevel(str(level).upper())
+
+
+def dropped_records() -> int:
+    return _handler.dropped if _handler else 0
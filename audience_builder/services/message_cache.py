@@ -0,0 +1,57 @@
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+
+class ThreadMessageCache:
+    """Per-thread local copy of assistant thread messages.
+
+    For each thread it keeps the messages fetched so far, oldest first, together
+    with the id of the newest one, which is used as the `after` cursor for the next
+    fetch. It also keeps the latest assistant reply so that reopening a group needs
+    no request at all. The number of threads is bounded with LRU eviction.
+    """
+
+    def __init__(self, max_threads: int = 1000):
+        self.max_threads = max_threads
+        self._threads: "OrderedDict[str, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _entry(self, thread_id: str) -> Dict:
+        # Caller holds the lock
+        entry = self._threads.get(thread_id)
+        if entry is None:
+            entry = {"messages": [], "cursor": None, "latest_assistant": None}
+            self._threads[thread_id] = entry
+            while len(self._threads) > self.max_threads:
+                self._threads.popitem(last=False)
+        self._threads.move_to_end(thread_id)
+        return entry
+
+    def cursor(self, thread_id: str) -> Optional[str]:
+        with self._lock:
+            entry = self._threads.get(thread_id)
+            return entry["cursor"] if entry else None
+
+    def append(self, thread_id: str, messages: List[Tuple[str, dict]]) -> List[dict]:
+        """Add (message_id, message) pairs fetched after the cursor, returning all messages oldest first"""
+        with self._lock:
+            entry = self._entry(thread_id)
+            for message_id, message in messages:
+                entry["messages"].append(message)
+                entry["cursor"] = message_id
+                if message["role"] == "assistant":
+                    entry["latest_assistant"] = message["content"]
+            return list(entry["messages"])
+
+    def latest_assistant(self, thread_id: str) -> Optional[str]:
+        with self._lock:
+            entry = self._threads.get(thread_id)
+            if entry is None:
+                return None
+            self._threads.move_to_end(thread_id)
+            return entry["latest_assistant"]
+
+    def set_latest_assistant(self, thread_id: str, content: str) -> None:
+        with self._lock:
+            self._entry(thread_id)["latest_assistant"] = content
\ No newline at end of file
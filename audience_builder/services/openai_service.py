@@ -1,29 +1,90 @@
-from typing import List, Dict, Type, Optional
+from typing import Iterator, List, Dict, Type, Optional, Tuple
 from pydantic import BaseModel
+from concurrent.futures import ThreadPoolExecutor
+import contextvars
+from collections import deque
 import logging
+import random
+import time
 from openai import OpenAI
 import streamlit as st
 import json
-from models.classification import GroupClassification, AudienceType
-from models.audience import DataGroupDefinition, AudienceStructure
+from models.classification import GroupClassification, GroupClassificationBatch, AudienceType
+from models.audience import DataGroupDefinition, AudienceStructure, ClassifiedAudienceStructure
+from services.segment_catalog import DEMOGRAPHICS_PATH
 from services.segment_service import SegmentService
-from settings.prompts import CLASSIFICATION_PROMPT, AUDIENCE_STRUCTURE_PROMPT
+from services.classification_cache import ClassificationCache, get_classification_cache
+from services.local_classifier import LocalClassifier
+from services.http_pool import build_http_client
+from services.message_cache import ThreadMessageCache
+from services.request_scheduler import Priority, request_priority, get_scheduler, estimate_tokens
+from services.tracing import span, traced
+from services.logging_pipeline import summarize
+from settings.prompts import (
+    CLASSIFICATION_PROMPT,
+    BATCH_CLASSIFICATION_PROMPT,
+    AUDIENCE_STRUCTURE_PROMPT,
+    CLASSIFIED_AUDIENCE_STRUCTURE_PROMPT,
+    SEGMENT_CANDIDATES_PROMPT
+)
 import uuid
 
 logger = logging.getLogger(__name__)
 
+class RunIncompleteError(Exception):
+    """Raised by stream_assistant_message when the run ends without completing, e.g. failed or expired"""
+
+    def __init__(self, status: str):
+        super().__init__(f"Assistant run ended with status '{status}'")
+        self.status = status
+
 class OpenAIService:
-    def __init__(self):
-        self.client = OpenAI(api_key=st.secrets["OPENAI_API_KEY"])
+    def __init__(self, client: Optional[OpenAI] = None):
+        # One pooled client per service; main() shares the service across sessions
+        # Retries are owned by the shared request scheduler rather than the client
+        self.client = client or OpenAI(
+            api_key=st.secrets["OPENAI_API_KEY"],
+            http_client=build_http_client("openai"),
+            max_retries=0
+        )
+        self.scheduler = get_scheduler()
         self.temperature = 1
         self.timeout = 30
         self.classification_model = "gpt-4o"
+        self.max_concurrent_groups = 4
+        # Stream chat replies into the UI as they are generated
+        self.stream_replies = True
+        # When enabled, the structuring completion also classifies each group
+        self.classify_during_structuring = False
+        self.classification_cache = get_classification_cache()
+        self.local_classifier = LocalClassifier()
+        self.local_classification_threshold = 0.9
+        self.segment_service = SegmentService()
+        # Catalog matches seeded into the first run of an interest group; 0 disables.
+        # Off for now: data/segments only has demographic segments, which are never
+        # offered, so seeding needs interest segments from a provider in
+        # assistant_segment_providers before it can suggest anything
+        self.segment_candidate_limit = 0
+        self.message_cache = ThreadMessageCache()
+        
+        # Run polling: exponential backoff with jitter, bounded by an overall deadline
+        self.run_poll_initial_delay = 0.5
+        self.run_poll_max_delay = 4.0
+        self.run_poll_backoff = 1.5
+        self.run_deadline = 180
+        self.run_stats = deque(maxlen=100)
+        # Token budget reserved in the scheduler for an assistant run's reply and tool use
+        self.run_token_allowance = 2000
         
         # Assistant IDs
         self.acuity_demo_assistant_id = "asst_xic9sXnfwSoTM6kqAURpS0ua"
         self.alliance_demo_assistant_id = "asst_3pONropmZvHLJQSCCg6vnuzo"
         self.acuity_assistant_id = "asst_xic9sXnfwSoTM6kqAURpS0ua"
         self.alliance_assistant_id = "asst_3pONropmZvHLJQSCCg6vnuzo"
+        # Segment provider each assistant searches; assistants not listed get no catalog candidates
+        self.assistant_segment_providers = {
+            self.acuity_assistant_id: "lds210audacu",
+        }
 
         # KPI groupings
         self.conversion_kpis = {'CPA', 'CPL', 'CPCV', 'CPSV', 'Conversion Count', 'ROAS', 'CPC'}
@@ -32,6 +93,11 @@ class OpenAIService:
         
         logger.info("OpenAIService initialized with models and assistants configured")
     
+    def _request(self, function, tokens: int = 0):
+        """Send one OpenAI request through the shared scheduler at the current priority"""
+        return self.scheduler.call(function, tokens=tokens)
+
+    @traced("openai.structured_completion")
     def get_structured_completion(
         self, 
         model: str,
@@ -39,135 +105,456 @@ class OpenAIService:
         response_format: Type[BaseModel],
         temperature: Optional[float] = None,
     ) -> BaseModel:
-        logger.debug(f"Requesting structured completion from {model}")
-        logger.debug(f"Messages: {messages}")
-        logger.debug(f"Response format: {response_format}")
-        logger.debug(f"Temperature: {temperature or self.temperature}")
+        logger.debug("Requesting structured completion from %s", model)
+        logger.debug("Messages: %s", summarize(messages))
+        logger.debug("Response format: %s", response_format)
+        logger.debug("Temperature: %s", temperature or self.temperature)
         
         try:
-            parsed_response = self.client.beta.chat.completions.parse(
-                model=model,
-                messages=messages,
-                response_format=response_format,
-                temperature=temperature or self.temperature,
-                timeout=self.timeout,
-                seed=42
+            parsed_response = self._request(
+                lambda: self.client.beta.chat.completions.parse(
+                    model=model,
+                    messages=messages,
+                    response_format=response_format,
+                    temperature=temperature or self.temperature,
+                    timeout=self.timeout,
+                    seed=42
+                ),
+                tokens=estimate_tokens(json.dumps(messages))
             )
-            logger.info(f"Structured completion successful")
-            logger.debug(f"Raw response: {parsed_response}")
+            logger.info("Structured completion successful")
+            logger.debug("Raw response: %s", summarize(parsed_response))
             return parsed_response.choices[0].message.parsed
         except Exception as e:
-            logger.error(f"Error in API call to {model}: {str(e)}", exc_info=True)
+            logger.error("Error in API call to %s: %s", model, e, exc_info=True)
             raise
 
+    @traced("openai.create_thread")
     def create_thread(self) -> str:
         logger.debug("Creating new thread")
         try:
-            thread_id = self.client.beta.threads.create().id
-            logger.info(f"Created thread: {thread_id}")
+            thread_id = self._request(lambda: self.client.beta.threads.create()).id
+            logger.info("Created thread: %s", thread_id)
             return thread_id
         except Exception as e:
-            logger.error(f"Error creating thread: {str(e)}", exc_info=True)
+            logger.error("Error creating thread: %s", e, exc_info=True)
             raise
 
     def get_assistant_messages(self, thread_id: str):
-        logger.debug(f"Fetching messages for thread: {thread_id}")
+        """All messages in the thread, newest first.
+        Only messages after the locally cached cursor are requested.
+        """
+        cursor = self.message_cache.cursor(thread_id)
+        logger.debug("Fetching messages for thread %s after %s", thread_id, cursor)
         try:
-            messages = self.client.beta.threads.messages.list(thread_id=thread_id)
-            formatted_messages = [{"role": m.role, "content": m.content[0].text.value} for m in messages.data]
-            logger.debug(f"Retrieved {len(formatted_messages)} messages")
-            logger.debug(f"Messages: {formatted_messages}")
-            return formatted_messages
+            params = {"thread_id": thread_id, "order": "asc", "limit": 100}
+            if cursor:
+                params["after"] = cursor
+            # Iterating the page follows has_more across further pages
+            new_messages = self._request(lambda: [
+                (m.id, self._format_message(m))
+                for m in self.client.beta.threads.messages.list(**params)
+            ])
+            messages = self.message_cache.append(thread_id, new_messages)
+            logger.debug("Retrieved %s new messages, %s total", len(new_messages), len(messages))
+            return list(reversed(messages))
         except Exception as e:
-            logger.error(f"Error fetching messages for thread {thread_id}: {str(e)}", exc_info=True)
+            logger.error("Error fetching messages for thread %s: %s", thread_id, e, exc_info=True)
             raise
 
+    def get_latest_assistant_message(self, thread_id: str, run_id: Optional[str] = None) -> Optional[str]:
+        """The newest assistant reply in a thread.
+        With a run_id only that run's message is requested; without one the local cache is
+        used when it has an answer, so reopening a group costs nothing.
+        """
+        if run_id is None:
+            cached = self.message_cache.latest_assistant(thread_id)
+            if cached is not None:
+                logger.debug("Using cached latest message for thread %s", thread_id)
+                return cached
+        
+        try:
+            if run_id:
+                page = self._request(lambda: self.client.beta.threads.messages.list(
+                    thread_id=thread_id, run_id=run_id, order="desc", limit=1
+                ))
+            else:
+                page = self._request(lambda: self.client.beta.threads.messages.list(
+                    thread_id=thread_id, order="desc", limit=20
+                ))
+            for message in page.data:
+                if message.role == "assistant":
+                    content = self._format_message(message)["content"]
+                    self.message_cache.set_latest_assistant(thread_id, content)
+                    return content
+            return None
+        except Exception as e:
+            logger.error("Error fetching latest message for thread %s: %s", thread_id, e, exc_info=True)
+            raise
+
+    @staticmethod
+    def _format_message(message) -> dict:
+        return {"role": message.role, "content": message.content[0].text.value}
+
+    @traced("openai.send_assistant_message")
     def send_assistant_message(
         self, 
         thread_id: str, 
         content: str,
-        assistant_id: str
+        assistant_id: str,
+        additional_instructions: Optional[str] = None
     ) -> Optional[str]:
-        logger.info(f"Sending message to assistant {assistant_id} in thread {thread_id}")
-        logger.debug(f"Message content: {content}")
+        logger.info("Sending message to assistant %s in thread %s", assistant_id, thread_id)
+        logger.debug("Message content: %s", summarize(content))
         
         try:
             # Send the message
-            message = self.client.beta.threads.messages.create(
+            message = self._request(lambda: self.client.beta.threads.messages.create(
                 thread_id=thread_id,
                 role="user",
                 content=content
-            )
-            logger.debug(f"Message created: {message}")
+            ))
+            logger.debug("Message created: %s", message.id)
             
             # Run the assistant
-            logger.debug(f"Starting assistant run")
-            run = self.client.beta.threads.runs.create(
-                thread_id=thread_id,
-                assistant_id=assistant_id
+            logger.debug("Starting assistant run")
+            run = self._request(
+                lambda: self.client.beta.threads.runs.create(
+                    thread_id=thread_id,
+                    assistant_id=assistant_id,
+                    additional_instructions=additional_instructions
+                ),
+                tokens=estimate_tokens(
+                    content, additional_instructions or "", completion_allowance=self.run_token_allowance
+                )
             )
             
             # Wait for completion
-            logger.debug(f"Waiting for run {run.id} to complete")
-            while run.status in ["queued", "in_progress"]:
-                run = self.client.beta.threads.runs.retrieve(
-                    thread_id=thread_id,
-                    run_id=run.id
-                )
-                logger.debug(f"Run status: {run.status}")
+            run = self.wait_for_run(thread_id, run)
             
             if run.status == "completed":
-                logger.info(f"Run completed successfully")
-                messages = self.get_assistant_messages(thread_id)
-                latest_message = messages[0]["content"]
-                logger.debug(f"Latest message: {latest_message}")
+                logger.info("Run completed successfully")
+                latest_message = self.get_latest_assistant_message(thread_id, run_id=run.id)
+                logger.debug("Latest message: %s", summarize(latest_message))
                 return latest_message
-            else:
-                logger.error(f"Assistant run failed with status: {run.status}")
-                logger.error(f"Run details: {run}")
-                return None
+            
+            self._log_unsuccessful_run(run)
+            if run.status == "requires_action":
+                self.cancel_run(thread_id, run.id)
+            return None
                 
         except Exception as e:
-            logger.error(f"Error in assistant communication: {str(e)}", exc_info=True)
+            logger.error("Error in assistant communication: %s", e, exc_info=True)
             raise 
 
+    def stream_assistant_message(
+        self,
+        thread_id: str,
+        content: str,
+        assistant_id: str,
+        additional_instructions: Optional[str] = None
+    ) -> Iterator[str]:
+        """Streaming counterpart of send_assistant_message: yields reply text deltas as they arrive.
+        Raises RunIncompleteError after the last delta if the run does not complete.
+        """
+        logger.info("Streaming message to assistant %s in thread %s", assistant_id, thread_id)
+        logger.debug("Message content: %s", summarize(content))
+        
+        try:
+            self._request(lambda: self.client.beta.threads.messages.create(
+                thread_id=thread_id,
+                role="user",
+                content=content
+            ))
+            
+            # A stream can't be retried once it has yielded, so it only waits for capacity
+            self.scheduler.acquire(
+                tokens=estimate_tokens(
+                    content, additional_instructions or "", completion_allowance=self.run_token_allowance
+                )
+            )
+            started = time.monotonic()
+            reply = []
+            with self.client.beta.threads.runs.stream(
+                thread_id=thread_id,
+                assistant_id=assistant_id,
+                additional_instructions=additional_instructions
+            ) as stream:
+                for delta in stream.text_deltas:
+                    reply.append(delta)
+                    yield delta
+                run = stream.get_final_run()
+            
+            self._record_run_stats(run, 0, started)
+            if run.status == "completed":
+                self.message_cache.set_latest_assistant(thread_id, "".join(reply))
+                return
+            self._log_unsuccessful_run(run)
+            if run.status == "requires_action":
+                self.cancel_run(thread_id, run.id)
+                
+        except Exception as e:
+            logger.error("Error in assistant communication: %s", e, exc_info=True)
+            raise
+        raise RunIncompleteError(run.status)
+
+    @traced("openai.wait_for_run")
+    def wait_for_run(self, thread_id: str, run):
+        """Poll a run until it leaves queued/in_progress or the deadline passes.
+        Sleeps between polls with exponential backoff and jitter, restarting the backoff
+        whenever the run changes status.
+        """
+        started = time.monotonic()
+        deadline = started + self.run_deadline
+        delay = self.run_poll_initial_delay
+        polls = 0
+        
+        logger.debug("Waiting for run %s to complete", run.id)
+        while run.status in ["queued", "in_progress"]:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                logger.error("Run %s did not finish within %ss, cancelling", run.id, self.run_deadline)
+                self.cancel_run(thread_id, run.id)
+                break
+            
+            with span("openai.run_poll", run_id=run.id, poll=polls + 1) as poll:
+                time.sleep(min(random.uniform(delay / 2, delay), remaining))
+                previous_status = run.status
+                run = self._request(lambda: self.client.beta.threads.runs.retrieve(
+                    thread_id=thread_id,
+                    run_id=run.id
+                ))
+                poll.set_attribute("status", run.status)
+            polls += 1
+            logger.debug("Run status: %s", run.status)
+            delay = self._next_poll_delay(delay, status_changed=run.status != previous_status)
+        
+        self._record_run_stats(run, polls, started)
+        return run
+
+    def _next_poll_delay(self, delay: float, status_changed: bool) -> float:
+        if status_changed:
+            return self.run_poll_initial_delay
+        return min(delay * self.run_poll_backoff, self.run_poll_max_delay)
+
+    def _record_run_stats(self, run, polls: int, started: float) -> None:
+        elapsed = time.monotonic() - started
+        self.run_stats.append({
+            "run_id": run.id,
+            "status": run.status,
+            "polls": polls,
+            "seconds": round(elapsed, 2)
+        })
+        logger.info("Run %s ended with status %s after %s polls in %.1fs", run.id, run.status, polls, elapsed)
+
+    @staticmethod
+    def _log_unsuccessful_run(run) -> None:
+        if run.status == "requires_action":
+            # Our assistants don't define function tools, so there is nothing we can submit
+            logger.error("Run %s requested tool outputs we cannot provide, cancelling", run.id)
+        elif run.status == "failed":
+            error = run.last_error
+            logger.error("Assistant run %s failed: %s - %s", run.id, error.code if error else 'unknown', error.message if error else '')
+        elif run.status == "expired":
+            logger.error("Assistant run %s expired before completing", run.id)
+        else:
+            logger.error("Assistant run failed with status: %s", run.status)
+            logger.error("Run details: %s", run)
+
+    def cancel_run(self, thread_id: str, run_id: str) -> None:
+        try:
+            self._request(lambda: self.client.beta.threads.runs.cancel(thread_id=thread_id, run_id=run_id))
+        except Exception as e:
+            logger.warning("Could not cancel run %s: %s", run_id, e)
+
+    @traced("openai.classify_data_group")
     def classify_data_group(self, description: str) -> GroupClassification:
         logger.info("Starting data group classification")
-        logger.debug(f"Input description: {description}")
-        
-        messages = [
-            {"role": "system", "content": CLASSIFICATION_PROMPT},
-            {"role": "user", "content": description}
-        ]
+        logger.debug("Input description: %s", description)
         
         try:
-            classification = self.get_structured_completion(
-                model=self.classification_model,
-                messages=messages,
-                response_format=GroupClassification,
-                temperature=0.0
-            )
+            # Formulaic demographic descriptions are classified locally without an API call
+            classification, confidence = self.local_classifier.classify(description)
+            if classification is not None and confidence >= self.local_classification_threshold:
+                logger.info("Classified locally with confidence %s", confidence)
+            else:
+                classification = self._classify_with_model(description)
             
             # If it's a demographic classification, get segments immediately
-            if classification.audience_type in [AudienceType.AGE_RANGE, AudienceType.GENDER]:
-                segment_service = SegmentService()
-                segments = segment_service.get_segments_for_classification(classification)
-                if segments:
-                    logger.info(f"Found matching segments: {segments}")
-                    return classification, segments
+            segments = self.resolve_segments(classification)
+            if segments:
+                return classification, segments
                 
-            logger.info(f"Classification complete: {classification}")
+            logger.info("Classification complete: %s", summarize(classification))
             return classification, None
             
         except Exception as e:
-            logger.error(f"Error in classification: {str(e)}", exc_info=True)
-            return GroupClassification(
-                audience_type=AudienceType.OTHER,
-                split_recommended=False
-            ), None
+            logger.error("Error in classification: %s", e, exc_info=True)
+            return self._fallback_classification(), None
+
+    @traced("openai.classify_data_groups")
+    def classify_data_groups(self, descriptions: List[str]) -> List[GroupClassification]:
+        """Classify several descriptions with at most one structured completion.
+        Local and cached classifications are resolved first; only the rest are sent to the model.
+        """
+        logger.info("Starting batch classification of %s groups", len(descriptions))
+        classifications, pending = self._classify_without_model(descriptions)
+        if not pending:
+            return classifications
+        
+        batch = [descriptions[indexes[0]] for indexes in pending.values()]
+        logger.info("Classifying %s groups in a single request", len(batch))
+        try:
+            result = self.get_structured_completion(
+                model=self.classification_model,
+                messages=self._batch_classification_messages(batch),
+                response_format=GroupClassificationBatch,
+                temperature=0.0
+            )
+        except Exception as e:
+            logger.error("Error in batch classification: %s", e, exc_info=True)
+            return self._merge_batch(classifications, pending, [self._fallback_classification() for _ in batch])
+        
+        batch_classifications = result.classifications
+        if len(batch_classifications) != len(batch):
+            logger.warning(
+                "Batch classification returned %s results for %s descriptions, classifying individually", len(batch_classifications), len(batch)
+            )
+            batch_classifications = [self.classify_data_group(description)[0] for description in batch]
+        else:
+            self._cache_batch(batch, batch_classifications)
+        
+        return self._merge_batch(classifications, pending, batch_classifications)
+
+    def _classify_without_model(
+        self,
+        descriptions: List[str]
+    ) -> Tuple[List[Optional[GroupClassification]], Dict[str, List[int]]]:
+        """Resolve what the local classifier and cache can answer.
+        Returns the partial classifications and the remaining descriptions' indexes grouped by
+        normalized description, since identical descriptions only need to be classified once.
+        """
+        classifications: List[Optional[GroupClassification]] = [None] * len(descriptions)
+        fingerprint = self.classification_fingerprint()
+        pending: Dict[str, List[int]] = {}
+        
+        for index, description in enumerate(descriptions):
+            classification, confidence = self.local_classifier.classify(description)
+            if classification is None or confidence < self.local_classification_threshold:
+                classification = self.classification_cache.get(description, fingerprint)
+            if classification is not None:
+                classifications[index] = classification
+            else:
+                pending.setdefault(ClassificationCache.normalize(description), []).append(index)
+        
+        return classifications, pending
+
+    @staticmethod
+    def _batch_classification_messages(batch: List[str]) -> List[Dict[str, str]]:
+        return [
+            {"role": "system", "content": BATCH_CLASSIFICATION_PROMPT},
+            {"role": "user", "content": json.dumps(batch)}
+        ]
+
+    def _cache_batch(self, batch: List[str], batch_classifications: List[GroupClassification]) -> None:
+        fingerprint = self.classification_fingerprint()
+        for description, classification in zip(batch, batch_classifications):
+            self.classification_cache.put(description, fingerprint, classification)
+
+    @staticmethod
+    def _merge_batch(
+        classifications: List[Optional[GroupClassification]],
+        pending: Dict[str, List[int]],
+        batch_classifications: List[GroupClassification]
+    ) -> List[GroupClassification]:
+        for classification, indexes in zip(batch_classifications, pending.values()):
+            for index in indexes:
+                classifications[index] = classification
+        return classifications
+
+    def resolve_segments(self, classification: GroupClassification) -> Optional[dict]:
+        """Local segments for demographic classifications, None for everything else"""
+        if classification.audience_type not in [AudienceType.AGE_RANGE, AudienceType.GENDER]:
+            return None
+        segments = self.segment_service.get_segments_for_classification(classification)
+        if segments:
+            logger.info("Found %s matching segments", len(segments.get("segments", [])))
+            return segments
+        return None
+
+    def candidate_instructions(
+        self,
+        description: str,
+        classification: GroupClassification,
+        assistant_id: str
+    ) -> Optional[str]:
+        """Ranked catalog matches for an interest group, as extra instructions for its first run.
+        Only segments from the provider the routed assistant searches are offered, and never
+        demographic ones: demographic groups resolve locally, so an interest group matching
+        them would only be steered to the wrong segments.
+        """
+        if classification.audience_type != AudienceType.OTHER or not self.segment_candidate_limit:
+            return None
+        provider = self.assistant_segment_providers.get(assistant_id)
+        if provider is None:
+            return None
+        try:
+            candidates = self.segment_service.search_segments(
+                description,
+                limit=self.segment_candidate_limit,
+                provider=provider,
+                exclude_path=DEMOGRAPHICS_PATH
+            )
+        except Exception as e:
+            # Candidates only shorten the run; without them the assistant searches on its own
+            logger.warning("Segment search failed, running without candidates: %s", e)
+            return None
+        if not candidates:
+            return None
+        logger.info("Seeding run with %s candidate segments", len(candidates))
+        return SEGMENT_CANDIDATES_PROMPT.format(
+            candidates="\n".join(f"- {c['full_path']} (id: {c['id']})" for c in candidates)
+        )
+
+    @staticmethod
+    def _fallback_classification() -> GroupClassification:
+        return GroupClassification(
+            audience_type=AudienceType.OTHER,
+            split_recommended=False,
+            age_start=None,
+            age_end=None,
+            gender=None
+        )
+
+    def _classify_with_model(self, description: str) -> GroupClassification:
+        fingerprint = self.classification_fingerprint()
+        classification = self.classification_cache.get(description, fingerprint)
+        if classification is not None:
+            logger.info("Using cached classification")
+            return classification
+        
+        classification = self.get_structured_completion(
+            model=self.classification_model,
+            messages=self._classification_messages(description),
+            response_format=GroupClassification,
+            temperature=0.0
+        )
+        self.classification_cache.put(description, fingerprint, classification)
+        return classification
+
+    @staticmethod
+    def _classification_messages(description: str) -> List[Dict[str, str]]:
+        return [
+            {"role": "system", "content": CLASSIFICATION_PROMPT},
+            {"role": "user", "content": description}
+        ]
+
+    def classification_fingerprint(self) -> str:
+        """Identifies the prompt/model pair a cached classification was produced with"""
+        return ClassificationCache.fingerprint(CLASSIFICATION_PROMPT, self.classification_model)
     
     def get_assistant_for_classification(self, classification: GroupClassification, kpi_metric: str = None) -> str:
-        logger.debug(f"Selecting assistant for classification: {classification} and KPI: {kpi_metric}")
+        logger.debug("Selecting assistant for classification: %s and KPI: %s", summarize(classification), kpi_metric)
         
         # First check demographic-based routing
         if classification.audience_type in [AudienceType.AGE_RANGE, AudienceType.GENDER]:
@@ -191,9 +578,10 @@ class OpenAIService:
                 "group_name": segments["group_name"],
                 "segments": segments["segments"]
             }
+            assistant_content = f"```json\n{json.dumps(assistant_response, indent=2)}\n```"
             
             # Create thread with initial conversation
-            thread = self.client.beta.threads.create(
+            thread = self._request(lambda: self.client.beta.threads.create(
                 messages=[
                     {
                         "role": "user",
@@ -201,70 +589,181 @@ class OpenAIService:
                     },
                     {
                         "role": "assistant",
-                        "content": f"```json\n{json.dumps(assistant_response, indent=2)}\n```"
+                        "content": assistant_content
                     }
                 ]
-            )
-            logger.info(f"Created demographic thread with initial messages: {thread.id}")
+            ))
+            logger.info("Created demographic thread with initial messages: %s", thread.id)
+            self.message_cache.set_latest_assistant(thread.id, assistant_content)
             return thread.id
         except Exception as e:
-            logger.error(f"Error creating demographic thread: {str(e)}")
+            logger.error("Error creating demographic thread: %s", e)
             raise
 
-    def structure_audience(self, audience_description: str) -> AudienceStructure:
+    def structure_audience(self, audience_description: str, max_workers: Optional[int] = None) -> AudienceStructure:
         logger.info("Starting audience structuring")
-        logger.debug(f"Input description: {audience_description}")
-        logger.debug(f"Selected KPI: {st.session_state.selected_kpi}")
+        logger.debug("Input description: %s", audience_description)
+        logger.debug("Selected KPI: %s", st.session_state.selected_kpi)
         
-        # Get structured groups from GPT
-        structured_groups = self.get_structured_completion(
-            model=self.classification_model,
-            messages=[
-                {"role": "system", "content": AUDIENCE_STRUCTURE_PROMPT},
-                {"role": "user", "content": audience_description}
-            ],
-            response_format=AudienceStructure
+        structured_groups, results = self.plan_audience(
+            audience_description,
+            kpi_metric=st.session_state.selected_kpi,
+            max_workers=max_workers
         )
+        self.store_group_results(results)
         
-        # For each group, create a thread and store it
-        for group in structured_groups.data_groups:
-            group_id = str(uuid.uuid4())
+        return structured_groups
+
+    @traced("structure.plan_audience")
+    def plan_audience(
+        self,
+        audience_description: str,
+        kpi_metric: Optional[str] = None,
+        max_workers: Optional[int] = None
+    ) -> Tuple[AudienceStructure, List[dict]]:
+        """Structure the description and set up every group without touching session state"""
+        # Structuring fans out into many requests; let chat turns overtake them in the scheduler
+        with request_priority(Priority.BULK):
+            prompt, response_format = self._structuring_request()
+            structured_groups = self.get_structured_completion(
+                model=self.classification_model,
+                messages=[
+                    {"role": "system", "content": prompt},
+                    {"role": "user", "content": audience_description}
+                ],
+                response_format=response_format
+            )
+        
+            if self.classify_during_structuring:
+                # One completion yields both the groups and their routing
+                classifications = [group.to_classification() for group in structured_groups.data_groups]
+            else:
+                # Classify every group up front in one request instead of one per group
+                classifications = self.classify_data_groups(
+                    [group.description for group in structured_groups.data_groups]
+                )
+        
+            results = self.process_groups_concurrently(
+                structured_groups.data_groups,
+                classifications,
+                kpi_metric=kpi_metric,
+                max_workers=max_workers
+            )
+            return structured_groups, results
+
+    def _structuring_request(self) -> Tuple[str, Type[AudienceStructure]]:
+        if self.classify_during_structuring:
+            return CLASSIFIED_AUDIENCE_STRUCTURE_PROMPT, ClassifiedAudienceStructure
+        return AUDIENCE_STRUCTURE_PROMPT, AudienceStructure
+
+    def process_groups_concurrently(
+        self,
+        groups: List[DataGroupDefinition],
+        classifications: List[GroupClassification],
+        kpi_metric: Optional[str] = None,
+        max_workers: Optional[int] = None
+    ) -> List[dict]:
+        """Fan groups out over a bounded thread pool.
+        Returns one result per group in the original order, with either an entry or an error.
+        """
+        workers = max(1, min(max_workers or self.max_concurrent_groups, len(groups)))
+        logger.info("Processing %s groups with %s workers", len(groups), workers)
+        
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="structure_group") as executor:
+            futures = [
+                # Pool threads don't inherit context vars, so each task carries a copy (request priority)
+                executor.submit(
+                    contextvars.copy_context().run,
+                    self._process_group, group, classification, kpi_metric
+                )
+                for group, classification in zip(groups, classifications)
+            ]
+        
+        results = []
+        for group, future in zip(groups, futures):
+            try:
+                results.append(self._group_result(group, entry=future.result()))
+            except Exception as e:
+                logger.error("Error processing group '%s': %s", group.name, e, exc_info=True)
+                results.append(self._group_result(group, error=str(e)))
+        
+        return results
+
+    @staticmethod
+    def _group_result(group: DataGroupDefinition, entry: Optional[dict] = None, error: Optional[str] = None) -> dict:
+        return {
+            "group_id": str(uuid.uuid4()),
+            "group_name": group.name,
+            "entry": entry,
+            "error": error
+        }
+
+    def _process_group(
+        self,
+        group: DataGroupDefinition,
+        classification: GroupClassification,
+        kpi_metric: Optional[str]
+    ) -> dict:
+        # Runs on a worker thread, so it must not read or write st.session_state
+        with span("structure.group", group=group.name):
             thread_id = self.create_thread()
-            
-            # First classify the group to determine assistant
-            classification, segments = self.classify_data_group(group.description)
+            segments = self.resolve_segments(classification)
             
             # Get appropriate assistant based on classification and KPI
             assistant_id = self.get_assistant_for_classification(
                 classification=classification,
-                kpi_metric=st.session_state.selected_kpi
+                kpi_metric=kpi_metric
             )
             
             # Store initial message in thread
-            response = self.send_assistant_message(
+            self.send_assistant_message(
                 thread_id=thread_id,
                 content=group.description,
-                assistant_id=assistant_id
+                assistant_id=assistant_id,
+                additional_instructions=self.candidate_instructions(group.description, classification, assistant_id)
             )
+        
+        entry = self._group_entry(group, classification, segments, thread_id, assistant_id)
+        logger.info("Processed group '%s' with assistant %s", group.name, assistant_id)
+        return entry
+
+    @staticmethod
+    def _group_entry(
+        group: DataGroupDefinition,
+        classification: GroupClassification,
+        segments: Optional[dict],
+        thread_id: str,
+        assistant_id: str
+    ) -> dict:
+        entry = {
+            "thread_id": thread_id,
+            "status": "include",
+            "group_name": group.name,
+            "segments": [],
+            "assistant_id": assistant_id,
+            "classification": classification.model_dump() if classification else None
+        }
+        
+        # If we got segments from classification, update the group
+        if segments:
+            entry.update(segments)
+        return entry
+
+    def store_group_results(self, results: List[dict]) -> None:
+        """Write group results into session state in their original order"""
+        errors = []
+        for result in results:
+            if result["error"]:
+                errors.append({"group_name": result["group_name"], "error": result["error"]})
+                continue
             
-            # Update state
-            st.session_state.group_threads[group_id] = thread_id
-            st.session_state.audience["data_groups"][group_id] = {
-                "thread_id": thread_id,
-                "status": "include",
-                "group_name": group.name,
-                "segments": [],
-                "assistant_id": assistant_id,
-                "classification": classification.model_dump() if classification else None
-            }
-            
-            # If we got segments from classification, update the group
-            if segments:
-                st.session_state.audience["data_groups"][group_id].update(segments)
-            
-            logger.info(f"Created group {group_id} with assistant {assistant_id}")
+            group_id = result["group_id"]
+            entry = result["entry"]
+            st.session_state.group_threads[group_id] = entry["thread_id"]
+            st.session_state.audience["data_groups"][group_id] = entry
+            logger.info("Created group %s with assistant %s", group_id, entry['assistant_id'])
         
-        return structured_groups
+        st.session_state.structure_errors = errors
 
     def process_data_groups(self, audience_structure: AudienceStructure) -> dict:
         """Takes structured data groups and processes each through appropriate assistant"""
@@ -283,7 +782,8 @@ class OpenAIService:
             response = self.send_assistant_message(
                 thread_id=thread_id,
                 content=group.description,
-                assistant_id=assistant_id
+                assistant_id=assistant_id,
+                additional_instructions=self.candidate_instructions(group.description, classification, assistant_id)
             )
             
             results[group_id] = {
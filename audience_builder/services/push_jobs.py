@@ -0,0 +1,127 @@
+import contextvars
+import copy
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+from models.push import GroupPushResult, PushResult
+from services.tracing import span
+
+logger = logging.getLogger(__name__)
+
+
+class PushJob:
+    """Handle on one background push_audience call.
+
+    The push runs on a PushJobExecutor thread and only updates this object, so the
+    handle can be kept in session state and polled from any rerun while the push
+    carries on regardless of what the script is doing.
+    """
+
+    def __init__(self, audience_data: Dict[str, Any]):
+        self.job_id = str(uuid.uuid4())
+        self.audience_name = audience_data["audience_name"]
+        self.submitted_at = time.time()
+        self.finished_at: Optional[float] = None
+        # queued, running, succeeded or failed
+        self.status = "queued"
+        self.result: Optional[PushResult] = None
+        self._groups: Dict[str, GroupPushResult] = {
+            group_id: GroupPushResult(group_id=group_id, group_name=group["group_name"], status=group["status"])
+            for group_id, group in audience_data["data_groups"].items()
+        }
+        self._settled = set()
+        self._lock = threading.Lock()
+
+    @property
+    def done(self) -> bool:
+        return self.status in ("succeeded", "failed")
+
+    def groups(self) -> List[GroupPushResult]:
+        """Every group in definition order, with the results of those settled so far"""
+        with self._lock:
+            return [group.model_copy() for group in self._groups.values()]
+
+    def settled_count(self) -> int:
+        with self._lock:
+            return len(self._settled)
+
+    def _start(self) -> None:
+        with self._lock:
+            self.status = "running"
+
+    def _update(self, group: GroupPushResult) -> None:
+        with self._lock:
+            self._groups[group.group_id] = group.model_copy()
+            self._settled.add(group.group_id)
+
+    def _finish(self, result: PushResult) -> None:
+        with self._lock:
+            for group in result.groups:
+                self._groups[group.group_id] = group.model_copy()
+                self._settled.add(group.group_id)
+            self.result = result
+            self.finished_at = time.time()
+            self.status = "succeeded" if result.success else "failed"
+
+
+class PushJobExecutor:
+    """Runs pushes for every session on one bounded pool, so a push outlives the rerun that started it"""
+
+    def __init__(self, max_workers: int = 4, retain_seconds: float = 60 * 60):
+        self.retain_seconds = retain_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="push_job")
+        self._jobs: Dict[str, PushJob] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, ttd_service, audience_data: Dict[str, Any]) -> PushJob:
+        # The session keeps editing its audience while the push runs
+        audience_data = copy.deepcopy(audience_data)
+        job = PushJob(audience_data)
+        with self._lock:
+            self._prune()
+            self._jobs[job.job_id] = job
+        # Copied context keeps the push's spans in the submitter's trace
+        self._executor.submit(contextvars.copy_context().run, self._run, job, ttd_service, audience_data)
+        logger.info("Queued push job %s for '%s'", job.job_id, job.audience_name)
+        return job
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            counts = {"queued": 0, "running": 0, "succeeded": 0, "failed": 0}
+            for job in self._jobs.values():
+                counts[job.status] += 1
+            return counts
+
+    @staticmethod
+    def _run(job: PushJob, ttd_service, audience_data: Dict[str, Any]) -> None:
+        job._start()
+        try:
+            with span("push.job", job_id=job.job_id):
+                result = ttd_service.push_audience(audience_data, progress=job._update)
+        except Exception as e:
+            logger.exception("Push job %s failed", job.job_id)
+            result = PushResult(groups=job.groups(), error=str(e))
+        job._finish(result)
+        logger.info("Push job %s %s", job.job_id, job.status)
+
+    def _prune(self) -> None:
+        # Caller holds the lock
+        cutoff = time.time() - self.retain_seconds
+        for job_id in [job_id for job_id, job in self._jobs.items() if job.done and job.finished_at <= cutoff]:
+            del self._jobs[job_id]
+
+
+_shared_executor: Optional[PushJobExecutor] = None
+_shared_executor_lock = threading.Lock()
+
+
+def get_push_jobs() -> PushJobExecutor:
+    """Process-wide push executor shared by every session"""
+    global _shared_executor
+    with _shared_executor_lock:
+        if _shared_executor is None:
+            _shared_executor = PushJobExecutor()
+        return _shared_executor
@@ -0,0 +1,329 @@
+"""Push journal: what each audience push has already created in TradeDesk.
+
+Every data group and audience that push_audience creates is recorded, with the
+ID TradeDesk returned, in one small JSON file per audience draft, rewritten
+atomically after each step. A retry after a partial failure reuses the recorded
+IDs and only makes the calls that are still missing.
+
+Groups left behind by pushes that never finished, or replaced because a group's
+segments changed before the retry, are orphans. They are kept until cleaned up
+by hand:
+
+    python -m services.push_journal list
+    python -m services.push_journal cleanup --older-than-hours 24
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from services.classification_cache import CACHE_DIR
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_JOURNAL_DIR = CACHE_DIR / "push_journal"
+
+
+class PushJournal:
+    """The steps completed by one audience draft's pushes.
+
+    Data group steps are keyed by the draft's group ID and remember the
+    DataGroupCache key of the segments they were created from, so a group edited
+    since is created again rather than resumed. The audience step likewise only
+    resumes for the same name and data groups.
+    """
+
+    def __init__(self, journal_id: str, path: Optional[Path], state: Dict[str, Any]):
+        self.journal_id = journal_id
+        self.path = path
+        self._state = state
+        self._lock = threading.Lock()
+
+    @classmethod
+    def new(cls, journal_id: str, path: Optional[Path], advertiser_id: str) -> "PushJournal":
+        now = time.time()
+        return cls(journal_id, path, {
+            "advertiser_id": advertiser_id,
+            "created_at": now,
+            "updated_at": now,
+            "data_groups": {},
+            "audience": None,
+            "orphans": [],
+        })
+
+    @property
+    def completed(self) -> bool:
+        """Whether the last push finished: every current step is in the pushed audience"""
+        with self._lock:
+            audience_ids = set(self._audience_ids())
+            return bool(audience_ids) and all(
+                step["data_group_id"] in audience_ids for step in self._state["data_groups"].values()
+            )
+
+    @property
+    def updated_at(self) -> float:
+        return self._state["updated_at"]
+
+    def data_group_id(self, group_id: str, key: str) -> Optional[str]:
+        """The data group already pushed for group_id, if its segments haven't changed since"""
+        with self._lock:
+            step = self._state["data_groups"].get(group_id)
+            if step is None:
+                return None
+            if step["key"] == key:
+                return step["data_group_id"]
+            # Edited since: the group created for the old segments is no longer needed here
+            self._drop_data_group_step(group_id)
+            self._save()
+            return None
+
+    def record_data_group(self, group_id: str, key: str, data_group_id: str, group_name: str, created: bool) -> None:
+        with self._lock:
+            self._drop_data_group_step(group_id)
+            self._state["data_groups"][group_id] = {
+                "key": key,
+                "data_group_id": data_group_id,
+                "group_name": group_name,
+                # Reused groups belong to whichever push created them
+                "created": created,
+            }
+            self._save()
+
+    def audience_id(self, audience_name: str, included: List[str], excluded: List[str]) -> Optional[str]:
+        """The audience already pushed with exactly this name and these data groups"""
+        with self._lock:
+            step = self._state["audience"]
+            if step and (step["audience_name"], step["included"], step["excluded"]) == (audience_name, included, excluded):
+                return step["audience_id"]
+            return None
+
+    def record_audience(self, audience_name: str, included: List[str], excluded: List[str], audience_id: str) -> None:
+        with self._lock:
+            self._state["audience"] = {
+                "audience_name": audience_name,
+                "included": included,
+                "excluded": excluded,
+                "audience_id": audience_id,
+            }
+            self._save()
+
+    def forget_data_group(self, data_group_id: str) -> None:
+        """Stop resuming with a data group, e.g. because TradeDesk rejected or deleted it"""
+        with self._lock:
+            for group_id, step in list(self._state["data_groups"].items()):
+                if step["data_group_id"] == data_group_id:
+                    del self._state["data_groups"][group_id]
+            self._state["orphans"] = [
+                orphan for orphan in self._state["orphans"] if orphan["data_group_id"] != data_group_id
+            ]
+            self._save()
+
+    def referenced_ids(self) -> List[str]:
+        """Data groups this journal's audience uses, or will use when the push is retried"""
+        with self._lock:
+            return [step["data_group_id"] for step in self._state["data_groups"].values()] + self._audience_ids()
+
+    def orphaned_ids(self, include_steps: bool) -> List[str]:
+        """Data groups this journal created that no audience uses.
+        include_steps also counts the current steps, for a push that is being abandoned.
+        """
+        with self._lock:
+            orphans = [orphan["data_group_id"] for orphan in self._state["orphans"]]
+            if include_steps:
+                audience_ids = set(self._audience_ids())
+                orphans.extend(
+                    step["data_group_id"] for step in self._state["data_groups"].values()
+                    if step["created"] and step["data_group_id"] not in audience_ids
+                )
+            return orphans
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            audience = self._state["audience"]
+            return {
+                "journal_id": self.journal_id,
+                "updated_at": self._state["updated_at"],
+                "audience_id": audience["audience_id"] if audience else None,
+                "data_groups": len(self._state["data_groups"]),
+                "orphans": len(self._state["orphans"]),
+            }
+
+    def _drop_data_group_step(self, group_id: str) -> None:
+        # Caller holds the lock
+        step = self._state["data_groups"].pop(group_id, None)
+        # Groups in an audience that was pushed stay in use there
+        if step and step["created"] and step["data_group_id"] not in self._audience_ids():
+            self._state["orphans"].append({
+                "data_group_id": step["data_group_id"],
+                "group_name": step["group_name"],
+                "orphaned_at": time.time(),
+            })
+
+    def _audience_ids(self) -> List[str]:
+        # Caller holds the lock
+        audience = self._state["audience"]
+        return audience["included"] + audience["excluded"] if audience else []
+
+    def _save(self) -> None:
+        # Caller holds the lock
+        self._state["updated_at"] = time.time()
+        if self.path is None:
+            return
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            handle, temporary = tempfile.mkstemp(dir=self.path.parent, prefix=self.path.name, suffix=".tmp")
+            try:
+                with os.fdopen(handle, "w") as file:
+                    json.dump(self._state, file, indent=2)
+                    file.flush()
+                    os.fsync(file.fileno())
+                os.replace(temporary, self.path)
+            except BaseException:
+                os.unlink(temporary)
+                raise
+        except OSError as e:
+            # The push itself still succeeds; only resuming it would be lost
+            logger.warning("Push journal write failed for %s: %s", self.journal_id, e)
+
+
+class PushJournalStore:
+    """One PushJournal per audience draft, as JSON files in directory.
+    directory=None keeps journals in memory only.
+    """
+
+    def __init__(self, directory: Optional[Path] = DEFAULT_JOURNAL_DIR, ttl_seconds: int = 30 * 24 * 60 * 60):
+        self.directory = directory
+        self.ttl_seconds = ttl_seconds
+        self._journals: Dict[str, PushJournal] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def journal_id(advertiser_id: str, audience_data: Dict[str, Any]) -> str:
+        """Drafts from the app carry a draft_id; otherwise the name and group IDs identify the audience"""
+        identity = audience_data.get("draft_id") or [audience_data["audience_name"], sorted(audience_data["data_groups"])]
+        canonical = json.dumps([advertiser_id, identity], separators=(",", ":"))
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:32]
+
+    def open(self, journal_id: str, advertiser_id: str) -> PushJournal:
+        with self._lock:
+            journal = self._journals.get(journal_id)
+            if journal is None:
+                path = self._path(journal_id)
+                journal = (self._load(journal_id, path) if path else None) or PushJournal.new(journal_id, path, advertiser_id)
+                self._journals[journal_id] = journal
+            return journal
+
+    def journals(self) -> List[PushJournal]:
+        with self._lock:
+            if self.directory is not None and self.directory.is_dir():
+                for path in sorted(self.directory.glob("*.json")):
+                    if path.stem not in self._journals:
+                        journal = self._load(path.stem, path)
+                        if journal is not None:
+                            self._journals[path.stem] = journal
+            return list(self._journals.values())
+
+    def remove(self, journal: PushJournal) -> None:
+        with self._lock:
+            self._journals.pop(journal.journal_id, None)
+            if journal.path is not None:
+                try:
+                    journal.path.unlink(missing_ok=True)
+                except OSError as e:
+                    logger.warning("Could not remove push journal %s: %s", journal.journal_id, e)
+
+    def orphans(self, older_than_seconds: float) -> List[Tuple[PushJournal, str]]:
+        """(journal, data_group_id) for every orphaned data group still safe to delete.
+        Pushes that have not completed count as abandoned once idle for older_than_seconds.
+        """
+        now = time.time()
+        journals = self.journals()
+        abandoned = {
+            journal.journal_id for journal in journals
+            if not journal.completed and journal.updated_at <= now - older_than_seconds
+        }
+        # A group can be shared by other drafts through the data group cache
+        in_use = {
+            data_group_id
+            for journal in journals if journal.journal_id not in abandoned
+            for data_group_id in journal.referenced_ids()
+        }
+        return [
+            (journal, data_group_id)
+            for journal in journals
+            for data_group_id in journal.orphaned_ids(include_steps=journal.journal_id in abandoned)
+            if data_group_id not in in_use
+        ]
+
+    def prune(self) -> int:
+        """Drop journals past the TTL that have nothing left to resume or clean up"""
+        cutoff = time.time() - self.ttl_seconds
+        pruned = 0
+        for journal in self.journals():
+            if journal.updated_at <= cutoff and not journal.orphaned_ids(include_steps=True):
+                self.remove(journal)
+                pruned += 1
+        return pruned
+
+    def _path(self, journal_id: str) -> Optional[Path]:
+        return self.directory / f"{journal_id}.json" if self.directory is not None else None
+
+    @staticmethod
+    def _load(journal_id: str, path: Path) -> Optional[PushJournal]:
+        try:
+            with open(path) as file:
+                return PushJournal(journal_id, path, json.load(file))
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning("Ignoring unreadable push journal %s: %s", path, e)
+            return None
+
+
+_shared_store: Optional[PushJournalStore] = None
+_shared_store_lock = threading.Lock()
+
+
+def get_push_journal_store() -> PushJournalStore:
+    """Process-wide journal store shared by every TTDInterfaceService instance"""
+    global _shared_store
+    with _shared_store_lock:
+        if _shared_store is None:
+            _shared_store = PushJournalStore()
+        return _shared_store
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Inspect push journals or delete orphaned TradeDesk data groups")
+    parser.add_argument("command", choices=["list", "cleanup"])
+    parser.add_argument("--directory", type=Path, default=DEFAULT_JOURNAL_DIR)
+    parser.add_argument("--older-than-hours", type=float, default=24.0,
+                        help="Treat unfinished pushes idle this long as abandoned (default: 24)")
+    parser.add_argument("--production", action="store_true", help="Use the production API instead of the sandbox")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    store = PushJournalStore(args.directory)
+    if args.command == "list":
+        for journal in store.journals():
+            summary = journal.summary()
+            status = summary["audience_id"] or "incomplete"
+            print(f"{summary['journal_id']}  {status:<24}{summary['data_groups']:>4} groups{summary['orphans']:>4} orphans")
+        return
+
+    # Imported here: the service depends on this module
+    from services.ttd_interface import TTDInterfaceService
+    ttd_service = TTDInterfaceService(sandbox=not args.production, push_journals=store)
+    result = ttd_service.cleanup_orphaned_data_groups(older_than_seconds=args.older_than_hours * 60 * 60)
+    print(f"Deleted {len(result.deleted)} orphaned data groups")
+    for data_group_id, error in result.failed.items():
+        print(f"  {data_group_id}: {error}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,386 @@
+import asyncio
+import contextvars
+import heapq
+import itertools
+import logging
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from enum import IntEnum
+from typing import Any, Awaitable, Callable, Dict, Optional
+import openai
+from services import tracing
+from settings.request_scheduler import REQUEST_SCHEDULER_SETTINGS
+
+logger = logging.getLogger(__name__)
+
+
+class Priority(IntEnum):
+    # Lower values are served first
+    INTERACTIVE = 0
+    BULK = 1
+
+
+_current_priority: contextvars.ContextVar[Priority] = contextvars.ContextVar(
+    "request_priority", default=Priority.INTERACTIVE
+)
+
+
+@contextmanager
+def request_priority(priority: Priority):
+    """Run every scheduled request in this context (and tasks copied from it) at the given priority"""
+    token = _current_priority.set(priority)
+    try:
+        yield
+    finally:
+        _current_priority.reset(token)
+
+
+def current_priority() -> Priority:
+    return _current_priority.get()
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling OpenAI while the circuit breaker is open"""
+
+
+class TokenBucket:
+    """Continuously refilling bucket; not thread-safe on its own"""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def consume(self, amount: float) -> None:
+        # May go negative when a request used more than estimated; later callers pay the debt
+        self.tokens -= amount
+
+
+class CircuitBreaker:
+    """Opens after consecutive upstream failures, then lets one trial request through after a cooldown"""
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.opens = 0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = "half_open"
+                self._trial_in_flight = False
+            if self.state == "half_open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self.state != "closed":
+                logger.info("OpenAI circuit breaker closed")
+            self.state = "closed"
+            self.failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                if self.state != "open":
+                    self.opens += 1
+                    logger.error("OpenAI circuit breaker opened after %s failures", self.failures)
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.InternalServerError,
+)
+
+
+class RequestScheduler:
+    """Process-wide gate for OpenAI traffic.
+
+    Requests wait in a priority queue until both the request and token buckets
+    have capacity, so interactive chat turns overtake bulk structuring work.
+    Retryable errors are retried with jittered exponential backoff, honouring
+    Retry-After when the API sends one, and repeated upstream failures open a
+    circuit breaker that fails fast until a trial request succeeds. Coroutines
+    queue through aacquire, which waits on their event loop, not a thread.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: float,
+        tokens_per_minute: float,
+        max_retries: int = 4,
+        base_retry_delay: float = 0.5,
+        max_retry_delay: float = 20.0,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0
+    ):
+        self.max_retries = max_retries
+        self.base_retry_delay = base_retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.request_bucket = TokenBucket(requests_per_minute)
+        self.token_bucket = TokenBucket(tokens_per_minute)
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+
+        self._condition = threading.Condition()
+        self._queue = []
+        self._sequence = itertools.count()
+        self._async_waiters = []
+
+        self._waits = deque(maxlen=500)
+        self.requests = 0
+        self.retries = 0
+        self.rate_limited = 0
+        self.max_queue_depth = 0
+
+    def acquire(self, priority: Optional[Priority] = None, tokens: int = 0) -> float:
+        """Block until this request may be sent. Returns the time spent waiting."""
+        priority = current_priority() if priority is None else priority
+        started = time.monotonic()
+
+        with self._condition:
+            ticket = self._enqueue(priority)
+            while True:
+                wait = self._take(ticket, tokens)
+                if wait == 0:
+                    break
+                self._condition.wait(timeout=wait)
+
+        return self._record_wait(priority, started)
+
+    async def aacquire(self, priority: Optional[Priority] = None, tokens: int = 0) -> float:
+        """acquire for coroutines: waits on the event loop instead of holding a thread per queued request"""
+        priority = current_priority() if priority is None else priority
+        started = time.monotonic()
+        loop = asyncio.get_running_loop()
+
+        with self._condition:
+            ticket = self._enqueue(priority)
+        try:
+            while True:
+                with self._condition:
+                    wait = self._take(ticket, tokens)
+                    if wait == 0:
+                        break
+                    # Resolved by _notify from whichever thread or loop changes the queue next
+                    woken = loop.create_future()
+                    self._async_waiters.append((loop, woken))
+                await asyncio.wait((woken,), timeout=wait)
+        except BaseException:
+            # Cancelled while queued: don't hold up the requests behind this one
+            with self._condition:
+                if ticket in self._queue:
+                    self._queue.remove(ticket)
+                    heapq.heapify(self._queue)
+                    self._notify()
+            raise
+
+        return self._record_wait(priority, started)
+
+    def _enqueue(self, priority: Priority):
+        # Caller holds the lock
+        ticket = (int(priority), next(self._sequence))
+        heapq.heappush(self._queue, ticket)
+        self.max_queue_depth = max(self.max_queue_depth, len(self._queue))
+        return ticket
+
+    def _take(self, ticket, tokens: int) -> Optional[float]:
+        """Send ticket's request if it is first in the queue and the buckets have capacity.
+        Returns 0 once taken, the seconds until capacity when first, or None behind other requests.
+        Caller holds the lock.
+        """
+        if self._queue[0] != ticket:
+            return None
+        now = time.monotonic()
+        wait = max(
+            self.request_bucket.wait_time(1, now),
+            self.token_bucket.wait_time(tokens, now)
+        )
+        if wait > 0:
+            return wait
+        self.request_bucket.consume(1)
+        self.token_bucket.consume(tokens)
+        heapq.heappop(self._queue)
+        self.requests += 1
+        self._notify()
+        return 0
+
+    def _notify(self) -> None:
+        # Caller holds the lock; wakes blocked threads and waiting coroutines alike
+        self._condition.notify_all()
+        for loop, woken in self._async_waiters:
+            try:
+                loop.call_soon_threadsafe(_resolve, woken)
+            except RuntimeError:
+                # The waiter's loop has closed
+                pass
+        self._async_waiters.clear()
+
+    def _record_wait(self, priority: Priority, started: float) -> float:
+        waited = time.monotonic() - started
+        with self._condition:
+            self._waits.append(waited)
+
+        if waited > 1:
+            logger.info("Request waited %.1fs in the scheduler at priority %s", waited, priority.name)
+        span = tracing.current_span()
+        if span is not None:
+            span.set_attribute("scheduler_wait_ms", span.attributes.get("scheduler_wait_ms", 0) + round(waited * 1000, 1))
+        return waited
+
+    def settle(self, estimated_tokens: int, result: Any) -> None:
+        """Charge the token bucket for the difference between estimated and reported usage"""
+        usage = getattr(result, "usage", None)
+        actual = getattr(usage, "total_tokens", None)
+        if isinstance(actual, int) and actual != estimated_tokens:
+            with self._condition:
+                self.token_bucket.consume(actual - estimated_tokens)
+
+    def call(self, function: Callable[[], Any], priority: Optional[Priority] = None, tokens: int = 0) -> Any:
+        priority = current_priority() if priority is None else priority
+        for attempt in range(self.max_retries + 1):
+            if not self.breaker.allow():
+                raise CircuitOpenError("OpenAI requests are paused after repeated failures")
+            self.acquire(priority, tokens)
+            try:
+                result = function()
+            except Exception as e:
+                delay = self._handle_failure(e, attempt)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                continue
+            self.breaker.record_success()
+            self.settle(tokens, result)
+            return result
+
+    async def acall(
+        self,
+        function: Callable[[], Awaitable[Any]],
+        priority: Optional[Priority] = None,
+        tokens: int = 0
+    ) -> Any:
+        priority = current_priority() if priority is None else priority
+        for attempt in range(self.max_retries + 1):
+            if not self.breaker.allow():
+                raise CircuitOpenError("OpenAI requests are paused after repeated failures")
+            await self.aacquire(priority, tokens)
+            try:
+                result = await function()
+            except Exception as e:
+                delay = self._handle_failure(e, attempt)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                continue
+            self.breaker.record_success()
+            self.settle(tokens, result)
+            return result
+
+    def _handle_failure(self, error: Exception, attempt: int) -> Optional[float]:
+        """Record a failed attempt and return how long to wait before retrying, or None to give up"""
+        if isinstance(error, openai.RateLimitError):
+            self.rate_limited += 1
+            # A 429 means the API is up, just busy; the buckets and backoff deal with it
+            self.breaker.record_success()
+        elif isinstance(error, RETRYABLE_ERRORS):
+            self.breaker.record_failure()
+        else:
+            # Client errors still prove the upstream is reachable
+            self.breaker.record_success()
+
+        if not isinstance(error, RETRYABLE_ERRORS) or attempt >= self.max_retries:
+            return None
+
+        self.retries += 1
+        retry_after = self._retry_after(error)
+        if retry_after is not None:
+            delay = retry_after + random.uniform(0, min(1.0, retry_after * 0.25))
+        else:
+            backoff = min(self.max_retry_delay, self.base_retry_delay * (2 ** attempt))
+            delay = random.uniform(backoff / 2, backoff)
+        logger.warning("Retrying OpenAI request in %.1fs after %s (attempt %s)", delay, type(error).__name__, attempt + 1)
+        return min(delay, self.max_retry_delay)
+
+    @staticmethod
+    def _retry_after(error: Exception) -> Optional[float]:
+        response = getattr(error, "response", None)
+        headers = getattr(response, "headers", None) or {}
+        try:
+            if "retry-after-ms" in headers:
+                return float(headers["retry-after-ms"]) / 1000
+            if "retry-after" in headers:
+                return float(headers["retry-after"])
+        except ValueError:
+            return None
+        return None
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._condition:
+            waits = sorted(self._waits)
+            queue_depth = len(self._queue)
+        return {
+            "queue_depth": queue_depth,
+            "max_queue_depth": self.max_queue_depth,
+            "requests": self.requests,
+            "retries": self.retries,
+            "rate_limited": self.rate_limited,
+            "avg_wait_seconds": round(sum(waits) / len(waits), 3) if waits else 0.0,
+            "p95_wait_seconds": round(waits[int(len(waits) * 0.95) - 1], 3) if waits else 0.0,
+            "max_wait_seconds": round(waits[-1], 3) if waits else 0.0,
+            "circuit_state": self.breaker.state,
+            "circuit_opens": self.breaker.opens,
+        }
+
+
+def _resolve(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+_scheduler: Optional[RequestScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> RequestScheduler:
+    """The scheduler shared by every OpenAIService in this process"""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = RequestScheduler(**REQUEST_SCHEDULER_SETTINGS)
+        return _scheduler
+
+
+def estimate_tokens(*texts: str, completion_allowance: int = 500) -> int:
+    """Rough prompt size (4 characters per token) plus room for the reply"""
+    return sum(len(text) for text in texts) // 4 + completion_allowance
\ No newline at end of file
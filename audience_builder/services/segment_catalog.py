@@ -0,0 +1,383 @@
+"""Segment catalog: one indexed, memory-mapped data file covering every provider.
+
+Source segments live in data/segments/*.csv and *.json, one segment per row or
+object with id, full_path, description and an optional provider (otherwise the
+provider is the ID's "|" suffix, e.g. lds210audacu). They are compiled into a
+versioned file with sorted ID and path indexes. The file is memory-mapped on
+first use, so startup parses nothing and a lookup only touches the pages it
+binary-searches through.
+
+The compiled file is rebuilt automatically when the sources change. To build it
+by hand, or to compile other sources somewhere else:
+
+    python -m services.segment_catalog build
+    python -m services.segment_catalog build extra.csv --output /tmp/segments.idx
+    python -m services.segment_catalog info
+"""
+import argparse
+import csv
+import hashlib
+import json
+import logging
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import threading
+from pathlib import Path
+from types import MappingProxyType
+from typing import Callable, Dict, Iterable, Iterator, List, Mapping, NamedTuple, Optional, Tuple
+from services.classification_cache import CACHE_DIR
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SOURCE_DIR = Path(__file__).resolve().parent.parent / "data" / "segments"
+DEFAULT_INDEX_PATH = CACHE_DIR / "segment_catalog.idx"
+
+PATH_SEPARATOR = " > "
+DEMOGRAPHICS_PATH = ("Custom Segment", "Audience Acuity", "Pathlabs", "Demographics")
+
+FORMAT_VERSION = 1
+_MAGIC = b"SEGCATLG"
+# magic, version, record count, then the offsets of the record offsets table and
+# the ID and path indexes, then a digest of the sources the file was built from
+_HEADER = struct.Struct("<8sII III 32s")
+_UINT = struct.Struct("<I")
+_FIELD_SEPARATOR = b"\x1f"
+_FIELDS = ("id", "full_path", "description", "provider")
+
+
+class CatalogError(Exception):
+    """Raised for unreadable catalog files and invalid catalog sources"""
+
+
+class Segment(NamedTuple):
+    id: str
+    path: Tuple[str, ...]
+    description: str
+    provider: str = ""
+
+    @property
+    def full_path(self) -> str:
+        return PATH_SEPARATOR.join(self.path)
+
+    def to_dict(self) -> Dict[str, str]:
+        """A fresh dict in the shape the assistants, session state and TTD push use"""
+        return {"full_path": self.full_path, "description": self.description, "id": self.id}
+
+
+def provider_of(segment_id: str) -> str:
+    return segment_id.rpartition("|")[2] if "|" in segment_id else ""
+
+
+class SegmentCatalog:
+    """Read-only view over a compiled catalog file.
+
+    Records are decoded on demand. Structures derived from the whole catalog
+    (demographic maps, the age coverage table) are built once per catalog
+    through derived().
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        with open(self.path, "rb") as file:
+            try:
+                self._data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                raise CatalogError(f"{self.path} is empty")
+        if len(self._data) < _HEADER.size:
+            raise CatalogError(f"{self.path} is truncated")
+        magic, version, self._count, self._offsets_at, self._ids_at, self._paths_at, self.source_digest = \
+            _HEADER.unpack_from(self._data)
+        if magic != _MAGIC:
+            raise CatalogError(f"{self.path} is not a segment catalog")
+        if version != FORMAT_VERSION:
+            raise CatalogError(f"{self.path} has format version {version}, expected {FORMAT_VERSION}")
+        self._derived: Dict[str, object] = {}
+        # Reentrant: one derived structure may be built from another
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, position: int) -> Segment:
+        """The segment at position in source order, as used by derived indexes"""
+        if not 0 <= position < self._count:
+            raise IndexError(position)
+        return self._segment(position)
+
+    def __iter__(self) -> Iterator[Segment]:
+        for position in range(self._count):
+            yield self._segment(position)
+
+    def get(self, segment_id: str) -> Optional[Segment]:
+        key = segment_id.encode()
+        position = self._lower_bound(self._ids_at, 0, key)
+        if position < self._count:
+            record = self._indexed(self._ids_at, position)
+            if self._field(record, 0) == key:
+                return self._segment(record)
+        return None
+
+    def __contains__(self, segment_id: str) -> bool:
+        return self.get(segment_id) is not None
+
+    def find_by_path(self, full_path: str) -> Optional[Segment]:
+        key = full_path.encode()
+        position = self._lower_bound(self._paths_at, 1, key)
+        if position < self._count:
+            record = self._indexed(self._paths_at, position)
+            if self._field(record, 1) == key:
+                return self._segment(record)
+        return None
+
+    def iter_path_prefix(self, prefix: str) -> Iterator[Segment]:
+        """Segments whose full_path starts with prefix, in path order"""
+        key = prefix.encode()
+        position = self._lower_bound(self._paths_at, 1, key)
+        while position < self._count:
+            record = self._indexed(self._paths_at, position)
+            if not self._field(record, 1).startswith(key):
+                break
+            yield self._segment(record)
+            position += 1
+
+    def providers(self) -> Mapping[str, int]:
+        """Segment count per provider"""
+        def count():
+            counts: Dict[str, int] = {}
+            for position in range(self._count):
+                provider = self._field(position, 3).decode()
+                counts[provider] = counts.get(provider, 0) + 1
+            return MappingProxyType(counts)
+        return self.derived("providers", count)
+
+    def iter_provider(self, provider: str) -> Iterator[Segment]:
+        key = provider.encode()
+        for position in range(self._count):
+            if self._field(position, 3) == key:
+                yield self._segment(position)
+
+    def derived(self, name: str, build: Callable[[], object]):
+        """Build a structure from this catalog once and share it afterwards"""
+        value = self._derived.get(name)
+        if value is None:
+            with self._lock:
+                value = self._derived.get(name)
+                if value is None:
+                    value = self._derived[name] = build()
+        return value
+
+    def close(self) -> None:
+        self._data.close()
+
+    def _record(self, position: int) -> bytes:
+        start, end = struct.unpack_from("<II", self._data, self._offsets_at + position * _UINT.size)
+        return self._data[start:end]
+
+    def _field(self, position: int, field: int) -> bytes:
+        return self._record(position).split(_FIELD_SEPARATOR, 3)[field]
+
+    def _segment(self, position: int) -> Segment:
+        segment_id, full_path, description, provider = self._record(position).decode().split("\x1f", 3)
+        path = tuple(sys.intern(component) for component in full_path.split(PATH_SEPARATOR))
+        return Segment(segment_id, path, description, sys.intern(provider))
+
+    def _indexed(self, index_at: int, position: int) -> int:
+        return _UINT.unpack_from(self._data, index_at + position * _UINT.size)[0]
+
+    def _lower_bound(self, index_at: int, field: int, key: bytes) -> int:
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            if self._field(self._indexed(index_at, middle), field) < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+
+def source_files(source_dir: Path = DEFAULT_SOURCE_DIR) -> List[Path]:
+    if not source_dir.is_dir():
+        return []
+    return sorted(path for path in source_dir.iterdir() if path.suffix in (".csv", ".json"))
+
+
+def source_digest(sources: Iterable[Path]) -> bytes:
+    """Changes whenever a source file is added, removed or modified; only stats the files"""
+    digest = hashlib.sha256(str(FORMAT_VERSION).encode())
+    for path in sources:
+        stat = path.stat()
+        digest.update(f"{path.name}\0{stat.st_size}\0{stat.st_mtime_ns}\n".encode())
+    return digest.digest()
+
+
+def read_source(path: Path) -> List[Dict[str, str]]:
+    """Rows from a CSV file, or a JSON list of segments / {"segments": [...]} object"""
+    if path.suffix == ".csv":
+        with open(path, newline="", encoding="utf-8") as file:
+            rows = list(csv.DictReader(file))
+    else:
+        with open(path, encoding="utf-8") as file:
+            data = json.load(file)
+        rows = data.get("segments", []) if isinstance(data, dict) else data
+
+    segments = []
+    for number, row in enumerate(rows, start=1):
+        segment = {field: str(row.get(field) or "").strip() for field in _FIELDS}
+        missing = [field for field in ("id", "full_path") if not segment[field]]
+        if missing:
+            raise CatalogError(f"{path.name} segment {number}: missing {', '.join(missing)}")
+        if any("\x1f" in value for value in segment.values()):
+            raise CatalogError(f"{path.name} segment {number}: contains a control character")
+        segment["provider"] = segment["provider"] or provider_of(segment["id"])
+        segments.append(segment)
+    return segments
+
+
+def build_catalog(sources: Iterable[Path], output: Path) -> int:
+    """Compile source files into a catalog at output and return the segment count"""
+    sources = list(sources)
+    segments, origins = [], {}
+    for path in sources:
+        for segment in read_source(path):
+            if segment["id"] in origins:
+                raise CatalogError(f"Duplicate segment id {segment['id']} in {origins[segment['id']]} and {path.name}")
+            origins[segment["id"]] = path.name
+            segments.append(segment)
+
+    records = [_FIELD_SEPARATOR.join(segment[field].encode() for field in _FIELDS) for segment in segments]
+    count = len(records)
+    offsets_at = _HEADER.size
+    ids_at = offsets_at + (count + 1) * _UINT.size
+    paths_at = ids_at + count * _UINT.size
+    records_at = paths_at + count * _UINT.size
+
+    offsets, position = [], records_at
+    for record in records:
+        offsets.append(position)
+        position += len(record)
+    offsets.append(position)
+    by_id = sorted(range(count), key=lambda index: segments[index]["id"].encode())
+    by_path = sorted(range(count), key=lambda index: segments[index]["full_path"].encode())
+
+    output.parent.mkdir(parents=True, exist_ok=True)
+    # Write beside the target and rename, so readers never map a half-written file
+    handle, temporary = tempfile.mkstemp(dir=output.parent, prefix=output.name, suffix=".tmp")
+    try:
+        with os.fdopen(handle, "wb") as file:
+            file.write(_HEADER.pack(_MAGIC, FORMAT_VERSION, count, offsets_at, ids_at, paths_at,
+                                    source_digest(sources)))
+            file.write(struct.pack(f"<{count + 1}I", *offsets))
+            file.write(struct.pack(f"<{count}I", *by_id))
+            file.write(struct.pack(f"<{count}I", *by_path))
+            file.writelines(records)
+        os.chmod(temporary, 0o644)
+        os.replace(temporary, output)
+    except BaseException:
+        os.unlink(temporary)
+        raise
+    logger.info("Built segment catalog %s with %d segments from %d sources", output, count, len(sources))
+    return count
+
+
+def load_catalog(index_path: Path = DEFAULT_INDEX_PATH, source_dir: Path = DEFAULT_SOURCE_DIR) -> SegmentCatalog:
+    """Open the compiled catalog, rebuilding it first if the sources have changed.
+    Without any sources, an existing compiled file is used as-is.
+    """
+    sources = source_files(source_dir)
+    if sources:
+        expected = source_digest(sources)
+        try:
+            catalog = SegmentCatalog(index_path)
+            if catalog.source_digest == expected:
+                return catalog
+            catalog.close()
+            logger.info("Segment sources changed, rebuilding %s", index_path)
+        except FileNotFoundError:
+            pass
+        except CatalogError as e:
+            logger.warning("Rebuilding segment catalog: %s", e)
+        build_catalog(sources, index_path)
+    return SegmentCatalog(index_path)
+
+
+_catalog: Optional[SegmentCatalog] = None
+_catalog_lock = threading.Lock()
+
+
+def get_segment_catalog() -> SegmentCatalog:
+    """The catalog shared by every SegmentService in this process, opened on first use"""
+    global _catalog
+    with _catalog_lock:
+        if _catalog is None:
+            _catalog = load_catalog()
+        return _catalog
+
+
+class Demographics(NamedTuple):
+    gender: Mapping[str, Segment]
+    age_ranges: Mapping[Tuple[int, int], Segment]
+    # Open-ended ranges, e.g. 21+
+    special_ranges: Mapping[Tuple[int, Optional[int]], Segment]
+    individual_ages: Mapping[int, Segment]
+
+
+def demographics(catalog: SegmentCatalog) -> Demographics:
+    """The Audience Acuity demographic segments, keyed the way the classifier describes audiences"""
+    return catalog.derived("demographics", lambda: _build_demographics(catalog))
+
+
+def _build_demographics(catalog: SegmentCatalog) -> Demographics:
+    gender, age_ranges, special_ranges, individual_ages = {}, {}, {}, {}
+    depth = len(DEMOGRAPHICS_PATH)
+    for segment in catalog.iter_path_prefix(PATH_SEPARATOR.join(DEMOGRAPHICS_PATH) + PATH_SEPARATOR):
+        if len(segment.path) != depth + 2:
+            continue
+        category, label = segment.path[depth:]
+        try:
+            if category == "Gender":
+                gender[label.lower()] = segment
+            elif category == "Age Range" and label.endswith("+"):
+                special_ranges[(int(label[:-1]), None)] = segment
+            elif category == "Age Range":
+                low, high = label.split("-")
+                age_ranges[(int(low), int(high))] = segment
+            elif category == "Age":
+                individual_ages[int(label)] = segment
+        except ValueError:
+            logger.warning("Skipping demographic segment with an unexpected label: %s", segment.full_path)
+
+    def frozen(mapping: dict) -> Mapping:
+        return MappingProxyType(dict(sorted(mapping.items())))
+    return Demographics(frozen(gender), frozen(age_ranges), frozen(special_ranges), frozen(individual_ages))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compile or inspect the segment catalog")
+    parser.add_argument("command", choices=["build", "info"])
+    parser.add_argument("sources", nargs="*", type=Path,
+                        help=f"CSV/JSON source files (default: everything in {DEFAULT_SOURCE_DIR})")
+    parser.add_argument("--output", type=Path, default=DEFAULT_INDEX_PATH)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    if args.command == "build":
+        sources = args.sources or source_files()
+        if not sources:
+            parser.error(f"No sources given and none found in {DEFAULT_SOURCE_DIR}")
+        try:
+            build_catalog(sources, args.output)
+        except CatalogError as e:
+            parser.exit(1, f"{e}\n")
+        return
+
+    catalog = SegmentCatalog(args.output)
+    print(f"{args.output}: format {FORMAT_VERSION}, {len(catalog)} segments")
+    for provider, count in sorted(catalog.providers().items()):
+        print(f"  {provider or '(none)':<24}{count:>8}")
+
+
+if __name__ == "__main__":
+    main()
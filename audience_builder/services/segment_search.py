@@ -0,0 +1,111 @@
+import heapq
+import math
+import re
+from array import array
+from typing import Dict, List, Optional, Tuple
+from services.segment_catalog import Segment, SegmentCatalog
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+# Words that appear in most group descriptions and segment blurbs but say nothing about the segment
+STOPWORDS = frozenset("""
+a an and are as at be by for from has have in is it of on or that the their this to who with
+people person individuals users consumers audience audiences segment segments interested interest
+""".split())
+
+
+def _stem(token: str) -> str:
+    # Just enough to match plurals ("hikers" -> "hiker", "families" -> "family")
+    if len(token) > 4 and token.endswith("ies"):
+        return token[:-3] + "y"
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+
+def tokenize(text: str) -> List[str]:
+    return [_stem(token) for token in _TOKEN.findall(text.lower()) if token not in STOPWORDS]
+
+
+class SegmentSearchIndex:
+    """In-memory BM25 index over segment paths and descriptions.
+
+    Path terms count path_weight times as much as description terms (a
+    simplified BM25F), since a segment's taxonomy path names what it is and the
+    description mostly restates it. Postings are compact arrays of catalog
+    positions and weighted term frequencies.
+    """
+
+    def __init__(self, catalog: SegmentCatalog, k1: float = 1.2, b: float = 0.75, path_weight: float = 2.0):
+        self.catalog = catalog
+        self.k1 = k1
+        self.b = b
+        postings: Dict[str, Tuple[array, array]] = {}
+        lengths = array("f")
+        providers: List[str] = []
+        for position, segment in enumerate(catalog):
+            providers.append(segment.provider)
+            frequencies: Dict[str, float] = {}
+            for component in segment.path:
+                for token in tokenize(component):
+                    frequencies[token] = frequencies.get(token, 0.0) + path_weight
+            for token in tokenize(segment.description):
+                frequencies[token] = frequencies.get(token, 0.0) + 1.0
+            for token, frequency in frequencies.items():
+                positions, weights = postings.setdefault(token, (array("I"), array("f")))
+                positions.append(position)
+                weights.append(frequency)
+            lengths.append(sum(frequencies.values()))
+
+        self._postings = postings
+        self._lengths = lengths
+        self._providers = providers
+        self._average_length = (sum(lengths) / len(lengths)) if lengths else 0.0
+
+    def __len__(self) -> int:
+        return len(self._lengths)
+
+    def _idf(self, document_frequency: int) -> float:
+        documents = len(self._lengths)
+        return math.log(1 + (documents - document_frequency + 0.5) / (document_frequency + 0.5))
+
+    def search(
+        self,
+        query: str,
+        limit: int = 10,
+        provider: Optional[str] = None,
+        min_relative_score: float = 0.25,
+        exclude_path: Tuple[str, ...] = ()
+    ) -> List[Tuple[Segment, float]]:
+        """Best matches for query, highest score first.
+        Results scoring below min_relative_score of the best match are dropped as noise,
+        and segments under exclude_path are left out.
+        """
+        scores: Dict[int, float] = {}
+        for token in set(tokenize(query)):
+            if token not in self._postings:
+                continue
+            positions, weights = self._postings[token]
+            idf = self._idf(len(positions))
+            for position, frequency in zip(positions, weights):
+                norm = self.k1 * (1 - self.b + self.b * self._lengths[position] / self._average_length)
+                scores[position] = scores.get(position, 0.0) + idf * frequency * (self.k1 + 1) / (frequency + norm)
+        if provider:
+            scores = {position: score for position, score in scores.items() if self._providers[position] == provider}
+        if exclude_path:
+            depth = len(exclude_path)
+            scores = {
+                position: score for position, score in scores.items()
+                if self.catalog[position].path[:depth] != exclude_path
+            }
+        if not scores:
+            return []
+
+        ranked = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+        cutoff = ranked[0][1] * min_relative_score
+        return [(self.catalog[position], score) for position, score in ranked if score >= cutoff]
+
+
+def search_index(catalog: SegmentCatalog) -> SegmentSearchIndex:
+    """The index for catalog, built on first use and shared afterwards"""
+    return catalog.derived("search_index", lambda: SegmentSearchIndex(catalog))
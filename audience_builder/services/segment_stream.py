@@ -0,0 +1,90 @@
+import json
+import logging
+import re
+from typing import List, Optional
+
+logger = logging.getLogger(__name__)
+
+SEGMENTS_KEY_PATTERN = re.compile(r'"segments"\s*:\s*\[')
+GROUP_NAME_PATTERN = re.compile(r'"group_name"\s*:\s*"((?:[^"\\]|\\.)*)"')
+
+
+class SegmentStreamParser:
+    """Incrementally extracts segment objects from a streamed group definition.
+
+    Feed it text deltas as they arrive; each call returns the segments whose JSON
+    object closed within that delta, so a card can be rendered per segment without
+    waiting for the rest of the reply.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self.group_name: Optional[str] = None
+        self.segments: List[dict] = []
+        self._position = 0
+        self._in_array = False
+        self._done = False
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._object_start = None
+
+    def feed(self, delta: str) -> List[dict]:
+        self.text += delta
+        if self.group_name is None:
+            match = GROUP_NAME_PATTERN.search(self.text)
+            if match:
+                self.group_name = json.loads(f'"{match.group(1)}"')
+
+        if self._done:
+            return []
+        if not self._in_array:
+            match = SEGMENTS_KEY_PATTERN.search(self.text)
+            if not match:
+                return []
+            self._in_array = True
+            self._position = match.end()
+
+        completed = []
+        text = self.text
+        for index in range(self._position, len(text)):
+            char = text[index]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                continue
+
+            if char == '"':
+                self._in_string = True
+            elif char == "{":
+                if self._depth == 0:
+                    self._object_start = index
+                self._depth += 1
+            elif char == "}":
+                self._depth -= 1
+                if self._depth == 0 and self._object_start is not None:
+                    segment = self._parse(text[self._object_start:index + 1])
+                    if segment is not None:
+                        completed.append(segment)
+                    self._object_start = None
+            elif char == "]" and self._depth == 0:
+                self._done = True
+                self._position = index + 1
+                break
+        else:
+            self._position = len(text)
+
+        self.segments.extend(completed)
+        return completed
+
+    @staticmethod
+    def _parse(fragment: str) -> Optional[dict]:
+        try:
+            return json.loads(fragment)
+        except json.JSONDecodeError:
+            logger.warning("Skipping malformed streamed segment: %s", fragment[:200])
+            return None
\ No newline at end of file
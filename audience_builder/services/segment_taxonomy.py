@@ -0,0 +1,187 @@
+import bisect
+import re
+from typing import Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+from services.segment_catalog import PATH_SEPARATOR, Segment, SegmentCatalog
+
+_NUMBER = re.compile(r"(\d+)")
+
+
+def natural_key(name: str) -> Tuple:
+    """Sort "Age > 9" before "Age > 10" and "18-20" before "21-24" """
+    return tuple((0, int(part)) if part.isdigit() else (1, part.lower()) for part in _NUMBER.split(name) if part)
+
+
+class TaxonomyNode:
+    __slots__ = ("name", "parent", "children", "position", "size")
+
+    def __init__(self, name: str, parent: Optional["TaxonomyNode"]):
+        self.name = name
+        self.parent = parent
+        self.children: Dict[str, TaxonomyNode] = {}
+        # Catalog position of the segment at exactly this path, -1 for pure categories
+        self.position = -1
+        # Segments in this subtree, this node included
+        self.size = 0
+
+    @property
+    def path(self) -> Tuple[str, ...]:
+        names, node = [], self
+        while node.parent is not None:
+            names.append(node.name)
+            node = node.parent
+        return tuple(reversed(names))
+
+    @property
+    def is_segment(self) -> bool:
+        return self.position >= 0
+
+
+class TaxonomyEntry(NamedTuple):
+    """One row of a browse or autocomplete listing"""
+    path: Tuple[str, ...]
+    segment_id: Optional[str]
+    size: int
+
+    @property
+    def name(self) -> str:
+        return self.path[-1] if self.path else ""
+
+    @property
+    def full_path(self) -> str:
+        return PATH_SEPARATOR.join(self.path)
+
+
+class SegmentTaxonomy:
+    """Prefix trie over the catalog's full_path hierarchy.
+
+    Walking to a path costs one dict lookup per level, so browsing, subtree
+    listing and path-to-ID lookups don't depend on the catalog size. Node names
+    are also kept in one sorted list, so autocomplete on a name prefix is a
+    binary search plus the matches returned.
+    """
+
+    def __init__(self, catalog: SegmentCatalog):
+        self.catalog = catalog
+        self.root = TaxonomyNode("", None)
+        for position, segment in enumerate(catalog):
+            node = self.root
+            node.size += 1
+            for name in segment.path:
+                child = node.children.get(name)
+                if child is None:
+                    child = node.children[name] = TaxonomyNode(name, node)
+                node = child
+                node.size += 1
+            node.position = position
+
+        # Children are kept in browse order; every node except the root also goes
+        # into one list sorted by name for prefix search
+        self._nodes: List[TaxonomyNode] = []
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            node.children = dict(sorted(node.children.items(), key=lambda item: natural_key(item[0])))
+            for child in node.children.values():
+                self._nodes.append(child)
+                stack.append(child)
+        self._nodes.sort(key=lambda node: (node.name.lower(), natural_key(node.name)))
+        self._names = [node.name.lower() for node in self._nodes]
+
+    def node(self, path: Sequence[str]) -> Optional[TaxonomyNode]:
+        node = self.root
+        for name in path:
+            node = node.children.get(name)
+            if node is None:
+                return None
+        return node
+
+    def lookup(self, full_path: str) -> Optional[str]:
+        """The segment ID at full_path, if any"""
+        node = self.node(split_path(full_path))
+        return self._id(node) if node is not None and node.is_segment else None
+
+    def children(self, path: Sequence[str] = ()) -> List[TaxonomyEntry]:
+        node = self.node(path)
+        if node is None:
+            return []
+        return [self._entry(child) for child in node.children.values()]
+
+    def subtree(self, path: Sequence[str] = (), limit: Optional[int] = None) -> Iterator[Segment]:
+        """Every segment at or below path, depth first in browse order"""
+        node = self.node(path)
+        if node is None:
+            return
+        returned = 0
+        stack = [node]
+        while stack and (limit is None or returned < limit):
+            node = stack.pop()
+            if node.is_segment:
+                returned += 1
+                yield self.catalog[node.position]
+            stack.extend(reversed(node.children.values()))
+
+    def complete(self, text: str, limit: int = 10) -> List[TaxonomyEntry]:
+        """Suggestions for partially typed text.
+
+        "Pathlabs > Demo" walks the complete components and matches the last one
+        against the children there. Text without a separator matches the start
+        of any node name, at any depth.
+        """
+        if ">" in text:
+            *complete, partial = [part.strip() for part in text.split(">")]
+            parent = self._resolve(complete)
+            if parent is None:
+                return []
+            partial = partial.lower()
+            matches = [child for child in parent.children.values() if child.name.lower().startswith(partial)]
+            return [self._entry(node) for node in matches[:limit]]
+
+        prefix = text.strip().lower()
+        if not prefix:
+            return self.children()[:limit]
+        start = bisect.bisect_left(self._names, prefix)
+        matches = []
+        for index in range(start, len(self._names)):
+            if not self._names[index].startswith(prefix):
+                break
+            matches.append(self._nodes[index])
+            if len(matches) == limit:
+                break
+        return [self._entry(node) for node in matches]
+
+    def _resolve(self, names: Sequence[str]) -> Optional[TaxonomyNode]:
+        # Typed paths may start below the root ("Pathlabs > Demographics > ...")
+        node = self.node(names)
+        if node is not None or not names:
+            return node
+        for start in self._named(names[0]):
+            node = start
+            for name in names[1:]:
+                node = node.children.get(name)
+                if node is None:
+                    break
+            if node is not None:
+                return node
+        return None
+
+    def _named(self, name: str) -> Iterator[TaxonomyNode]:
+        name = name.lower()
+        index = bisect.bisect_left(self._names, name)
+        while index < len(self._names) and self._names[index] == name:
+            yield self._nodes[index]
+            index += 1
+
+    def _id(self, node: TaxonomyNode) -> str:
+        return self.catalog[node.position].id
+
+    def _entry(self, node: TaxonomyNode) -> TaxonomyEntry:
+        return TaxonomyEntry(node.path, self._id(node) if node.is_segment else None, node.size)
+
+
+def split_path(full_path: str) -> Tuple[str, ...]:
+    return tuple(part.strip() for part in full_path.split(">") if part.strip())
+
+
+def taxonomy(catalog: SegmentCatalog) -> SegmentTaxonomy:
+    """The trie for catalog, built on first use and shared afterwards"""
+    return catalog.derived("taxonomy", lambda: SegmentTaxonomy(catalog))
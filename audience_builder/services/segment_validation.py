@@ -0,0 +1,81 @@
+import re
+from typing import Dict, List, NamedTuple, Tuple
+from services.segment_catalog import SegmentCatalog, provider_of
+
+# "<number>|<provider>", or a bare ID for providers that don't use suffixes
+_ID_FORMAT = re.compile(r"^[^|\s]+(\|[^|\s]+)?$")
+
+
+class SegmentIssue(NamedTuple):
+    segment_id: str
+    # missing_id, malformed_id, duplicate_id, unknown_id or path_corrected
+    problem: str
+    detail: str
+
+    @property
+    def message(self) -> str:
+        return f"{self.segment_id or 'Segment'}: {self.detail}"
+
+    @property
+    def blocking(self) -> bool:
+        """Whether the segment was dropped rather than repaired"""
+        return self.problem != "path_corrected"
+
+
+class SegmentValidator:
+    """Checks segments from assistant replies against the local catalog, one hash lookup each.
+
+    The ID's provider suffix decides what can be checked: an ID whose provider
+    has a local catalog must be in it, while IDs from providers known only to
+    a remote assistant pass through unverified. Known segments get their
+    full_path (and a missing description) restored from the catalog.
+    """
+
+    def __init__(self, catalog: SegmentCatalog):
+        self.catalog = catalog
+        self._positions: Dict[str, int] = {segment.id: position for position, segment in enumerate(catalog)}
+        self._providers = frozenset(catalog.providers())
+
+    def validate(self, segments: List[dict]) -> Tuple[List[dict], List[SegmentIssue]]:
+        """Returns the segments that can be pushed, as fresh dicts, and every problem found"""
+        valid, issues, seen = [], [], set()
+        for segment in segments:
+            segment_id = segment.get("id") if isinstance(segment, dict) else None
+            if not isinstance(segment_id, str) or not segment_id.strip():
+                name = segment.get("full_path", "") if isinstance(segment, dict) else ""
+                issues.append(SegmentIssue("", "missing_id", f"no ID for {name or 'a segment'}"))
+                continue
+
+            segment_id = segment_id.strip()
+            if not _ID_FORMAT.match(segment_id):
+                issues.append(SegmentIssue(segment_id, "malformed_id", "not a valid segment ID"))
+                continue
+            if segment_id in seen:
+                issues.append(SegmentIssue(segment_id, "duplicate_id", "listed more than once"))
+                continue
+            seen.add(segment_id)
+
+            position = self._positions.get(segment_id)
+            if position is None:
+                if provider_of(segment_id) in self._providers:
+                    issues.append(SegmentIssue(segment_id, "unknown_id", "not in the segment catalog"))
+                    continue
+                valid.append(dict(segment, id=segment_id))
+                continue
+
+            record = self.catalog[position]
+            checked = dict(segment, id=segment_id)
+            if checked.get("full_path") != record.full_path:
+                issues.append(SegmentIssue(
+                    segment_id, "path_corrected", f"path corrected to {record.full_path}"
+                ))
+                checked["full_path"] = record.full_path
+            if not checked.get("description"):
+                checked["description"] = record.description
+            valid.append(checked)
+        return valid, issues
+
+
+def segment_validator(catalog: SegmentCatalog) -> SegmentValidator:
+    """The validator for catalog, with its ID index built on first use and shared afterwards"""
+    return catalog.derived("validator", lambda: SegmentValidator(catalog))
@@ -2,6 +2,7 @@ import streamlit as st
 import uuid
 from services.openai_service import OpenAIService
 import logging
+from services.logging_pipeline import summarize
 
 logger = logging.getLogger(__name__)
 
@@ -10,6 +11,8 @@ class StateService:
     def initialize_state():
         if "audience" not in st.session_state:
             st.session_state.audience = {
+                # Identifies the draft's push journal, so a failed push resumes on retry
+                "draft_id": str(uuid.uuid4()),
                 "audience_name": "New Audience",
                 "data_groups": {}
             }
@@ -19,10 +22,12 @@ class StateService:
             st.session_state.group_threads = {}
         if 'selected_kpi' not in st.session_state:
             st.session_state.selected_kpi = None
-        logger.info("=== Current State ===")
-        logger.info(f"Audience: {st.session_state.audience}")
-        logger.info(f"Active Group: {st.session_state.active_group_id}")
-        logger.info(f"Group Threads: {st.session_state.group_threads}")
+        if "structure_errors" not in st.session_state:
+            st.session_state.structure_errors = []
+        # Runs on every rerun: only build these strings when debug logging is on
+        logger.debug("Audience: %s", summarize(st.session_state.audience))
+        logger.debug("Active Group: %s", st.session_state.active_group_id)
+        logger.debug("Group Threads: %s", summarize(st.session_state.group_threads))
     
     @staticmethod
     def get_thread_for_group(group_id: str) -> str:
@@ -39,6 +44,8 @@ class StateService:
             "status": "include",
             "group_name": "New Group",
             "segments": [],
+            # Added from the segment browser; kept when the assistant's reply replaces segments
+            "manual_segments": [],
             "assistant_id": None
         }
         return group_id 
@@ -50,7 +57,19 @@ class StateService:
 
     @staticmethod
     def update_group_status(group_id: str, status: str):
-        logger.info(f"Updating group {group_id} status to {status}")
-        logger.info(f"Before update: {st.session_state.audience['data_groups'][group_id]}")
+        logger.info("Updating group %s status to %s", group_id, status)
+        logger.debug("Before update: %s", summarize(st.session_state.audience['data_groups'][group_id]))
         st.session_state.audience["data_groups"][group_id]["status"] = status
-        logger.info(f"After update: {st.session_state.audience['data_groups'][group_id]}")
\ No newline at end of file
+        logger.debug("After update: %s", summarize(st.session_state.audience['data_groups'][group_id]))
+
+    @staticmethod
+    def add_group_segment(group_id: str, segment: dict) -> bool:
+        """Append a segment to a group unless it is already there"""
+        group = st.session_state.audience["data_groups"][group_id]
+        segments = group.setdefault("segments", [])
+        if any(existing.get("id") == segment["id"] for existing in segments):
+            return False
+        segments.append(segment)
+        group.setdefault("manual_segments", []).append(segment)
+        logger.info("Added segment %s to group %s", segment["id"], group_id)
+        return True
@@ -0,0 +1,194 @@
+import contextvars
+import functools
+import inspect
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+SERVICE_NAME = "audience_builder"
+
+
+class Trace:
+    """Every span started under one root span, e.g. one Streamlit rerun"""
+
+    def __init__(self):
+        self.trace_id = uuid.uuid4().hex
+        self.spans: List["Span"] = []
+        self._lock = threading.Lock()
+
+    def add(self, span: "Span") -> None:
+        # Spans finish on pool and event-loop threads as well as the script thread
+        with self._lock:
+            self.spans.append(span)
+
+    def finished_spans(self) -> List["Span"]:
+        with self._lock:
+            return sorted(self.spans, key=lambda span: span.start_ns)
+
+
+class Span:
+    __slots__ = (
+        "name", "trace", "span_id", "parent_id", "attributes",
+        "start_ns", "end_ns", "error", "thread_name"
+    )
+
+    def __init__(self, name: str, trace: Trace, parent_id: Optional[str], attributes: Dict[str, Any]):
+        self.name = name
+        self.trace = trace
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.attributes = attributes
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.error: Optional[str] = None
+        self.thread_name = threading.current_thread().name
+
+    @property
+    def duration_ms(self) -> float:
+        end_ns = self.end_ns if self.end_ns is not None else time.time_ns()
+        return (end_ns - self.start_ns) / 1e6
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def to_otel(self) -> Dict[str, Any]:
+        """The span in the OTLP/JSON field layout, one object per line in the export file"""
+        return {
+            "traceId": self.trace.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_id or "",
+            "name": self.name,
+            "startTimeUnixNano": self.start_ns,
+            "endTimeUnixNano": self.end_ns,
+            "attributes": {**self.attributes, "thread.name": self.thread_name},
+            "status": {"code": "ERROR", "message": self.error} if self.error else {"code": "OK"},
+            "resource": {"service.name": SERVICE_NAME},
+        }
+
+
+_current_span: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("current_span", default=None)
+
+
+class JsonlSpanExporter:
+    """Appends finished traces to a local JSONL file for offline analysis"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def export(self, spans: List[Span]) -> None:
+        lines = "".join(json.dumps(span.to_otel(), default=str) + "\n" for span in spans)
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as file:
+                file.write(lines)
+
+
+_exporters: List[JsonlSpanExporter] = []
+_exporters_lock = threading.Lock()
+
+
+def add_exporter(exporter: JsonlSpanExporter) -> None:
+    with _exporters_lock:
+        if not any(existing.path == exporter.path for existing in _exporters):
+            _exporters.append(exporter)
+            logger.info("Exporting spans to %s", exporter.path)
+
+
+def _export(trace: Trace) -> None:
+    for exporter in list(_exporters):
+        try:
+            exporter.export(trace.finished_spans())
+        except Exception as e:
+            logger.warning("Could not export trace %s: %s", trace.trace_id, e)
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+def set_attribute(key: str, value: Any) -> None:
+    """Annotate the innermost open span, if any"""
+    span = _current_span.get()
+    if span is not None:
+        span.set_attribute(key, value)
+
+
+@contextmanager
+def span(name: str, **attributes) -> Iterator[Span]:
+    """Time a block as a child of the current span, or as a new trace when there is none.
+    Worker threads only see the parent when the caller's context is copied into them.
+    """
+    parent = _current_span.get()
+    trace = parent.trace if parent is not None else Trace()
+    current = Span(name, trace, parent.span_id if parent is not None else None, attributes)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except Exception as e:
+        current.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        current.end_ns = time.time_ns()
+        _current_span.reset(token)
+        trace.add(current)
+        if parent is None:
+            _export(trace)
+
+
+def traced(name: str):
+    """Decorator form of span() for plain and async functions"""
+    def decorator(function):
+        if inspect.iscoroutinefunction(function):
+            @functools.wraps(function)
+            async def async_wrapper(*args, **kwargs):
+                with span(name):
+                    return await function(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def waterfall(spans: List[Span], width: int = 40) -> str:
+    """Plain-text waterfall of a trace, indented by nesting depth"""
+    if not spans:
+        return ""
+    origin = min(entry.start_ns for entry in spans)
+    total_ns = max(max(entry.end_ns or entry.start_ns for entry in spans) - origin, 1)
+    known = {entry.span_id for entry in spans}
+    children: Dict[Optional[str], List[Span]] = {}
+    for entry in sorted(spans, key=lambda entry: entry.start_ns):
+        parent_id = entry.parent_id if entry.parent_id in known else None
+        children.setdefault(parent_id, []).append(entry)
+
+    # Depth-first, so each span sits directly under its parent
+    ordered = []
+    stack = [(entry, 0) for entry in reversed(children.get(None, []))]
+    while stack:
+        entry, depth = stack.pop()
+        ordered.append((entry, depth))
+        stack.extend((child, depth + 1) for child in reversed(children.get(entry.span_id, [])))
+
+    lines = []
+    for entry, depth in ordered:
+        offset = int((entry.start_ns - origin) / total_ns * width)
+        length = max(1, int((entry.duration_ms * 1e6) / total_ns * width))
+        bar = " " * offset + "█" * min(length, width - offset)
+        label = ("  " * depth + entry.name)[:36]
+        marker = " !" if entry.error else ""
+        lines.append(f"{label:<36} |{bar:<{width}}| {entry.duration_ms:8.1f} ms{marker}")
+    return "\n".join(lines)
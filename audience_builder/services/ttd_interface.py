@@ -1,89 +1,285 @@
+import contextvars
 import logging
-from typing import Dict, Any, List, Tuple, Optional
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, Any, List, Optional, Tuple
 from ttd_sdk import TTDClient
 from ttd_sdk.models.base import ApiObject
 import streamlit as st
+from models.push import GroupPushResult, OrphanCleanupResult, PushResult
+from services.data_group_cache import DataGroupCache, get_data_group_cache
+from services.http_pool import configure_requests_session
+from services.push_journal import PushJournal, PushJournalStore, get_push_journal_store
+from services.segment_service import SegmentService
+from services.tracing import set_attribute, traced
 
 logger = logging.getLogger(__name__)
 
 class TTDInterfaceService:
     # Set a fixed advertiser ID for safety
     FIXED_ADVERTISER_ID = "8vad7yi"
+    # Sent with every data group, and part of the key for reusing one
+    IS_SHARABLE = False
+    SKIP_UNAUTHORIZED_THIRD_PARTY_DATA = True
     
-    def __init__(self, sandbox: bool = True):
+    def __init__(
+        self,
+        sandbox: bool = True,
+        client=None,
+        segment_service: Optional[SegmentService] = None,
+        data_group_cache: Optional[DataGroupCache] = None,
+        push_journals: Optional[PushJournalStore] = None
+    ):
         self.advertiser_id = self.FIXED_ADVERTISER_ID
-        self.client = TTDClient(
+        self.segment_service = segment_service or SegmentService()
+        self.data_group_cache = data_group_cache or get_data_group_cache()
+        self.push_journals = push_journals or get_push_journal_store()
+        # Data groups created in parallel per push; keep within the connection pool size
+        self.max_concurrent_groups = 4
+        self.client = client or TTDClient(
             sandbox=sandbox,
             log_level="DEBUG"
         )
+        
+        # Share one tuned connection pool when the SDK exposes its requests session
+        session = getattr(self.client, "session", None)
+        if session is not None:
+            configure_requests_session(session, "ttd")
+        else:
+            logger.warning("TTD client %s has no requests session; using its default connection pool and timeouts",
+                           type(self.client).__name__)
+
+    def _third_party_data_ids(self, group_data: Dict[str, Any]) -> List[str]:
+        # Unknown IDs would only be skipped or rejected by TradeDesk, so drop them here
+        segments, issues = self.segment_service.validate_segments(group_data["segments"])
+        for issue in issues:
+            if issue.blocking:
+                logger.warning("Group '%s': %s", group_data["group_name"], issue.message)
+        third_party_data_ids = [segment["id"] for segment in segments]
+        
+        if not third_party_data_ids:
+            raise ValueError("No valid third party data IDs found in segments")
+        return third_party_data_ids
+
+    def data_group_key(self, third_party_data_ids: List[str]) -> str:
+        return DataGroupCache.key(
+            self.advertiser_id,
+            third_party_data_ids,
+            self.IS_SHARABLE,
+            self.SKIP_UNAUTHORIZED_THIRD_PARTY_DATA
+        )
 
-    def create_data_group(self, group_data: Dict[str, Any]) -> str:
+    @traced("ttd.create_data_group")
+    def create_data_group(self, group_data: Dict[str, Any], third_party_data_ids: Optional[List[str]] = None) -> str:
         """Create a data group and return its ID"""
         try:
-            third_party_data_ids = [
-                segment["id"] 
-                for segment in group_data["segments"]
-                if "id" in segment
-            ]
-            
-            if not third_party_data_ids:
-                raise ValueError("No valid third party data IDs found in segments")
-            
+            if third_party_data_ids is None:
+                third_party_data_ids = self._third_party_data_ids(group_data)
             data_group = ApiObject(
                 AdvertiserId=self.advertiser_id,
                 DataGroupName=group_data["group_name"],
                 ThirdPartyDataIds=third_party_data_ids,
-                IsSharable=False,
-                SkipUnauthorizedThirdPartyData=True
+                IsSharable=self.IS_SHARABLE,
+                SkipUnauthorizedThirdPartyData=self.SKIP_UNAUTHORIZED_THIRD_PARTY_DATA
             )
             
-            logger.debug(f"Creating data group with IDs: {third_party_data_ids}")
+            logger.debug("Creating data group with IDs: %s", third_party_data_ids)
             response = self.client.data_groups.create(data_group)
+            self.data_group_cache.put(
+                self.data_group_key(third_party_data_ids),
+                response.DataGroupId,
+                self.advertiser_id,
+                group_data["group_name"]
+            )
             return response.DataGroupId
             
         except Exception as e:
-            logger.error(f"Failed to create data group: {str(e)}")
+            logger.error("Failed to create data group: %s", e)
             raise
 
-    def push_audience(self, audience_data: Dict[str, Any]) -> Tuple[bool, Optional[str]]:
-        """Push the audience structure to TradeDesk
-        Returns: (success: bool, audience_id: Optional[str])
+    @traced("ttd.get_or_create_data_group")
+    def get_or_create_data_group(
+        self,
+        group_data: Dict[str, Any],
+        third_party_data_ids: Optional[List[str]] = None
+    ) -> Tuple[str, bool]:
+        """The ID of a data group with exactly these segments, creating one only if none was pushed before.
+        Returns: (data_group_id, reused)
+        """
+        if third_party_data_ids is None:
+            third_party_data_ids = self._third_party_data_ids(group_data)
+        data_group_id = self.data_group_cache.get(self.data_group_key(third_party_data_ids))
+        set_attribute("reused", data_group_id is not None)
+        if data_group_id is not None:
+            logger.info("Reusing data group %s for '%s'", data_group_id, group_data["group_name"])
+            return data_group_id, True
+        return self.create_data_group(group_data, third_party_data_ids), False
+
+    @traced("ttd.push_audience")
+    def push_audience(
+        self,
+        audience_data: Dict[str, Any],
+        progress: Optional[Callable[[GroupPushResult], None]] = None
+    ) -> PushResult:
+        """Push the audience structure to TradeDesk.
+        Data groups are created concurrently, reusing any already pushed with the same segments;
+        the audience is only created if every group succeeded. Each step is journaled, so retrying
+        after a failure resumes where the last attempt stopped.
+        progress, if given, is called on this thread with each group's result as soon as it settles.
         """
+        journal_id = self.push_journals.journal_id(self.advertiser_id, audience_data)
+        journal = self.push_journals.open(journal_id, self.advertiser_id)
+        groups = [
+            GroupPushResult(group_id=group_id, group_name=group["group_name"], status=group["status"])
+            for group_id, group in audience_data["data_groups"].items()
+        ]
+        pending = []
+        for result in groups:
+            if audience_data["data_groups"][result.group_id].get("segments"):
+                pending.append(result)
+            else:
+                logger.warning("Skipping group %s - no segments defined", result.group_id)
+                result.skipped = True
+                if progress:
+                    progress(result)
+        
+        if pending:
+            self._create_data_groups(journal, audience_data, pending, progress)
+        
+        failed = [result for result in groups if result.failed]
+        reused = [result for result in groups if result.reused or result.resumed]
+        if failed:
+            logger.error("Failed to push audience: %s of %s data groups failed", len(failed), len(pending))
+            return PushResult(groups=groups, error=f"{len(failed)} of {len(pending)} data groups failed")
+        
+        # Include/exclude lists keep the order the groups were defined in
+        included_group_ids = [r.data_group_id for r in groups if not r.skipped and r.status == "include"]
+        excluded_group_ids = [r.data_group_id for r in groups if not r.skipped and r.status != "include"]
+        if not included_group_ids:
+            logger.error("Failed to push audience: no valid included groups found")
+            return PushResult(groups=groups, error="No valid included groups found")
+        
+        audience_name = audience_data["audience_name"]
+        audience_id = journal.audience_id(audience_name, included_group_ids, excluded_group_ids)
+        if audience_id is not None:
+            logger.info("Audience '%s' was already pushed as %s", audience_name, audience_id)
+            return PushResult(audience_id=audience_id, groups=groups, resumed=True)
+        
         try:
-            # First create data groups for all included and excluded groups
-            included_group_ids = []
-            excluded_group_ids = []
-            
-            for group_id, group in audience_data["data_groups"].items():
-                if not group.get("segments"):
-                    logger.warning(f"Skipping group {group_id} - no segments defined")
-                    continue
-                    
-                group_id = self.create_data_group(group)
-                
-                if group["status"] == "include":
-                    included_group_ids.append(group_id)
-                else:
-                    excluded_group_ids.append(group_id)
-            
-            if not included_group_ids:
-                raise ValueError("No valid included groups found")
-            
-            # Then create the audience that references these groups
             audience = ApiObject(
                 AdvertiserId=self.advertiser_id,
-                AudienceName=audience_data["audience_name"],
+                AudienceName=audience_name,
                 IncludedDataGroupIds=included_group_ids,
                 ExcludedDataGroupIds=excluded_group_ids
             )
-            
             response = self.client.audiences.create(audience)
-            audience_id = response.AudienceId
-            return True, audience_id
-            
+            journal.record_audience(audience_name, included_group_ids, excluded_group_ids, response.AudienceId)
+            return PushResult(audience_id=response.AudienceId, groups=groups)
         except Exception as e:
-            logger.error(f"Failed to push audience: {str(e)}")
-            return False, None
+            logger.error("Failed to push audience: %s", e)
+            if _is_rejection(e):
+                # A reused or resumed group may have been deleted in TradeDesk since; create fresh ones next time.
+                # Other failures keep every group, so a retry only repeats this last call.
+                for result in reused:
+                    self.data_group_cache.invalidate(result.data_group_id)
+                    journal.forget_data_group(result.data_group_id)
+            return PushResult(groups=groups, error=f"Audience creation failed: {e}")
+
+    def cleanup_orphaned_data_groups(self, older_than_seconds: float = 24 * 60 * 60) -> OrphanCleanupResult:
+        """Delete data groups left behind by failed or superseded pushes.
+        Unfinished pushes idle for older_than_seconds are treated as abandoned.
+        """
+        result = OrphanCleanupResult()
+        for journal, data_group_id in self.push_journals.orphans(older_than_seconds):
+            if data_group_id in result.deleted:
+                journal.forget_data_group(data_group_id)
+                continue
+            try:
+                self.client.data_groups.delete(data_group_id)
+            except Exception as e:
+                logger.warning("Could not delete orphaned data group %s: %s", data_group_id, e)
+                result.failed[data_group_id] = str(e)
+                continue
+            logger.info("Deleted orphaned data group %s", data_group_id)
+            self.data_group_cache.invalidate(data_group_id)
+            journal.forget_data_group(data_group_id)
+            result.deleted.append(data_group_id)
+        self.push_journals.prune()
+        return result
+
+    def _create_data_groups(
+        self,
+        journal: PushJournal,
+        audience_data: Dict[str, Any],
+        pending: List[GroupPushResult],
+        progress: Optional[Callable[[GroupPushResult], None]] = None
+    ) -> None:
+        """Create or reuse the pending data groups on a bounded pool, filling in each result's ID or error.
+        Groups with identical segments share one data group, created once.
+        """
+        batches: Dict[str, Tuple[List[str], List[GroupPushResult]]] = {}
+        for result in pending:
+            try:
+                third_party_data_ids = self._third_party_data_ids(audience_data["data_groups"][result.group_id])
+            except Exception as e:
+                result.error = str(e)
+                if progress:
+                    progress(result)
+                continue
+            key = self.data_group_key(third_party_data_ids)
+            batches.setdefault(key, (third_party_data_ids, []))[1].append(result)
+        if not batches:
+            return
+        
+        workers = max(1, min(self.max_concurrent_groups, len(batches)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ttd_push") as executor:
+            futures = {
+                # Copied context keeps the creates nested under this push in traces
+                executor.submit(
+                    contextvars.copy_context().run,
+                    self._push_data_group, journal, key, third_party_data_ids, results,
+                    audience_data["data_groups"][results[0].group_id]
+                ): results
+                for key, (third_party_data_ids, results) in batches.items()
+            }
+            for future in as_completed(futures):
+                results = futures[future]
+                try:
+                    future.result()
+                except Exception as e:
+                    for result in results:
+                        result.error = str(e)
+                if progress:
+                    for result in results:
+                        progress(result)
+
+    def _push_data_group(
+        self,
+        journal: PushJournal,
+        key: str,
+        third_party_data_ids: List[str],
+        results: List[GroupPushResult],
+        group_data: Dict[str, Any]
+    ) -> None:
+        """Resume the groups sharing key from the journal, or get or create their data group once and journal it"""
+        journaled = {result.group_id: journal.data_group_id(result.group_id, key) for result in results}
+        data_group_id = next((journaled_id for journaled_id in journaled.values() if journaled_id), None)
+        creator = None
+        if data_group_id is None:
+            data_group_id, reused = self.get_or_create_data_group(group_data, third_party_data_ids)
+            creator = None if reused else results[0]
+        
+        for result in results:
+            result.data_group_id = data_group_id
+            if journaled[result.group_id] == data_group_id:
+                result.resumed = True
+                continue
+            result.reused = result is not creator
+            journal.record_data_group(result.group_id, key, data_group_id, result.group_name, created=result is creator)
+
+def _is_rejection(error: Exception) -> bool:
+    """Whether TradeDesk refused the request itself, as opposed to a timeout, throttling or server error"""
+    status = getattr(getattr(error, "response", None), "status_code", None)
+    return status is not None and 400 <= status < 500 and status not in (408, 429)
 
 
 # Test execution section
@@ -0,0 +1,25 @@
+# Connection pool defaults per upstream. Any value can be overridden from
+# .streamlit/secrets.toml, e.g.
+#
+#   [http_pool.openai]
+#   max_connections = 100
+#
+HTTP_POOL_SETTINGS = {
+    "openai": {
+        "max_connections": 50,
+        "max_keepalive_connections": 20,
+        "keepalive_expiry": 30.0,
+        "connect_timeout": 5.0,
+        "read_timeout": 60.0,
+        "write_timeout": 10.0,
+        "pool_timeout": 10.0,
+    },
+    # The TTD SDK uses a requests session, which only supports connect and read
+    # timeouts; it has no keepalive expiry, write or pool timeout to configure
+    "ttd": {
+        "max_connections": 20,
+        "max_keepalive_connections": 10,
+        "connect_timeout": 5.0,
+        "read_timeout": 60.0,
+    },
+}
\ No newline at end of file
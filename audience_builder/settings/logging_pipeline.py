@@ -0,0 +1,26 @@
+# Per-subsystem log levels. Loggers are named after their module
+# (services.openai_service, components.chat, ...), so a package prefix
+# covers everything below it. Override with a [log_levels] table in secrets.
+LOG_LEVELS = {
+    "": "INFO",
+    "services": "INFO",
+    "components": "INFO",
+    "services.request_scheduler": "INFO",
+    "httpx": "WARNING",
+    "httpcore": "WARNING",
+    "openai": "WARNING",
+    "urllib3": "WARNING",
+    "watchdog": "WARNING",
+}
+
+LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+LOG_DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Messages longer than this are cut when written
+LOG_MAX_MESSAGE_LENGTH = 2000
+
+# Of the messages over the length limit, only every Nth per call site is written
+LOG_LARGE_PAYLOAD_SAMPLE_EVERY = 10
+
+# Records waiting for the writer thread; beyond this new records are dropped
+LOG_QUEUE_SIZE = 10000
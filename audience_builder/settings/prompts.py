@@ -89,6 +89,12 @@ Note:
   * Gen X: 43-58
   * Boomers: 59-77"""
 
+BATCH_CLASSIFICATION_PROMPT = CLASSIFICATION_PROMPT + """
+
+You will receive a JSON array of descriptions instead of a single description.
+Classify every description independently using the rules above and return one
+classification per description, in the same order as the input array."""
+
 AUDIENCE_STRUCTURE_PROMPT = """You are a specialist in breaking down audience descriptions into logical data groups for digital advertising targeting. 
 Your role is to analyze an audience description and break it into distinct, targetable groups that will be combined using AND logic.
 
@@ -147,4 +153,24 @@ Output: {
     ]
 }
 
-Break down the provided audience description into logical data groups that can be effectively targeted using AND logic."""
\ No newline at end of file
+Break down the provided audience description into logical data groups that can be effectively targeted using AND logic."""
+
+CLASSIFIED_AUDIENCE_STRUCTURE_PROMPT = AUDIENCE_STRUCTURE_PROMPT + """
+
+CLASSIFYING EACH GROUP:
+Along with its name and description, classify every data group you create:
+- audience_type: "age_range" for age groups, "gender" for gender groups, "other" for everything else
+- age_start / age_end: the age bounds for age_range groups (age_end is null for open-ended ranges such as 65+), otherwise null
+- gender: "male" or "female" for gender groups, otherwise null
+- For generational terms, use these age ranges:
+  * Gen Z: 18-26
+  * Millennials: 27-42
+  * Gen X: 43-58
+  * Boomers: 59-77
+
+Example: "People aged 27-42" → audience_type "age_range", age_start 27, age_end 42, gender null"""
+
+SEGMENT_CANDIDATES_PROMPT = """Candidate segments from the local catalog, ranked by relevance to this group:
+{candidates}
+
+Prefer these segments when they fit the group and use their IDs exactly as given. Only search for other segments if none of them fit."""
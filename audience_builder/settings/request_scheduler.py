@@ -0,0 +1,12 @@
+# Limits for the process-wide OpenAI request scheduler. Keep these a little
+# below the organization's actual rate limits so bursts are smoothed locally
+# instead of being answered with 429s.
+REQUEST_SCHEDULER_SETTINGS = {
+    "requests_per_minute": 450,
+    "tokens_per_minute": 400000,
+    "max_retries": 4,
+    "base_retry_delay": 0.5,
+    "max_retry_delay": 20.0,
+    "failure_threshold": 5,
+    "reset_timeout": 30.0,
+}
\ No newline at end of file
@@ -0,0 +1,41 @@
+import logging
+import requests
+from requests.adapters import HTTPAdapter
+from services.data_group_cache import DataGroupCache
+from services.http_pool import configure_requests_session
+from services.push_journal import PushJournalStore
+from services.ttd_interface import TTDInterfaceService
+
+
+def sent_timeouts(monkeypatch, **request_kwargs) -> list:
+    timeouts = []
+
+    def send(adapter, request, **kwargs):
+        timeouts.append(kwargs["timeout"])
+        response = requests.Response()
+        response.status_code = 200
+        return response
+
+    monkeypatch.setattr(HTTPAdapter, "send", send)
+    session = requests.Session()
+    configure_requests_session(session, "ttd")
+    session.get("https://api.example.com/v3/datagroup", **request_kwargs)
+    return timeouts
+
+
+def test_ttd_session_applies_configured_timeouts(monkeypatch):
+    assert sent_timeouts(monkeypatch) == [(5.0, 60.0)]
+
+
+def test_ttd_session_keeps_explicit_timeout(monkeypatch):
+    assert sent_timeouts(monkeypatch, timeout=2.0) == [2.0]
+
+
+def test_client_without_session_logs_warning(caplog):
+    with caplog.at_level(logging.WARNING, logger="services.ttd_interface"):
+        TTDInterfaceService(
+            client=object(),
+            data_group_cache=DataGroupCache(db_path=None),
+            push_journals=PushJournalStore(directory=None)
+        )
+    assert "has no requests session" in caplog.text
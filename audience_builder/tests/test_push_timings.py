@@ -0,0 +1,37 @@
+import time
+from streamlit.testing.v1 import AppTest
+
+
+def push_app():
+    import streamlit as st
+    from components.sidebar import render_timing_panel, submit_push
+    from models.push import PushResult
+    from services.tracing import span
+
+    class TracedTTD:
+        def push_audience(self, audience_data, progress=None):
+            with span("ttd.push_audience"):
+                return PushResult(audience_id="aud_1")
+
+    if "audience" not in st.session_state:
+        st.session_state.audience = {"audience_name": "Timed", "data_groups": {}}
+    # As in main(): button callbacks run before the rerun span opens
+    st.button("Push", key="push", on_click=submit_push, args=(TracedTTD(),))
+    with span("streamlit.rerun"):
+        render_timing_panel()
+
+
+def test_timing_panel_shows_push_spans():
+    at = AppTest.from_function(push_app).run()
+    at.button(key="push").click().run()
+    job = at.session_state["push_job"]
+    deadline = time.monotonic() + 5
+    while not job.done and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert job.status == "succeeded"
+
+    at.run()
+    waterfall = at.code[0].value
+    assert "push.submit" in waterfall
+    assert "push.job" in waterfall
+    assert "ttd.push_audience" in waterfall
@@ -0,0 +1,62 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from services.request_scheduler import Priority, RequestScheduler
+
+
+def drained_scheduler() -> RequestScheduler:
+    # Ten requests a second, none available right now
+    scheduler = RequestScheduler(requests_per_minute=600, tokens_per_minute=100000)
+    scheduler.request_bucket.tokens = 0
+    return scheduler
+
+
+def test_queued_coroutines_do_not_hold_threads():
+    async def scenario():
+        asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=2))
+        scheduler = drained_scheduler()
+        waiters = [
+            asyncio.create_task(scheduler.acall(lambda: asyncio.sleep(0, "sent"), Priority.BULK))
+            for _ in range(10)
+        ]
+        await asyncio.sleep(0.01)
+        assert scheduler.metrics()["queue_depth"] == 10
+        # Would wait behind the queue if each waiter held an executor thread
+        assert await asyncio.wait_for(asyncio.to_thread(lambda: "free"), timeout=1) == "free"
+        assert await asyncio.wait_for(asyncio.gather(*waiters), timeout=5) == ["sent"] * 10
+
+    asyncio.run(scenario())
+
+
+def test_blocking_interactive_request_overtakes_queued_coroutines():
+    async def scenario():
+        scheduler = drained_scheduler()
+        order = []
+
+        async def bulk():
+            await scheduler.aacquire(Priority.BULK)
+            order.append("bulk")
+
+        def interactive():
+            scheduler.acquire(Priority.INTERACTIVE)
+            order.append("interactive")
+
+        waiters = [asyncio.create_task(bulk()) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        await asyncio.wait_for(asyncio.gather(asyncio.to_thread(interactive), *waiters), timeout=5)
+        assert order == ["interactive", "bulk", "bulk", "bulk"]
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_coroutine_leaves_the_queue():
+    async def scenario():
+        scheduler = drained_scheduler()
+        cancelled = asyncio.create_task(scheduler.aacquire(Priority.BULK))
+        behind = asyncio.create_task(scheduler.aacquire(Priority.BULK))
+        await asyncio.sleep(0.01)
+        cancelled.cancel()
+        await asyncio.wait_for(behind, timeout=1)
+        assert scheduler.metrics()["queue_depth"] == 0
+        assert scheduler.requests == 1
+
+    asyncio.run(scenario())
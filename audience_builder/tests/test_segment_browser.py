@@ -0,0 +1,48 @@
+from streamlit.testing.v1 import AppTest
+
+
+def group_list_app():
+    import json
+    import streamlit as st
+    from components.sidebar import render_group_list
+    from services.segment_service import SegmentService
+    from services.state_service import StateService
+
+    class CachedThreadOpenAI:
+        """Replays one assistant reply for every thread, as get_latest_assistant_message does from its cache"""
+        segment_service = SegmentService()
+
+        def create_thread(self):
+            return "thread"
+
+        def get_latest_assistant_message(self, thread_id):
+            segment = self.segment_service.get_segment("15493215|lds210audacu")
+            return json.dumps({"group_name": "Young adults", "segments": [segment]})
+
+    openai_service = CachedThreadOpenAI()
+    StateService.initialize_state()
+    if not st.session_state.audience["data_groups"]:
+        StateService.create_group(openai_service)
+    render_group_list(openai_service)
+
+
+def group_segment_ids(at: AppTest) -> list:
+    (group,) = at.session_state["audience"]["data_groups"].values()
+    return [segment["id"] for segment in group["segments"]]
+
+
+def test_browser_segment_survives_reselecting_group():
+    at = AppTest.from_function(group_list_app).run()
+    (group_id,) = at.session_state["audience"]["data_groups"]
+    at.button(key=f"group_button_{group_id}").click().run()
+    assert group_segment_ids(at) == ["15493215|lds210audacu"]
+
+    at.text_input(key=f"segment_browser_search_{group_id}").set_value("Age Range > 21-24").run()
+    added = "Custom Segment > Audience Acuity > Pathlabs > Demographics > Age Range > 21-24"
+    at.button(key=f"segment_browser_{group_id}_{added}_add").click().run()
+    assert group_segment_ids(at) == ["15493215|lds210audacu", "15493174|lds210audacu"]
+
+    # Selecting the group again re-parses the cached assistant reply
+    at.button(key=f"group_button_{group_id}").click().run()
+    assert not at.exception
+    assert group_segment_ids(at) == ["15493215|lds210audacu", "15493174|lds210audacu"]
@@ -0,0 +1,46 @@
+import csv
+from openai import OpenAI
+from loadtest.fake_server import FakeServer
+from loadtest.profiles import PROFILES
+from services.classification_cache import ClassificationCache
+from services.openai_service import OpenAIService
+from services.request_scheduler import RequestScheduler
+from services.segment_service import SegmentService
+
+HIKING_ID = "99000001|lds210audacu"
+
+
+def interest_catalog(tmp_path) -> SegmentService:
+    source_dir = tmp_path / "segments"
+    source_dir.mkdir()
+    with open(source_dir / "interests.csv", "w", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(["id", "full_path", "description"])
+        writer.writerow([HIKING_ID, "Custom Segment > Audience Acuity > Interests > Hiking and Camping",
+                         "People who enjoy hiking, camping and outdoor sports."])
+        writer.writerow(["15493200|lds210audacu", "Custom Segment > Audience Acuity > Pathlabs > Demographics > Gender > Female",
+                         "Individuals who identify as female."])
+    return SegmentService.from_catalog_file(tmp_path / "segments.idx", source_dir)
+
+
+def test_interest_group_runs_are_seeded_with_candidates(tmp_path):
+    server = FakeServer(PROFILES["fast"], scale=0.01, seed=1).start()
+    try:
+        openai_service = OpenAIService(client=OpenAI(api_key="test", base_url=server.openai_base_url, max_retries=0))
+        openai_service.scheduler = RequestScheduler(requests_per_minute=6000, tokens_per_minute=1000000)
+        openai_service.classification_cache = ClassificationCache(db_path=None)
+        openai_service.segment_service = interest_catalog(tmp_path)
+        openai_service.segment_candidate_limit = 8
+
+        openai_service.plan_audience("Outdoor enthusiasts who hike and camp")
+
+        seeded = [
+            run["additional_instructions"] for run in server.httpd.state.runs.values()
+            if run["additional_instructions"]
+        ]
+        assert seeded
+        assert all(HIKING_ID in instructions for instructions in seeded)
+        # Demographic segments resolve locally and are never offered
+        assert not any("15493200|lds210audacu" in instructions for instructions in seeded)
+    finally:
+        server.stop()
@@ -0,0 +1,26 @@
+from services.segment_catalog import Segment
+from services.segment_service import SegmentService, build_age_coverage_table
+
+
+def age_segment(low: int, high: int) -> Segment:
+    return Segment(id=f"{low}-{high}", path=("Age Range", f"{low}-{high}"), description="")
+
+
+def test_overlapping_segments_cover_more_ages():
+    young, older = age_segment(20, 25), age_segment(23, 30)
+    table = build_age_coverage_table([(20, 25, young), (23, 30, older)])
+    # No pair of non-overlapping segments reaches 30
+    assert table[(20, 30)] == (young, older)
+    assert table[(20, 29)] == (young,)
+
+
+def test_fewest_segments_win_among_full_covers():
+    whole, first, second = age_segment(20, 30), age_segment(20, 25), age_segment(26, 30)
+    table = build_age_coverage_table([(20, 25, first), (26, 30, second), (20, 30, whole)])
+    assert table[(20, 30)] == (whole,)
+    assert table[(20, 25)] == (first,)
+
+
+def test_catalog_age_coverage():
+    coverage = SegmentService().get_optimal_age_coverage(25, 34)
+    assert [segment["full_path"].split(" > ")[-1] for segment in coverage["segments"]] == ["25-29", "30-34"]